@@ -177,8 +177,11 @@ def update_connection_status(wifi_status, twitch_status):
 # Hier wird nun zusätzlich der Helligkeitswert angezeigt.
 # ---------------------------
 def display_status(zoom_level, is_autofocus, is_freeze, override):
+    global last_timer_fill
     # Wir löschen den Bereich von y=25 bis zum unteren Rand
     oled.fill_rect(0, 25, WIDTH, HEIGHT-25, 0)
+    # Das trifft auch die unteren Zeilen des Zoom-Balkens (y=23..26): neu zeichnen lassen
+    last_timer_fill = None
     # Obere Statuszeile: links "Freeze", rechts "Bright: X"
     oled.text("Freeze", 0, 0, 1)
     # Links unten: AF/MF-Status
@@ -192,16 +195,36 @@ def display_status(zoom_level, is_autofocus, is_freeze, override):
     oled.show()
 
 # ---------------------------
-# Neue Funktion: Bitmap zeichnen (für Smiley)
+# Bitmap zeichnen (für Smiley)
+# Icons liegen als Spaltenbytes vor (LSB oben, wie die SSD1306-Pages) und werden
+# direkt in oled.buffer kopiert statt Pixel für Pixel über oled.pixel()
 # ---------------------------
-def draw_bitmap(bitmap, x, y, width=8, height=8):
-    for j in range(height):
+def bitmap_to_columns(bitmap):
+    cols = bytearray(8)
+    for j in range(8):
         row = bitmap[j]
-        for i in range(width):
+        for i in range(8):
             if row & (1 << (7 - i)):
-                oled.pixel(x + i, y + j, 1)
-            else:
-                oled.pixel(x + i, y + j, 0)
+                cols[i] |= 1 << j
+    return bytes(cols)
+
+def draw_bitmap(columns, x, y):
+    buf = oled.buffer  # buffer[0] = I2C-Steuerbyte, Pixel ab Index 1
+    page = y >> 3
+    shift = y & 7
+    keep = (1 << shift) - 1
+    base = 1 + page * WIDTH + x
+    for i in range(len(columns)):
+        if x + i >= WIDTH:
+            break
+        bits = columns[i]
+        if shift == 0:
+            buf[base + i] = bits
+            continue
+        buf[base + i] = (buf[base + i] & keep) | ((bits << shift) & 0xFF)
+        if page + 1 < HEIGHT >> 3:
+            j = base + WIDTH + i
+            buf[j] = (buf[j] & ~keep & 0xFF) | (bits >> (8 - shift))
 
 # Zwei 8x8 Bitmaps für den Twitch-Status (Smiley)
 # Lachender Smiley (verbunden)
@@ -226,6 +249,9 @@ sad_smiley = [
     0x42,
     0x3C
 ]
+# Einmal in Spaltenform umrechnen
+laughing_smiley = bitmap_to_columns(laughing_smiley)
+sad_smiley = bitmap_to_columns(sad_smiley)
 
 # ---------------------------
 # Overlay-Text anzeigen (KAMERAKIND: [Zuschauername])
@@ -320,22 +346,31 @@ power_led_green.value = False
 connected_led_green.value = False
 connected_led_red.value = False
 
+# Zuletzt gezeichnete Balkenbreite: nur bei Änderung neu zeichnen und senden
+last_timer_fill = None
+
 def display_zoom_timer(zoom_timeout, total=20):
+    global last_timer_fill
     # Zoom-Timer nur anzeigen, solange noch Zeit übrig ist
     remaining = zoom_timeout - time.monotonic()
     if remaining <= 1:
-        oled.fill_rect(5, 23, WIDTH-10, 4, 0)
-        oled.show()
-        print("reset")
+        if last_timer_fill is not None:
+            oled.fill_rect(5, 23, WIDTH-10, 4, 0)
+            oled.show()
+            print("reset")
+            last_timer_fill = None
         return
     fraction = remaining / total
     bar_width = WIDTH - 10
     bar_height = 4
     x = 5
     y = 23
+    fill_width = int(fraction * (bar_width - 2))
+    if fill_width == last_timer_fill:
+        return  # Balken unverändert -> kein I2C-Transfer
+    last_timer_fill = fill_width
     oled.fill_rect(x, y, bar_width, bar_height, 0)
     oled.rect(x, y, bar_width, bar_height, 1)
-    fill_width = int(fraction * (bar_width - 2))
     oled.fill_rect(x+1, y+1, fill_width, bar_height-2, 1)
     oled.show()
 
@@ -523,6 +558,7 @@ while True:
             update_connection_status(1, 0)
             oled.fill(0)
             oled.show()
+            last_timer_fill = None
             autofocus_led_green.value = False
             autofocus_led_red.value = False
             freeze_led_green.value = False
@@ -44,4 +44,61 @@ DISPLAY_HEIGHT = 64
 # Timing-Konstanten
 ZOOM_DEBOUNCE = 0.0
 BRIGHTNESS_DEBOUNCE = 0.05
-TWITCH_ZOOM_TIMEOUT = 20  # Sekunden
\ No newline at end of file
+TWITCH_ZOOM_TIMEOUT = 20  # Sekunden: garantierter Slot je Einlösung
+ZOOM_QUEUE_SIZE = 8       # Warteschlange (zoom_queue.py): max. wartende Viewer
+
+# Netz-Multiplexer (netmux.py): alle Sockets einmal pro Tick, select.poll() wenn
+# der Port es kann, sonst Round-Robin mit Backoff für leere Sockets
+NETMUX_SLOTS = 4            # Sockets gesamt (IRC)
+NETMUX_TICK_BUDGET = 16384  # Bytes je Tick über alle Sockets
+NETMUX_MAX_SKIP = 3         # leere Sockets höchstens so viele Ticks auslassen
+TWITCH_READ_BUDGET = 16384  # Bytes je Tick vom IRC-Socket (mehrere Ring-Füllungen)
+TWITCH_READ_TIME = 0.02     # Sekunden je Tick fürs Leeren des IRC-Sockets
+TWITCH_RX_RING = 4096       # Bytes Ringpuffer (line_ring.py) für angefangene Zeilen
+TWITCH_MAX_LINE = 2048      # längere IRC-Zeilen (inkl. Tags) werden verworfen
+TWITCH_CONNECT_TIMEOUT = 5.0  # Sekunden für den non-blocking IRC-Connect
+TWITCH_JOIN_TIMEOUT = 10.0    # Sekunden vom Login bis zur JOIN-Bestätigung
+TWITCH_REVALIDATE = 3600      # Sekunden: Token-Validierung im Leerlauf (Twitch: stündlich)
+TWITCH_TOKEN_MARGIN = 300     # Sekunden Restlaufzeit, unter denen der Token-Cache nicht reicht
+TWITCH_BACKOFF_BASE = 1.0     # Sekunden: erster Wiederverbindungsversuch, dann verdoppelt (mit Jitter)
+TWITCH_BACKOFF_MAX = 60.0     # Sekunden: längste Pause zwischen Versuchen
+TWITCH_PING_INTERVAL = 60.0   # Sekunden zwischen eigenen PINGs (RTT-Messung)
+TWITCH_PONG_TIMEOUT = 10.0    # Sekunden ohne PONG -> Verbindung gilt als tot
+TWITCH_DEDUP = 32             # zuletzt gesehene Message-IDs (keine Doppel-Einlösung)
+NTP_SERVER = "pool.ntp.org"   # SNTP (adafruit_ntp, optional) stellt die Uhr für den Token-Cache
+NTP_TIMEOUT = 2               # Sekunden
+
+# Watchdog / Hänger-Erkennung (stall_guard.py)
+WATCHDOG_TIMEOUT = 8.0  # Sekunden (RP2040-Maximum ~8.3 s)
+STALL_BUDGETS = {       # Sekunden je Stufe, Überschreitung -> Bericht + Reset
+    "wifi": 7.0,
+    "power": 7.0,       # set_power(True) wartet 5 s auf die Kamera
+    "twitch_auth": 7.5, # je HTTPS-Schritt (validate/refresh/device code)
+    "twitch_ntp": 4.0,  # SNTP einmal je Start (NTP_TIMEOUT)
+    "twitch_irc": 7.0,  # IRC-Socket connect (falls der Port non-blocking nicht kann)
+    "twitch": 0.5,
+    "buttons": 0.5,
+    "zoom": 0.5,
+    "oled": 0.5,
+}
+
+# Speicher / GC (mem_monitor.py): nur in Leerlauf-Fenstern sammeln
+GC_MIN_FREE = 40 * 1024     # Bytes: TLS-Handshake braucht viel zusammenhängenden Heap
+GC_MAX_INTERVAL = 30.0      # Sekunden: spätestens dann im Leerlauf sammeln
+MEM_REPORT_INTERVAL = 60.0  # Sekunden: Low-Water-Bericht auf der Konsole
+
+# Logging (log.py): Level 10=DEBUG, 20=INFO, 30=WARN, 40=ERROR
+LOG_LEVEL = 20
+LOG_BUFFER_LINES = 64       # RAM-Ring, Ausgabe auf die Konsole nur im Leerlauf
+LOG_FLUSH_LINES = 4         # max. Zeilen je Leerlauf-Fenster
+LOG_ECHO = False            # True: sofort ausgeben (nur zur Entwicklung)
+
+# OLED (oled_display.py): nur geänderte Bereiche senden, Bildrate begrenzen
+DISPLAY_MAX_FPS = 10
+# Font für den Glyphen-Blitter (wird beim Start einmal in den RAM geladen)
+FONT_PATH = "font5x8.bin"
+
+# Diagnoseseite (diagnostics.py): Taste aus PIN_CONFIG, langer Druck schaltet um
+DIAG_BUTTON = "connected_button"  # kurzer Druck: Twitch verbinden/trennen (wie bisher)
+DIAG_HOLD = 1.0                   # Sekunden gedrückt halten
+DIAG_INTERVAL = 0.5               # Sekunden zwischen Aktualisierungen der Seite
@@ -0,0 +1,104 @@
+# line_ring.py — Zeilen aus einem Byte-Strom zusammensetzen (IRC, "\r\n")
+# - Ringpuffer fester Größe: recv_into() schreibt direkt in den freien,
+#   zusammenhängenden Bereich, keine Kopie und keine Allokation je Chunk
+# - Angefangene Zeilen bleiben über Lesevorgänge hinweg erhalten; eine Zeile
+#   kann also beliebig über Chunk-Grenzen (auch über das Ring-Ende) laufen
+# - readline() liefert die nächste vollständige Zeile ohne "\r\n" als
+#   memoryview (gültig bis zum nächsten readline()/recv()). Liegt sie über
+#   dem Ring-Ende, wird sie einmal in einen Zeilenpuffer kopiert
+# - Nach "\n" wird nur über neu angekommene Bytes gesucht
+# - Zeilen länger als max_line werden verworfen (bis zum nächsten "\n") und in
+#   `overflows` gezählt; der Strom bleibt danach synchron
+
+class LineRing:
+    def __init__(self, size=4096, max_line=2048):
+        self._buf = bytearray(size)
+        self._mv = memoryview(self._buf)
+        self._line = bytearray(max_line)
+        self._line_mv = memoryview(self._line)
+        self.size = size
+        self.max_line = max_line
+        self._head = 0     # Beginn der nächsten Zeile
+        self._count = 0    # Bytes im Ring ab _head
+        self._scan = 0     # so viele Bytes ab _head sind schon ohne "\n" durchsucht
+        self._discard = False  # überlange Zeile: bis zum nächsten "\n" verwerfen
+
+        # Monitoring
+        self.lines = 0
+        self.overflows = 0
+
+    @property
+    def free(self):
+        return self.size - self._count
+
+    def clear(self):
+        self._head = 0
+        self._count = 0
+        self._scan = 0
+        self._discard = False
+
+    def recv(self, sock, limit=0):
+        """Einmal recv_into() in den freien Bereich (höchstens `limit` Bytes, 0 = so viel
+        Platz ist). Rückgabe wie recv_into(); Socket-Fehler gehen an den Aufrufer."""
+        if self._count == self.size:
+            self._drop_full()
+        size = self.size
+        tail = (self._head + self._count) % size
+        end = size if tail >= self._head else self._head
+        if limit and end - tail > limit:
+            end = tail + limit
+        n = sock.recv_into(self._mv[tail:end])
+        if n and n > 0:
+            self._count += n
+        return n
+
+    def _drop_full(self):
+        """Ring voll ohne Zeilenende: die angefangene Zeile ist zu lang -> verwerfen."""
+        self.overflows += 1
+        self._discard = True
+        self._head = (self._head + self._count) % self.size
+        self._count = 0
+        self._scan = 0
+
+    def readline(self):
+        """Nächste vollständige Zeile (ohne "\r\n") als memoryview, sonst None."""
+        buf = self._buf
+        size = self.size
+        while True:
+            head = self._head
+            count = self._count
+            k = self._scan
+            i = (head + k) % size
+            while k < count:
+                if buf[i] == 10:
+                    break
+                k += 1
+                i += 1
+                if i == size:
+                    i = 0
+            if k >= count:
+                self._scan = k
+                return None
+
+            # Zeile = k Bytes ab head, "\n" an Index i
+            self._head = (i + 1) % size
+            self._count = count - k - 1
+            self._scan = 0
+            if self._discard:
+                self._discard = False
+                continue
+            n = k
+            if n and buf[(head + n - 1) % size] == 13:
+                n -= 1
+            if n > self.max_line:
+                self.overflows += 1
+                continue
+            self.lines += 1
+            if head + n <= size:
+                return self._mv[head:head + n]
+            # über das Ring-Ende: in den Zeilenpuffer kopieren
+            first = size - head
+            line = self._line_mv
+            line[:first] = self._mv[head:size]
+            line[first:n] = self._mv[:n - first]
+            return line[:n]
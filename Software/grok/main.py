@@ -8,12 +8,49 @@ from config import (
     ZOOM_DEBOUNCE,
     BRIGHTNESS_DEBOUNCE,
     TWITCH_ZOOM_TIMEOUT,
+    ZOOM_QUEUE_SIZE,
     DISPLAY_WIDTH,
     DISPLAY_HEIGHT,
+    WATCHDOG_TIMEOUT,
+    STALL_BUDGETS,
+    GC_MIN_FREE,
+    GC_MAX_INTERVAL,
+    MEM_REPORT_INTERVAL,
+    LOG_FLUSH_LINES,
+    DISPLAY_MAX_FPS,
+    FONT_PATH,
+    DIAG_BUTTON,
+    DIAG_HOLD,
+    DIAG_INTERVAL,
+    TWITCH_READ_BUDGET,
+    TWITCH_READ_TIME,
+    TWITCH_RX_RING,
+    TWITCH_MAX_LINE,
+    TWITCH_CONNECT_TIMEOUT,
+    TWITCH_JOIN_TIMEOUT,
+    TWITCH_REVALIDATE,
+    TWITCH_TOKEN_MARGIN,
+    TWITCH_BACKOFF_BASE,
+    TWITCH_BACKOFF_MAX,
+    TWITCH_PING_INTERVAL,
+    TWITCH_PONG_TIMEOUT,
+    TWITCH_DEDUP,
+    NTP_SERVER,
+    NTP_TIMEOUT,
+    NETMUX_SLOTS,
+    NETMUX_TICK_BUDGET,
+    NETMUX_MAX_SKIP,
 )
 from hardware_setup import setup_hardware
 from visca_commands import ViscaCamera
 from twitch_integration import TwitchController
+from stall_guard import StallGuard
+from mem_monitor import MemMonitor
+from log import log
+from oled_display import StatusDisplay, GlyphFont
+from zoom_queue import ZoomQueue, QUEUE_FULL, CHANGED_CURRENT, CHANGED_NEXT
+from diagnostics import LoopStats, DiagPage, PageButton, SHORT, LONG
+from netmux import NetMux
 
 
 class SystemState:
@@ -38,10 +75,52 @@ def scale_adc_to_zoom(adc_value):
     return 30 - int((adc_value / 65535) * 29)
 
 
+# Vorformatierte Texte: in der Schleife keine String-Formatierung (Heap)
+BRIGHT_TEXT = tuple("Bright: {}".format(b) for b in range(21))
+ZOOM_TEXT = tuple("Zoom: {}x".format(z) for z in range(31))
+ZOOM_OVERLAY_TEXT = tuple("{:2d}x".format(z) for z in range(31))
+
+
 # ---------- Setup ----------
 pins, uart, i2c, oled, encoder, poti = setup_hardware()
 visca = ViscaCamera(uart)
 
+# OLED-Felder (Position, Breite in Zeichen)
+# Font einmal in den RAM laden; ohne Datei zeichnet oled.text() wie bisher
+try:
+    font = GlyphFont(FONT_PATH)
+except OSError as e:
+    font = None
+    log.warn("Font nicht geladen:", FONT_PATH, e)
+display = StatusDisplay(oled, DISPLAY_WIDTH, DISPLAY_HEIGHT, DISPLAY_MAX_FPS, font)
+F_LIVE = display.add_field(0, 0, 6)
+F_AF = display.add_field(0, DISPLAY_HEIGHT - 10, 2)
+F_BRIGHT = display.add_field(50, DISPLAY_HEIGHT - 30, 10)
+F_ZOOM = display.add_field(50, DISPLAY_HEIGHT - 20, 9)
+F_MODE = display.add_field(50, DISPLAY_HEIGHT - 10, 6)
+F_TW1 = display.add_field(0, 10, 21)
+F_TW2 = display.add_field(0, 20, 21)
+
+# Diagnoseseite (zweite OLED-Seite, per Langdruck auf DIAG_BUTTON)
+# Warteschlange für Zoom-Einlösungen: jede bekommt einen festen Slot
+zoom_queue = ZoomQueue(ZOOM_QUEUE_SIZE, TWITCH_ZOOM_TIMEOUT)
+
+stats = LoopStats()
+diag = DiagPage(display, stats, visca, "IRC", DIAG_INTERVAL, zoom_queue)
+
+# Watchdog: Bericht vom letzten Hänger zeigen, dann scharf schalten
+guard = StallGuard(WATCHDOG_TIMEOUT)
+stall_report = guard.last_report()
+if stall_report:
+    guard.show_report(oled, stall_report)
+    display.invalidate()  # Bericht wurde direkt aufs OLED gemalt
+guard.start()
+
+# Heap-Überwachung: Low-Water je Schleifen-Abschnitt, GC nur im Leerlauf
+MEM_TWITCH, MEM_BUTTONS, MEM_ZOOM, MEM_OLED = range(4)
+mem = MemMonitor(("twitch", "buttons", "zoom", "oled"), GC_MIN_FREE, GC_MAX_INTERVAL)
+last_mem_report = time.monotonic()
+
 # Secrets
 try:
     with open("secrets.json", "r") as f:
@@ -50,14 +129,27 @@ except Exception:
     secrets = {}
 
 # WiFi verbinden (optional log)
+guard.enter("wifi", STALL_BUDGETS["wifi"], persist=True)
 try:
     if not wifi.radio.connected:
-        wifi.radio.connect(secrets["wifi"]["ssid"], secrets["wifi"]["password"])
-        print("Verbunden mit WiFi. IP:", wifi.radio.ipv4_address)
+        wifi.radio.connect(secrets["wifi"]["ssid"], secrets["wifi"]["password"],
+                           timeout=STALL_BUDGETS["wifi"] - 1)
+        log.info("Verbunden mit WiFi. IP:", wifi.radio.ipv4_address)
 except Exception as e:
-    print("WiFi-Verbindung fehlgeschlagen:", e)
-
-twitch = TwitchController(oled, secrets)
+    log.error("WiFi-Verbindung fehlgeschlagen:", e)
+guard.leave()
+
+# Alle Netz-Eingänge über den Multiplexer: gelesen wird nur, was bereit ist
+mux = NetMux(NETMUX_SLOTS, NETMUX_TICK_BUDGET, NETMUX_MAX_SKIP)
+twitch = TwitchController(secrets, guard=guard, stats=stats,
+                          mux=mux, budget=TWITCH_READ_BUDGET, rx_size=TWITCH_RX_RING,
+                          max_line=TWITCH_MAX_LINE, read_time=TWITCH_READ_TIME,
+                          connect_timeout=TWITCH_CONNECT_TIMEOUT, join_timeout=TWITCH_JOIN_TIMEOUT,
+                          ntp_server=NTP_SERVER, ntp_timeout=NTP_TIMEOUT,
+                          revalidate=TWITCH_REVALIDATE, token_margin=TWITCH_TOKEN_MARGIN,
+                          backoff_base=TWITCH_BACKOFF_BASE, backoff_max=TWITCH_BACKOFF_MAX,
+                          ping_interval=TWITCH_PING_INTERVAL, pong_timeout=TWITCH_PONG_TIMEOUT,
+                          dedup=TWITCH_DEDUP)
 
 # LEDs Grundzustand
 pins["power_led_green"].value = True
@@ -70,9 +162,11 @@ pins["freeze_led_green"].value = True
 pins["freeze_led_red"].value = False
 
 # Kamera-Defaults
+guard.enter("power", STALL_BUDGETS["power"], persist=True)
 visca.set_power(True)
 visca.set_freeze(False)
 visca.set_autofocus(True)
+guard.leave()
 brightness = 4
 encoder.position = brightness
 visca.set_brightness(brightness)
@@ -80,33 +174,52 @@ visca.set_brightness(brightness)
 state = SystemState.MANUAL
 last_button = {
     "power_button": pins["power_button"].value,
-    "connected_button": pins["connected_button"].value,
     "focus_button": pins["focus_button"].value,
     "freeze_button": pins["freeze_button"].value,
 }
+# Kurz: Twitch verbinden/trennen, lang: Diagnoseseite
+page_button = PageButton(pins[DIAG_BUTTON], DIAG_HOLD)
 
 last_zoom_sent = None
 last_overlay_zoom = None
 last_viewer = ""
 zoom_override = None
-zoom_timeout = 0
 last_brightness_time = 0
+last_joined = False
+
+
+def set_connected_leds(joined):
+    # LED-Logik: bei dir war "rot an = verbunden" korrekt
+    global last_joined
+    last_joined = joined
+    pins["connected_led_green"].value = not joined
+    pins["connected_led_red"].value = joined
 
 
 def update_oled(zoom, autofocus, freeze, in_twitch):
-    oled.fill(0)
-    oled.text("Live" if not freeze else "Freeze", 0, 0, 1)
-    oled.text("AF" if autofocus else "MF", 0, DISPLAY_HEIGHT - 10, 1)
-    oled.text(f"Bright: {brightness}", 50, DISPLAY_HEIGHT - 30, 1)
-    oled.text(f"Zoom: {zoom}x", 50, DISPLAY_HEIGHT - 20, 1)  # IMMER anzeigen
-    oled.text("Twitch" if in_twitch else "Manual", 50, DISPLAY_HEIGHT - 10, 1)
-    oled.show()
+    # Nur Felder setzen; gezeichnet/gesendet wird in display.render() (nur Änderungen)
+    display.set(F_LIVE, "Live" if not freeze else "Freeze")
+    display.set(F_AF, "AF" if autofocus else "MF")
+    display.set(F_BRIGHT, BRIGHT_TEXT[brightness])
+    display.set(F_ZOOM, ZOOM_TEXT[zoom])  # IMMER anzeigen
+    display.set(F_MODE, "Twitch" if in_twitch else "Manual")
+    # Verbindungsaufbau / Gerätecode (Texte ändern sich nur bei Zustandswechseln)
+    display.set(F_TW1, twitch.status1 if in_twitch else "")
+    display.set(F_TW2, twitch.status2 if in_twitch else "")
 
 
+# Ab hier ordnet ein harter Watchdog-Reset der Hauptschleife zu
+guard.enter("loop", persist=True)
+
 while True:
     now = time.monotonic()
+    guard.feed()
+    mem.begin_tick()
+    stats.tick(now)
+    busy = False
 
     # ---------- Power ----------
+    guard.enter("power", STALL_BUDGETS["power"])
     if not pins["power_button"].value and last_button["power_button"]:
         if state == SystemState.OFF:
             state = SystemState.MANUAL
@@ -119,31 +232,33 @@ while True:
             pins["power_led_red"].value = True
             visca.set_power(False)
             twitch.disconnect()
+            zoom_queue.clear()
             pins["connected_led_green"].value = False
             pins["connected_led_red"].value = False
-            oled.fill(0); oled.show()
+            display.clear()
         time.sleep(0.1)
+    guard.leave()
 
     # ---------- Connected (Twitch) ----------
-    if state != SystemState.OFF and (not pins["connected_button"].value and last_button["connected_button"]):
+    guard.enter("twitch", STALL_BUDGETS["twitch"])
+    press = page_button.update(now)
+    if press == LONG:
+        diag.toggle(now)
+    elif press == SHORT and state != SystemState.OFF:
         if state == SystemState.MANUAL:
             state = SystemState.TWITCH
-            twitch.connect()
+            twitch.connect(now)  # Aufbau läuft schrittweise im Twitch-Abschnitt
         else:
             state = SystemState.MANUAL
             twitch.disconnect()
             visca.set_overlay_text("", line=0x1A)  # Zoomtext entfernen
             last_overlay_zoom = None
-        # LED-Logik: bei dir war "rot an = verbunden" korrekt
-        if twitch_is_connected(twitch):
-            pins["connected_led_green"].value = False
-            pins["connected_led_red"].value = True
-        else:
-            pins["connected_led_green"].value = True
-            pins["connected_led_red"].value = False
+        set_connected_leds(twitch_is_connected(twitch))
         time.sleep(0.1)
+    guard.leave()
 
     # ---------- Focus ----------
+    guard.enter("buttons", STALL_BUDGETS["buttons"])
     if state != SystemState.OFF and (not pins["focus_button"].value and last_button["focus_button"]):
         visca.set_autofocus(not visca.autofocus)
         pins["autofocus_led_green"].value = visca.autofocus
@@ -164,40 +279,92 @@ while True:
             brightness = max(0, min(20, pos))
             visca.set_brightness(brightness)
             last_brightness_time = now
+    guard.leave()
+    mem.mark(MEM_BUTTONS)
 
     # ---------- Twitch lesen ----------
-    if state == SystemState.TWITCH and twitch_is_connected(twitch):
-        r = twitch.receive_zoom_command()
-        if r:
+    guard.enter("twitch", STALL_BUDGETS["twitch"])
+    if state == SystemState.TWITCH:
+        if twitch.step(now):
+            busy = True
+        if mux.service(now):
+            busy = True
+        joined = twitch_is_connected(twitch)
+        if joined != last_joined:
+            set_connected_leds(joined)
+        # Alle Einlösungen dieses Ticks in Ankunftsreihenfolge einreihen;
+        # Overlay/Zoom folgen im Zoom-Abschnitt
+        r = twitch.pop_command()
+        while r:
+            busy = True
             zoom_val, viewer = r
-            zoom_override = zoom_val
-            zoom_timeout = now + TWITCH_ZOOM_TIMEOUT
-            last_viewer = viewer
+            pos = zoom_queue.push(zoom_val, str(viewer)[:10].encode("utf-8"), now)
+            if pos == QUEUE_FULL:
+                stats.dropped += 1
+                log.warn("Zoom-Warteschlange voll, verworfen:", viewer)
+            else:
+                log.info("Zoom-Warteschlange: Position", pos, viewer)
+            r = twitch.pop_command()
+    guard.leave()
+    mem.mark(MEM_TWITCH)
+
+    # ---------- Warteschlange: Slots weiterschalten, Overlay einmal pro Tick ----------
+    guard.enter("zoom", STALL_BUDGETS["zoom"])
+    changed = zoom_queue.update(now)
+    if changed & CHANGED_CURRENT:
+        if zoom_queue.active:
+            zoom_override = zoom_queue.zoom
+            last_viewer = zoom_queue.viewer()
             # Overlay: KAMERAKIND + Name
             visca.set_overlay_text("KAMERAKIND:", line=0x10)
-            visca.set_overlay_text(str(viewer)[:10], line=0x11)
-
-    # ---------- Override Timeout ----------
-    if zoom_override is not None and now > zoom_timeout:
-        zoom_override = None
-        last_viewer = ""
-        visca.set_overlay_text("", line=0x10)
-        visca.set_overlay_text("", line=0x11)
+            visca.set_overlay_text(last_viewer, line=0x11)
+        else:
+            zoom_override = None
+            last_viewer = ""
+            visca.set_overlay_text("", line=0x10)
+            visca.set_overlay_text("", line=0x11)
+    if changed & CHANGED_NEXT:
+        nxt = zoom_queue.next_viewer()
+        visca.set_overlay_text((">" + nxt) if nxt else "", line=0x12)
 
     # ---------- Zoom berechnen & anwenden ----------
     zoom_now = zoom_override if zoom_override is not None else scale_adc_to_zoom(poti.value)
     if state != SystemState.OFF and zoom_now != last_zoom_sent:
         visca.set_zoom(zoom_now)
         last_zoom_sent = zoom_now
+        busy = True
 
     # Twitch: Zoomzahl im Kamera-Overlay nur wenn verbunden
     if state == SystemState.TWITCH and twitch_is_connected(twitch):
         if zoom_now != last_overlay_zoom:
-            visca.set_overlay_text(f"{zoom_now:2d}x", line=0x1A)  # oder visca.set_zoom_level(...)
+            visca.set_overlay_text(ZOOM_OVERLAY_TEXT[zoom_now], line=0x1A)  # oder visca.set_zoom_level(...)
             last_overlay_zoom = zoom_now
+    guard.leave()
+    mem.mark(MEM_ZOOM)
 
     # ---------- OLED ----------
+    guard.enter("oled", STALL_BUDGETS["oled"])
     update_oled(zoom_now, visca.autofocus, visca.freeze, state == SystemState.TWITCH)
+    diag.update(now)
+    display.render(now)
+    guard.leave()
+    mem.mark(MEM_OLED)
+
+    # ---------- Leerlauf-Fenster: GC, Speicherbericht, Log auf die Konsole ----------
+    if not busy:
+        if state == SystemState.TWITCH:
+            guard.enter("twitch", STALL_BUDGETS["twitch"])
+            twitch.maintain(now)  # stündliche Token-Validierung (HTTPS) nur hier
+            guard.leave()
+        mem.idle(now)
+        if (now - last_mem_report) > MEM_REPORT_INTERVAL:
+            for line in mem.report():
+                log.info(line)
+            log.info("QUEUE tiefe/bedient/max_wait:", zoom_queue.depth, zoom_queue.served,
+                     int(zoom_queue.max_wait))
+            log.info("IRC rtt_ms/reconnects:", twitch.rtt_ms, twitch.reconnects)
+            last_mem_report = now
+        log.flush(LOG_FLUSH_LINES)
 
     # ---------- Buttons-State ----------
     for k in last_button:
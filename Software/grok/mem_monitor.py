@@ -0,0 +1,62 @@
+# mem_monitor.py — Heap-Überwachung und GC nur in Leerlauf-Fenstern
+# - Low-Water-Marke von gc.mem_free() je Subsystem (Stichprobe alle N Ticks)
+# - gc.collect() nur, wenn die Schleife ein Leerlauf-Fenster meldet und
+#   der freie Heap unter die Reserve fällt (oder das Intervall abgelaufen ist)
+# - Verhindert, dass CircuitPython mitten im Hot-Path selbst sammeln muss
+
+import gc
+import time
+
+
+class MemMonitor:
+    def __init__(self, subsystems, min_free, max_interval, sample_every=20):
+        self.subsystems = subsystems
+        self.min_free = min_free
+        self.max_interval = max_interval
+        self.sample_every = sample_every
+
+        n = len(subsystems)
+        self.low = [0x3FFFFFFF] * n
+        self.collections = 0
+        self.last_collect = time.monotonic()
+        self.last_collect_ms = 0
+
+        self._tick = 0
+        self._sample = False
+
+    def begin_tick(self):
+        """Zu Beginn jedes Schleifendurchlaufs: entscheidet, ob gemessen wird."""
+        self._tick += 1
+        self._sample = self._tick >= self.sample_every
+        if self._sample:
+            self._tick = 0
+
+    def mark(self, idx):
+        """Nach einem Subsystem: Low-Water-Marke aktualisieren (nur in Stichproben-Ticks)."""
+        if self._sample:
+            free = gc.mem_free()
+            if free < self.low[idx]:
+                self.low[idx] = free
+
+    def idle(self, now):
+        """
+        Leerlauf-Fenster der Schleife: sammelt, wenn die Reserve unterschritten
+        oder das Maximalintervall abgelaufen ist. Rückgabe True, wenn gesammelt wurde.
+        """
+        if gc.mem_free() >= self.min_free and (now - self.last_collect) < self.max_interval:
+            return False
+        t0 = time.monotonic()
+        gc.collect()
+        self.last_collect = time.monotonic()
+        self.last_collect_ms = int((self.last_collect - t0) * 1000)
+        self.collections += 1
+        return True
+
+    def report(self):
+        """Zeilen für Konsole/Netz: Low-Water je Subsystem, aktueller Heap, GC-Zähler."""
+        lines = ["MEM free={} gc={} last_gc={}ms".format(
+            gc.mem_free(), self.collections, self.last_collect_ms)]
+        for i, name in enumerate(self.subsystems):
+            low = self.low[i]
+            lines.append("MEM low[{}]={}".format(name, low if low != 0x3FFFFFFF else "-"))
+        return lines
@@ -0,0 +1,263 @@
+# oled_display.py — Dirty-Region-Renderer für das SSD1306 mit Frameraten-Begrenzung
+# - Textfelder werden einmal registriert (Position + Breite in Zeichen)
+# - set() markiert ein Feld nur dann als "dirty", wenn sich der Text ändert
+# - render() zeichnet nur geänderte Felder neu und schickt nur die betroffenen
+#   SSD1306-Pages/Spalten über I2C (statt immer des ganzen 1-KB-Frames)
+# - max_fps begrenzt die Bildrate; ohne Änderung entfällt show() komplett
+# - GlyphFont: font5x8.bin einmal als bytes im RAM, Glyphen und Icons werden
+#   spaltenweise direkt in den SSD1306-Puffer kopiert (kein Dateizugriff,
+#   keine Pixel-Einzeloperationen)
+# - Seiten: Felder gehören zu einer Seite, gezeichnet wird nur die sichtbare
+
+import time
+
+_SET_COL_ADDR = 0x21
+_SET_PAGE_ADDR = 0x22
+_CHAR_W = 6   # 5 px Glyphe + 1 px Abstand (adafruit_framebuf)
+_CHAR_H = 8
+
+
+def row_bitmap_to_columns(rows):
+    """8x8-Bitmap in Zeilenform (MSB links) -> 8 Spaltenbytes (LSB oben) fürs Blitten."""
+    cols = bytearray(8)
+    for y in range(8):
+        row = rows[y]
+        for x in range(8):
+            if row & (0x80 >> x):
+                cols[x] |= 1 << y
+    return bytes(cols)
+
+
+class GlyphFont:
+    """font5x8.bin (2 Byte Kopf + 5 Spaltenbytes je Zeichen) komplett im RAM."""
+
+    def __init__(self, path="font5x8.bin"):
+        with open(path, "rb") as f:
+            self.data = f.read()
+        self.width = self.data[0]
+        self.height = self.data[1]
+        self.count = (len(self.data) - 2) // self.width
+
+    def glyph_offset(self, ch):
+        code = ord(ch)
+        if code >= self.count:
+            code = 63  # '?'
+        return 2 + code * self.width
+
+
+class Blitter:
+    """Spaltenweises Schreiben von 8 px hohen Bitmaps direkt in den SSD1306-Puffer."""
+
+    def __init__(self, oled, width, height, font=None):
+        self.buf = oled.buffer
+        self.width = width
+        self.height = height
+        # SSD1306_I2C: buffer[0] ist das Steuerbyte, Pixel ab Index 1
+        self.offset = len(self.buf) - width * (height // 8)
+        self.font = font
+
+    def _column(self, x, y, bits):
+        """Eine 8-px-Spalte an (x, y) setzen; Hintergrund der Spalte wird überschrieben."""
+        buf = self.buf
+        page = y >> 3
+        shift = y & 7
+        i = self.offset + page * self.width + x
+        if shift == 0:
+            buf[i] = bits
+            return
+        keep = (1 << shift) - 1
+        buf[i] = (buf[i] & keep) | ((bits << shift) & 0xFF)
+        if page + 1 < self.height >> 3:
+            i += self.width
+            buf[i] = (buf[i] & ~keep & 0xFF) | (bits >> (8 - shift))
+
+    def columns(self, x, y, cols):
+        """Icon (Spaltenbytes) blitten."""
+        for k in range(len(cols)):
+            if x + k >= self.width:
+                break
+            self._column(x + k, y, cols[k])
+
+    def text(self, x, y, text, width_px):
+        """Text blitten und den Rest des Feldes (bis width_px) leeren."""
+        data = self.font.data
+        gw = self.font.width
+        end = min(x + width_px, self.width)
+        for ch in text:
+            if x >= end:
+                return
+            gi = self.font.glyph_offset(ch)
+            for k in range(gw):
+                if x >= end:
+                    return
+                self._column(x, y, data[gi + k])
+                x += 1
+            if x < end:
+                self._column(x, y, 0)  # 1 px Zeichenabstand
+                x += 1
+        while x < end:
+            self._column(x, y, 0)
+            x += 1
+
+
+class StatusDisplay:
+    def __init__(self, oled, width, height, max_fps=10, font=None):
+        self.oled = oled
+        self.width = width
+        self.height = height
+        self.pages = height // 8
+        self.min_interval = 1.0 / max_fps if max_fps else 0.0
+
+        # Felder: parallele Listen (x, y, Breite in px, Seite, aktueller Text, dirty)
+        self.page = 0
+        self._fpage = bytearray(0)
+        self._fx = []
+        self._fy = []
+        self._fw = []
+        self._text = []
+        self._dirty = bytearray(0)
+        self._any_dirty = False
+
+        # Dirty-Box in Spalten/Pages (inklusive); x0 > x1 heißt leer
+        self._x0 = width
+        self._x1 = -1
+        self._p0 = self.pages
+        self._p1 = -1
+
+        self.last_render = -self.min_interval
+        self.frames = 0
+        self.bytes_sent = 0
+
+        # Partielles Senden braucht die Interna von adafruit_ssd1306.SSD1306_I2C
+        self._partial = (hasattr(oled, "i2c_device") and hasattr(oled, "write_cmd")
+                         and hasattr(oled, "buffer"))
+        # Mit Font: Texte direkt in den Puffer blitten statt oled.text()
+        self.blit = Blitter(oled, width, height, font) if (font and hasattr(oled, "buffer")) else None
+
+    # ---------- Felder ----------
+    def add_field(self, x, y, chars, page=0):
+        """Registriert ein Textfeld und liefert dessen Index für set()."""
+        self._fpage.append(page)
+        self._fx.append(x)
+        self._fy.append(y)
+        self._fw.append(min(chars * _CHAR_W, self.width - x))
+        self._text.append("")
+        self._dirty.append(0)
+        return len(self._fx) - 1
+
+    def set(self, idx, text):
+        """Neuer Text für ein Feld; unveränderter Text kostet nur einen Vergleich."""
+        old = self._text[idx]
+        if text is old or text == old:
+            return
+        self._text[idx] = text
+        self._dirty[idx] = 1
+        if self._fpage[idx] == self.page:
+            self._any_dirty = True
+
+    def mark_region(self, x, y, w, h):
+        """Für direkt ins Framebuffer gezeichnete Elemente (Balken, Icons)."""
+        if w <= 0 or h <= 0:
+            return
+        x1 = min(x + w, self.width) - 1
+        p0 = y // 8
+        p1 = min((y + h - 1) // 8, self.pages - 1)
+        if x < self._x0:
+            self._x0 = max(x, 0)
+        if x1 > self._x1:
+            self._x1 = x1
+        if p0 < self._p0:
+            self._p0 = p0
+        if p1 > self._p1:
+            self._p1 = p1
+        self._any_dirty = True
+
+    def invalidate(self):
+        """Alles neu zeichnen (z.B. nachdem jemand anderes direkt aufs OLED geschrieben hat)."""
+        self.oled.fill(0)
+        for i in range(len(self._dirty)):
+            self._dirty[i] = 1
+        self.mark_region(0, 0, self.width, self.height)
+
+    def show_page(self, page):
+        """Seite wechseln: Display leeren und alle Felder der neuen Seite zeichnen."""
+        if page == self.page:
+            return
+        self.page = page
+        self.invalidate()
+
+    def clear(self):
+        """Display sofort leeren; Felder werden beim nächsten set() neu gezeichnet."""
+        for i in range(len(self._text)):
+            self._text[i] = ""
+            self._dirty[i] = 0
+        self.oled.fill(0)
+        self.mark_region(0, 0, self.width, self.height)
+        self.render(force=True)
+
+    # ---------- Rendern ----------
+    def render(self, now=None, force=False):
+        """Geänderte Felder zeichnen und nur die Dirty-Box senden. True, wenn gesendet wurde."""
+        if not self._any_dirty:
+            return False
+        if now is None:
+            now = time.monotonic()
+        if not force and (now - self.last_render) < self.min_interval:
+            return False
+
+        oled = self.oled
+        dirty = self._dirty
+        fpage = self._fpage
+        page = self.page
+        for i in range(len(dirty)):
+            if dirty[i] and fpage[i] == page:
+                x = self._fx[i]
+                y = self._fy[i]
+                w = self._fw[i]
+                if self.blit:
+                    self.blit.text(x, y, self._text[i], w)
+                else:
+                    oled.fill_rect(x, y, w, _CHAR_H, 0)
+                    oled.text(self._text[i], x, y, 1)
+                self.mark_region(x, y, w, _CHAR_H)
+                dirty[i] = 0
+
+        if self._x1 >= self._x0 and self._p1 >= self._p0:
+            self._push(self._x0, self._x1, self._p0, self._p1)
+
+        self._x0 = self.width
+        self._x1 = -1
+        self._p0 = self.pages
+        self._p1 = -1
+        self._any_dirty = False
+        self.last_render = now
+        self.frames += 1
+        return True
+
+    def _push(self, x0, x1, p0, p1):
+        oled = self.oled
+        if not self._partial:
+            oled.show()
+            self.bytes_sent += self.width * self.pages
+            return
+
+        oled.write_cmd(_SET_COL_ADDR)
+        oled.write_cmd(x0)
+        oled.write_cmd(x1)
+        oled.write_cmd(_SET_PAGE_ADDR)
+        oled.write_cmd(p0)
+        oled.write_cmd(p1)
+
+        # buffer[0] ist das I2C-Steuerbyte 0x40, Pixeldaten ab Index 1.
+        # Je Page: Byte vor dem Ausschnitt kurz durch 0x40 ersetzen -> ohne Kopie senden
+        buf = oled.buffer
+        dev = oled.i2c_device
+        n = x1 - x0 + 1
+        for p in range(p0, p1 + 1):
+            start = 1 + p * self.width + x0
+            saved = buf[start - 1]
+            buf[start - 1] = 0x40
+            with dev:
+                dev.write(buf, start=start - 1, end=start + n)
+            buf[start - 1] = saved
+            self.bytes_sent += n
@@ -1,20 +1,44 @@
 # twitch_integration.py — Twitch Device-Flow + IRC (CircuitPython)
-# - Device Code Flow: zeigt URL+Code in Konsole & auf OLED, pollt bis bestätigt
-# - Token-Handling: validate -> refresh -> device flow fallback
-# - Speichert Access-/Refresh-Token in secrets.json (falls RW)
-# - Blocking connect (5s) -> danach non-blocking recv_into(...)
-# - Liest NUR Channel-Points (custom-reward-id == TWITCH_CUSTOM_REWARD_ID)
-# - Rückgabe (zoom:int, sender:str) bei Erfolg, sonst None
+# - Verbindungsaufbau als Zustandsautomat: connect() startet, step() macht je
+#   Tick höchstens einen Schritt (validate -> refresh -> device flow -> IRC
+#   connect -> JOIN), jeder mit eigener Frist; die Hauptschleife läuft weiter
+# - Device Code Flow: URL+Code in Konsole & als zwei Statuszeilen fürs OLED,
+#   gepollt wird über eine Frist statt sleep()
+# - Speichert Access-/Refresh-Token in secrets.json (falls RW), dazu die
+#   absolute Ablaufzeit: mit per SNTP gestellter Uhr geht der Aufbau ohne
+#   HTTPS direkt zum IRC; validiert wird stündlich im Leerlauf (maintain())
+# - IRC-Socket non-blocking verbinden -> danach non-blocking recv_into(...)
+# - Mit NetMux (netmux.py) meldet sich der IRC-Socket dort an; gelesen wird
+#   nur, wenn er bereit bzw. fällig ist
+# - Empfang über einen Ringpuffer (line_ring.py): Zeilen über Chunk-Grenzen
+#   bleiben ganz, je Tick wird alles Verfügbare gelesen (Byte- und Zeitbudget)
+# - Liest NUR Channel-Points (custom-reward-id == TWITCH_CUSTOM_REWARD_ID);
+#   geprüft wird auf Bytes, gewöhnlicher Chat wird weder dekodiert noch zerlegt
+# - Jede Einlösung (zoom:int, sender:str) in Reihenfolge über pop_command(),
+#   doppelt zugestellte (gleiche Message-ID, z.B. nach Reconnect) nur einmal
+# - Überwachte Verbindung: eigener PING mit RTT, PONG-Frist erkennt tote
+#   Links, RECONNECT wechselt sofort den Socket, sonst neuer Versuch mit
+#   exponentiellem Backoff und Jitter
+# - Optional: StallGuard -> jeder HTTPS-Schritt (bleibt in adafruit_requests
+#   blockierend) ist eine eigene Watchdog-Stufe
 
 import wifi
 import socketpool
 import ssl
 import adafruit_requests
 import time
-import re
 import json
+import random
 
-from config import TWITCH_CHANNEL, TWITCH_CUSTOM_REWARD_ID
+try:
+    import adafruit_ntp
+    import rtc
+except ImportError:
+    adafruit_ntp = None
+
+from config import TWITCH_CHANNEL, TWITCH_CUSTOM_REWARD_ID, STALL_BUDGETS
+from log import log, DEBUG_ON
+from line_ring import LineRing
 
 OAUTH_BASE = "https://id.twitch.tv/oauth2"
 DEVICE_CODE_URL = OAUTH_BASE + "/device"
@@ -22,11 +46,78 @@ TOKEN_URL = OAUTH_BASE + "/token"
 VALIDATE_URL = "https://id.twitch.tv/oauth2/validate"
 SCOPES = "chat:read chat:edit"
 
+# Zustände des Verbindungsaufbaus: step() macht je Tick höchstens einen Schritt
+IDLE = 0
+CLOCK = 1        # SNTP: Uhrzeit für den Token-Cache (einmal je Start)
+VALIDATE = 2     # Token-Cache, sonst HTTPS: Token prüfen
+REFRESH = 3      # HTTPS: Refresh-Token einlösen
+DEVICE_INIT = 4  # HTTPS: Device Code holen
+DEVICE_POLL = 5  # HTTPS alle `interval` s, dazwischen nichts
+IRC_CONNECT = 6  # Socket anlegen
+IRC_WAIT = 7     # non-blocking connect läuft
+JOINING = 8      # PASS/NICK/JOIN gesendet, warte auf Bestätigung
+JOINED = 9       # überwacht: PING/PONG mit RTT, RECONNECT
+FAILED = 10      # dauerhafter Fehler (Login, Device Flow): kein neuer Versuch
+BACKOFF = 11     # Verbindung verloren: Wartezeit bis zum nächsten Versuch
+
+_CONNECTING = (11, 114, 115)  # EAGAIN, EALREADY, EINPROGRESS
+_CONNECTED = (106,)           # EISCONN
+_TIMEOUT_TEXT = {IRC_WAIT: "Connect Timeout", JOINING: "JOIN Timeout"}
+# Zustände, in denen die Brotkrume einer Phase (_phase) stehen bleibt
+_PHASE_STATES = (VALIDATE, REFRESH, DEVICE_INIT, DEVICE_POLL, IRC_WAIT)
+_EPOCH_VALID = 1600000000  # time.time() darunter: Uhr nicht gestellt
+
 
 class TwitchController:
-    def __init__(self, oled, secrets):
-        self.oled = oled
+    def __init__(self, secrets, guard=None, stats=None, mux=None, budget=4096,
+                 rx_size=4096, max_line=2048, read_time=0.02, max_events=16,
+                 connect_timeout=5.0, join_timeout=10.0, ntp_server="pool.ntp.org",
+                 ntp_timeout=2, revalidate=3600, token_margin=300, backoff_base=1.0,
+                 backoff_max=60.0, ping_interval=60.0, pong_timeout=10.0, dedup=32):
         self.secrets = secrets
+        self.guard = guard
+        self.stats = stats  # diagnostics.LoopStats (optional)
+        self.mux = mux
+        self.budget = budget  # Bytes je Tick
+        self.read_time = read_time  # Sekunden je Tick
+        self.max_events = max_events
+        self.connect_timeout = connect_timeout
+        self.join_timeout = join_timeout
+        self.ntp_server = ntp_server
+        self.ntp_timeout = ntp_timeout
+        self.revalidate = revalidate      # Sekunden zwischen Validierungen im Hintergrund
+        self.token_margin = token_margin  # Restlaufzeit, ab der der Cache nicht mehr reicht
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.ping_interval = ping_interval
+        self.pong_timeout = pong_timeout
+
+        # Verbindungsaufbau
+        self.state = IDLE
+        self.deadline = 0      # 0 = ohne Frist
+        self.status1 = ""      # zwei OLED-Zeilen (max. 21 Zeichen)
+        self.status2 = ""
+        self._refreshed = False
+        self._dev_code = None
+        self._dev_interval = 5
+        self._dev_next = 0
+        self._clock_tried = False
+        self._token_cached = False  # Token ohne HTTPS aus dem Cache übernommen
+        self._next_revalidate = 0
+        self._phase_crumb = None    # Brotkrume der laufenden Phase (None = keine)
+        self._phase_outer = None    # Brotkrume von davor, kommt am Phasenende zurück
+
+        # Überwachung / Wiederverbinden
+        self._attempt = 0          # Fehlversuche seit dem letzten JOIN (Backoff-Stufe)
+        self._retry_at = 0
+        self._ping_sent = 0        # Zeitpunkt des offenen PING, 0 = keiner offen
+        self._next_ping = 0
+        self._reconnect_req = False  # Twitch hat RECONNECT geschickt
+        self.rtt_ms = -1           # letzte gemessene PING-Umlaufzeit
+        self.reconnects = 0
+        # zuletzt gesehene Message-IDs (über Reconnects hinweg): keine Doppel-Einlösung
+        self._seen = [None] * dedup
+        self._seen_i = 0
 
         self.pool = socketpool.SocketPool(wifi.radio)
         self.sock = None
@@ -34,7 +125,12 @@ class TwitchController:
         self.joined_channel = False
 
         self.requests = None
-        self._rx_buf = bytearray(4096)
+        self._rx = LineRing(rx_size, max_line)  # IRC-Zeilen über Chunk-Grenzen
+        self.pending = []  # (zoom, sender) in Ankunftsreihenfolge
+        # Byte-Muster für den schnellen Pfad (einmal bauen)
+        self._reward_pat = b"custom-reward-id=" + TWITCH_CUSTOM_REWARD_ID.encode()
+        self._join_pat = b" JOIN #" + TWITCH_CHANNEL.encode()
+        self.last_rx = 0  # Zeitpunkt des letzten Empfangs
 
     # ---------- Status ----------
     def is_socket_open(self):
@@ -43,6 +139,30 @@ class TwitchController:
     def is_joined(self):
         return self.joined_channel
 
+    # ---------- Watchdog ----------
+    def _stage(self, name, persist=True):
+        if self.guard:
+            self.guard.push(name, STALL_BUDGETS.get(name), persist=persist)
+
+    def _stage_done(self):
+        if self.guard:
+            self.guard.pop()
+
+    def _phase(self, name):
+        """Brotkrume für eine ganze Phase (z.B. Anmeldung) einmal ins NVM statt je
+        Anfrage: Device-Code-Polling wären sonst Hunderte Flash-Schreibzugriffe."""
+        if self.guard and self._phase_crumb != name:
+            prev = self.guard.crumb(name)
+            if self._phase_crumb is None:
+                self._phase_outer = prev
+            self._phase_crumb = name
+
+    def _phase_end(self):
+        """Phase vorbei: die Brotkrume von davor einmal wiederherstellen."""
+        if self._phase_crumb is not None:
+            self._phase_crumb = None
+            self.guard.crumb(self._phase_outer)
+
     # ---------- HTTP Session ----------
     def _requests(self):
         if self.requests is None:
@@ -50,10 +170,31 @@ class TwitchController:
             self.requests = adafruit_requests.Session(self.pool, ctx)
         return self.requests
 
+    def _get(self, url, **kwargs):
+        self._phase("twitch_auth")
+        self._stage("twitch_auth", persist=False)
+        try:
+            return self._requests().get(url, **kwargs)
+        finally:
+            self._stage_done()
+
+    def _post(self, url, **kwargs):
+        self._phase("twitch_auth")
+        self._stage("twitch_auth", persist=False)
+        try:
+            return self._requests().post(url, **kwargs)
+        finally:
+            self._stage_done()
+
     # ---------- Secrets speichern ----------
-    def _save_tokens(self, access_token, refresh_token, login=None):
+    def _save_tokens(self, access_token, refresh_token, login=None, expires=None):
+        """expires: absolute Ablaufzeit (Unix-Sekunden) für den Token-Cache, falls bekannt."""
         try:
+            if access_token != self.secrets.get("twitch_token") and expires is None:
+                expires = 0  # Ablaufzeit gehörte zum alten Token
             self.secrets["twitch_token"] = access_token
+            if expires is not None:
+                self.secrets["twitch_token_expires"] = int(expires)
             if refresh_token:
                 self.secrets["twitch_refresh_token"] = refresh_token
             if login:
@@ -67,241 +208,427 @@ class TwitchController:
             data.update(self.secrets)
             with open("secrets.json", "w") as f:
                 json.dump(data, f)
-            print("Tokens gespeichert (secrets.json).")
+            log.info("Tokens gespeichert (secrets.json).")
         except Exception as e:
-            print("Token-Speichern fehlgeschlagen:", e)
+            log.error("Token-Speichern fehlgeschlagen:", e)
 
     # ---------- Token Utilities ----------
     def _validate_token(self, token):
+        """HTTPS: (login, expires_in); (None, 0) = Token abgelehnt, (None, None) = Fehler."""
         if not token:
-            return (None, None)
+            return (None, 0)  # kein Token: wie abgelehnt (erneuern)
         try:
-            r = self._requests().get(VALIDATE_URL, headers={"Authorization": "OAuth " + token})
+            r = self._get(VALIDATE_URL, headers={"Authorization": "OAuth " + token})
             if r.status_code == 200:
                 d = r.json()
                 return (d.get("login"), d.get("expires_in"))
+            if r.status_code == 401:
+                return (None, 0)
         except Exception as e:
-            print("Validate-Fehler:", e)
+            log.warn("Validate-Fehler:", e)
         return (None, None)
 
     def _refresh_token(self):
+        """Ein HTTPS-Schritt: Refresh-Token einlösen. Rückgabe: neues Access-Token,
+        False = abgelehnt (bzw. kein Refresh-Token) -> Gerätecode, None = Netz-/Serverfehler.
+        Mit gestellter Uhr und bekanntem Login braucht es danach keine Validierung."""
         rt = self.secrets.get("twitch_refresh_token")
         cid = self.secrets.get("twitch_client_id")
         csec = self.secrets.get("twitch_client_secret")
         if not rt or not cid:
-            return None
+            return False
         try:
             data = {"grant_type": "refresh_token", "refresh_token": rt, "client_id": cid}
             if csec:
                 data["client_secret"] = csec
-            r = self._requests().post(TOKEN_URL, data=data)
+            r = self._post(TOKEN_URL, data=data)
             if r.status_code == 200:
                 d = r.json()
                 acc = d.get("access_token")
                 ref = d.get("refresh_token") or rt
-                login, _ = self._validate_token(acc)
-                self._save_tokens(acc, ref, login)
+                self._save_tokens(acc, ref, expires=_expires_at(d.get("expires_in")))
                 return acc
-            else:
-                print("Refresh-Fehler:", r.status_code)
+            log.warn("Refresh-Fehler:", r.status_code)
+            if r.status_code in (400, 401):
+                return False  # invalid_grant / ungültiges Refresh-Token
         except Exception as e:
-            print("Refresh-Exception:", e)
+            log.error("Refresh-Exception:", e)
         return None
 
-    def _show_device_code(self, user_code, verification_uri):
+    # ---------- Verbindungsaufbau (Zustandsautomat) ----------
+    def _set_status(self, line1, line2=""):
+        """Zwei Zeilen für das OLED (main zeigt sie im Twitch-Modus an) + Konsole."""
+        if line1 != self.status1 or line2 != self.status2:
+            self.status1 = line1
+            self.status2 = line2
+            if line1:
+                log.info(line1, line2)
+
+    def _go(self, state, now, timeout=0):
+        if state not in _PHASE_STATES:
+            self._phase_end()
+        self.state = state
+        self.deadline = now + timeout if timeout else 0
+
+    def _fail(self, line2):
+        log.error("Twitch Fehler:", line2)
+        self.disconnect()
+        self.state = FAILED
+        self._set_status("Twitch: Fehler", line2)
+
+    def _lost(self, now, reason):
+        """Verbindung verloren/gescheitert: Socket zu, neuer Versuch nach Backoff mit Jitter."""
+        log.warn("Twitch: Verbindung verloren:", reason)
+        self.disconnect()
+        delay = min(self.backoff_max, self.backoff_base * (1 << min(self._attempt, 10)))
+        delay *= 0.5 + random.random() * 0.5  # Jitter: nicht im Gleichschritt mit anderen
+        self._attempt += 1
+        self.reconnects += 1
+        self._retry_at = now + delay
+        self.state = BACKOFF
+        self._set_status("Twitch: getrennt", "{} -> {:.0f}s".format(reason, delay))
+
+    def _restart(self, now):
+        """Neuer Aufbau ab VALIDATE (Token meist aus dem Cache -> direkt IRC)."""
+        self._refreshed = False
+        self._token_cached = False
+        self._go(VALIDATE, now)
+        self._set_status("Twitch: Token...")
+
+    def connect(self, now=None):
+        """Verbindungsaufbau starten (non-blocking); weiter geht es mit step()."""
+        if now is None:
+            now = time.monotonic()
+        if self.sock or self.state not in (IDLE, FAILED):
+            log.info("Twitch: Bereits verbunden bzw. im Aufbau.")
+            return True
+        if not wifi.radio.connected:
+            log.warn("Twitch: Kein WiFi.")
+            self.state = FAILED
+            self._set_status("Twitch: Fehler", "kein WiFi")
+            return False
+        self._attempt = 0
+        self._restart(now)
+        if adafruit_ntp is not None and not self._clock_tried and _wall_time() is None:
+            self._go(CLOCK, now)
+        return True
+
+    def step(self, now):
+        """Einmal pro Tick: höchstens einen Schritt des Aufbaus ausführen.
+        Rückgabe: True, wenn etwas getan wurde (kein Leerlauf-Tick)."""
+        st = self.state
+        if st == IDLE or st == FAILED:
+            return False
+        if st == JOINED:
+            return self._supervise(now)
+        if st == BACKOFF:
+            if now < self._retry_at:
+                return False
+            self._restart(now)
+            return True
+        if self.deadline and now >= self.deadline and st != DEVICE_POLL:
+            self._lost(now, _TIMEOUT_TEXT.get(st, "Timeout"))
+            return True
+        if st == CLOCK:
+            self._step_clock(now)
+        elif st == VALIDATE:
+            self._step_validate(now)
+        elif st == REFRESH:
+            tok = self._refresh_token()
+            if tok:
+                self._refreshed = True
+                self._go(VALIDATE, now)
+            elif tok is None:
+                self._lost(now, "Refresh")  # Netz weg: später erneut, kein Gerätecode
+            else:
+                self._start_device_flow(now)
+        elif st == DEVICE_INIT:
+            self._step_device_init(now)
+        elif st == DEVICE_POLL:
+            if now < self._dev_next:
+                return False
+            self._step_device_poll(now)
+        elif st == IRC_CONNECT:
+            self._step_irc_connect(now)
+        elif st == IRC_WAIT:
+            self._step_irc_wait(now)
+        elif st == JOINING:
+            if self._reconnect_req:
+                return self._supervise(now)
+            if self.joined_channel:
+                self._go(JOINED, now)
+                self._attempt = 0
+                self._next_revalidate = now + self.revalidate
+                self._next_ping = now + self.ping_interval
+                self._set_status("Twitch: #" + TWITCH_CHANNEL)
+            else:
+                return False
+        return True
+
+    def _supervise(self, now):
+        """Verbunden: RECONNECT umsetzen, PING senden, toten Link am PONG-Termin erkennen."""
+        if self._reconnect_req:
+            # Zeilen bis hierher sind verarbeitet; sofort frischer Socket, kein Backoff
+            self._reconnect_req = False
+            log.info("Twitch: RECONNECT -> neuer Socket.")
+            self.disconnect()
+            self.reconnects += 1
+            self._restart(now)
+            return True
+        if self._ping_sent:
+            if now - self._ping_sent > self.pong_timeout:
+                self._lost(now, "kein PONG")
+                return True
+            return False
+        if now >= self._next_ping:
+            self._ping_sent = now
+            self._send_line("PING :rtt")
+            return True
+        return False
+
+    def _step_clock(self, now):
+        """Einmal je Start: Uhr per SNTP stellen (UDP, kein TLS). Ohne Uhr wird validiert."""
+        self._clock_tried = True
+        self._stage("twitch_ntp")
         try:
-            if not self.oled:
-                print("Gerätecode:", user_code, "URL:", verification_uri)
-                return
-            self.oled.fill(0)
-            self.oled.text("Twitch Login", 0, 0, 1)
-            self.oled.text("URL:", 0, 12, 1)
-            uri = verification_uri or ""
-            self.oled.text(uri[:20], 0, 22, 1)
-            self.oled.text(uri[20:40], 0, 32, 1)
-            self.oled.text(uri[40:60], 0, 42, 1)
-            self.oled.text("Code:", 0, 54, 1)
-            self.oled.text(user_code or "", 40, 54, 1)
-            self.oled.show()
+            ntp = adafruit_ntp.NTP(self.pool, server=self.ntp_server, tz_offset=0,
+                                   socket_timeout=self.ntp_timeout)
+            rtc.RTC().datetime = ntp.datetime
+            log.info("Uhrzeit per SNTP gestellt.")
         except Exception as e:
-            print("OLED-Fehler (Device-Code):", e)
+            log.warn("SNTP fehlgeschlagen:", e)
+        finally:
+            self._stage_done()
+        self._go(VALIDATE, now)
+
+    def _cache_valid(self, tok):
+        """Token laut gespeicherter Ablaufzeit sicher noch gültig (ohne Netz)."""
+        expires = self.secrets.get("twitch_token_expires")
+        wall = _wall_time()
+        return bool(tok and expires and wall and self.secrets.get("twitch_nick")
+                    and expires - wall > self.token_margin)
 
-    def _oled_info(self, line1, line2=""):
+    def _step_validate(self, now):
+        tok = self.secrets.get("twitch_token")
+        if self._cache_valid(tok):
+            self._token_cached = True
+            self._go(IRC_CONNECT, now)
+            self._set_status("Twitch: Chat...")
+            return
+        login, exp = self._validate_token(tok)
+        if login and exp and exp > 60:
+            self.secrets["twitch_nick"] = self.secrets.get("twitch_nick") or login
+            self._save_tokens(tok, self.secrets.get("twitch_refresh_token"),
+                              self.secrets["twitch_nick"], _expires_at(exp))
+            self._go(IRC_CONNECT, now)
+            self._set_status("Twitch: Chat...")
+        elif exp is None:
+            # Netz-/Serverfehler: nichts über das Token bekannt -> Backoff, nicht erneuern
+            self._lost(now, "Validate")
+        elif self._refreshed:
+            # frisch erneuertes Token ungültig -> Gerätecode statt Endlosschleife
+            self._start_device_flow(now)
+        else:
+            self._go(REFRESH, now)
+
+    def _start_device_flow(self, now):
+        if not self.secrets.get("twitch_client_id"):
+            self._fail("keine client_id")
+            return
+        self._go(DEVICE_INIT, now)
+
+    def _step_device_init(self, now):
+        """Device Code holen; danach pollt step() im Abstand `interval` (ohne zu warten)."""
+        cid = self.secrets.get("twitch_client_id")
         try:
-            if not self.oled:
-                print(line1, line2)
+            r = self._post(DEVICE_CODE_URL, data={"client_id": cid, "scope": SCOPES})
+            if r.status_code >= 500:
+                log.warn("Device-Code-Fehler (init):", r.status_code)
+                self._lost(now, "Device-Code")
+                return
+            if r.status_code != 200:
+                log.error("Device-Code-Fehler (init):", r.status_code)
+                self._fail("Device-Code " + str(r.status_code))
                 return
-            self.oled.fill(0)
-            self.oled.text(line1, 0, 0, 1)
-            if line2:
-                self.oled.text(line2, 0, 12, 1)
-            self.oled.show()
-        except Exception:
-            pass
-
-    def _device_code_flow(self):
+            info = r.json()
+        except Exception as e:
+            # Transportfehler: später erneut statt dauerhaft FAILED
+            log.warn("Device-Flow-Exception:", e)
+            self._lost(now, "Device-Code")
+            return
+        self._dev_code = info.get("device_code")
+        user_code = info.get("user_code") or ""
+        verification_uri = info.get("verification_uri") or "https://www.twitch.tv/activate"
+        verification_uri_complete = info.get("verification_uri_complete")
+        self._dev_interval = int(info.get("interval", 5))
+        self._dev_next = now + self._dev_interval
+        self._go(DEVICE_POLL, now, int(info.get("expires_in", 1800)))
+
+        log.info("=== Twitch Device Login ===")
+        log.info("Öffne am Handy/PC:", verification_uri)
+        if verification_uri_complete:
+            log.info("Direktlink:", verification_uri_complete)
+        log.info("Gib diesen Code ein:", user_code)
+        # Der Nutzer braucht die Anleitung jetzt, nicht erst im nächsten Leerlauf
+        log.flush()
+        uri = verification_uri.split("://", 1)[-1]
+        if uri.startswith("www."):
+            uri = uri[4:]
+        self._set_status(uri[:21], "Code: " + user_code)
+
+    def _step_device_poll(self, now):
+        if now >= self.deadline:
+            log.warn("Zeit abgelaufen, kein Token erhalten.")
+            self._fail("Code abgelaufen")
+            return
+        self._dev_next = now + self._dev_interval
         cid = self.secrets.get("twitch_client_id")
         csec = self.secrets.get("twitch_client_secret")
-        if not cid:
-            print("Kein twitch_client_id in secrets.json gefunden.")
-            return None
-
+        data = {
+            "client_id": cid,
+            "grant_type": "urn:ietf:params:oauth:grant-type:device_code",
+            "device_code": self._dev_code,
+        }
+        if csec:
+            data["client_secret"] = csec
         try:
-            # Schritt 1: Device Code holen
-            r = self._requests().post(DEVICE_CODE_URL, data={"client_id": cid, "scope": SCOPES})
-            if r.status_code != 200:
-                print("Device-Code-Fehler (init):", r.status_code)
-                return None
-            info = r.json()
-            device_code = info.get("device_code")
-            user_code = info.get("user_code")
-            verification_uri = info.get("verification_uri") or "https://www.twitch.tv/activate"
-            verification_uri_complete = info.get("verification_uri_complete")
-            interval = int(info.get("interval", 5))
-            expires_in = int(info.get("expires_in", 1800))
-            deadline = time.monotonic() + expires_in
-
-            # Anzeigen (OLED + Konsole)
-            self._show_device_code(user_code, verification_uri)
-            print("=== Twitch Device Login ===")
-            print("Öffne am Handy/PC:", verification_uri)
-            if verification_uri_complete:
-                print("Direktlink:", verification_uri_complete)
-            print("Gib diesen Code ein:", user_code)
-            print(f"Zeitfenster: {expires_in} Sekunden.")
-
-            # Schritt 2: Polling
-            while time.monotonic() < deadline:
-                time.sleep(interval)
-                data = {
-                    "client_id": cid,
-                    "grant_type": "urn:ietf:params:oauth:grant-type:device_code",
-                    "device_code": device_code,
-                }
-                if csec:
-                    data["client_secret"] = csec
-                tr = self._requests().post(TOKEN_URL, data=data)
-
-                if tr.status_code == 200:
-                    d = tr.json()
-                    acc = d.get("access_token")
-                    ref = d.get("refresh_token")
-                    login, _ = self._validate_token(acc)
-                    self._save_tokens(acc, ref, login)
-                    self._oled_info("Twitch OK", "Token erhalten")
-                    print("Twitch: Token erhalten. Login:", login)
-                    return acc
-
-                # Erwartete Warte-Antworten (400+JSON)
+            tr = self._post(TOKEN_URL, data=data)
+            status = tr.status_code
+            try:
+                j = tr.json()
+            except Exception:
                 j = None
-                try:
-                    j = tr.json()
-                except Exception:
-                    j = None
-                err = (j.get("error") if j else "") or ""
-                if err == "authorization_pending":
-                    continue
-                if err == "slow_down":
-                    interval += 2
-                    continue
-                if err in ("expired_token", "access_denied", "unsupported_grant_type",
-                           "invalid_device_code", "invalid_client", "invalid_grant"):
-                    print("Device-Token-Fehler:", err)
-                    return None
-                if tr.status_code == 400:
-                    # Manchmal 400 ohne JSON -> einfach weiter warten
-                    continue
-
-                print("Device-Token-Fehler, Status:", tr.status_code)
-                return None
-
-            print("Zeit abgelaufen, kein Token erhalten.")
-            return None
-
         except Exception as e:
-            print("Device-Flow-Exception:", e)
-            return None
+            log.warn("Device-Token-Exception:", e)
+            return  # beim nächsten Intervall erneut
+
+        if status == 200 and j:
+            self._save_tokens(j.get("access_token"), j.get("refresh_token"))
+            log.info("Twitch: Token erhalten.")
+            self._refreshed = True
+            self._go(VALIDATE, now)  # Login holen, dann IRC
+            self._set_status("Twitch: Token OK")
+            return
 
-    def ensure_user_token(self):
-        # 1) validate
+        # Erwartete Warte-Antworten (400+JSON)
+        err = (j.get("error") if j else "") or ""
+        if err == "authorization_pending":
+            return
+        if err == "slow_down":
+            self._dev_interval += 2
+            self._dev_next = now + self._dev_interval
+            return
+        if err in ("expired_token", "access_denied", "unsupported_grant_type",
+                   "invalid_device_code", "invalid_client", "invalid_grant"):
+            log.error("Device-Token-Fehler:", err)
+            self._fail(err[:21])
+            return
+        if status == 400:
+            # Manchmal 400 ohne JSON -> einfach weiter warten
+            return
+        log.error("Device-Token-Fehler, Status:", status)
+        self._fail("Token " + str(status))
+
+    # ---------- Hintergrund ----------
+    def maintain(self, now):
+        """Im Leerlauf-Fenster aufrufen: stündliche Validierung (von Twitch verlangt),
+        hält die gespeicherte Ablaufzeit aktuell. Rückgabe: True, wenn validiert wurde."""
+        if self.state != JOINED or now < self._next_revalidate:
+            return False
+        self._next_revalidate = now + self.revalidate
         tok = self.secrets.get("twitch_token")
         login, exp = self._validate_token(tok)
-        if login and exp and exp > 60:
-            if not self.secrets.get("twitch_nick"):
-                self.secrets["twitch_nick"] = login
-            return tok
-        # 2) refresh
-        new_tok = self._refresh_token()
-        if new_tok:
-            return new_tok
-        # 3) device flow
-        return self._device_code_flow()
+        if login and exp:
+            expires = _expires_at(exp)
+            old = self.secrets.get("twitch_token_expires") or 0
+            if expires is not None and abs(expires - old) > 60:  # Flash nur bei Änderung
+                self._save_tokens(tok, self.secrets.get("twitch_refresh_token"), expires=expires)
+        elif exp == 0:
+            log.warn("Twitch: Token abgelaufen/widerrufen, nächster Aufbau erneuert es.")
+            self._forget_expiry()
+        self._phase_end()
+        return True
+
+    def _forget_expiry(self):
+        if self.secrets.get("twitch_token_expires"):
+            self._save_tokens(self.secrets.get("twitch_token"),
+                              self.secrets.get("twitch_refresh_token"), expires=0)
 
     # ---------- IRC ----------
-    def connect(self):
-        if not wifi.radio.connected:
-            print("Twitch: Kein WiFi.")
-            return False
-        if self.sock:
-            print("Twitch: Bereits verbunden.")
-            return True
+    def _step_irc_connect(self, now):
+        """Socket anlegen und non-blocking verbinden; fertig wird er in IRC_WAIT."""
         try:
-            token = self.ensure_user_token()
-            if not token:
-                print("Kein gültiges Twitch-User-Token verfügbar.")
-                return False
-
-            nick = (self.secrets.get("twitch_nick") or TWITCH_CHANNEL or "").lower()
-            if not nick:
-                login, _ = self._validate_token(token)
-                if login:
-                    nick = login.lower()
-                    self.secrets["twitch_nick"] = nick
-                    self._save_tokens(token, self.secrets.get("twitch_refresh_token"), login)
-
             self.sock = self.pool.socket(self.pool.AF_INET, self.pool.SOCK_STREAM)
-            self.sock.settimeout(5)
-            self.sock.connect(("irc.chat.twitch.tv", 6667))
-
-            channel = f"#{TWITCH_CHANNEL}"
-            self._send_line(f"PASS oauth:{token}")
-            self._send_line(f"NICK {nick}")
-            self._send_line("CAP REQ :twitch.tv/tags")
-            self._send_line("CAP REQ :twitch.tv/commands")
-            self._send_line("CAP REQ :twitch.tv/membership")
-            self._send_line(f"JOIN {channel}")
-
             self.sock.settimeout(0)
-            self.socket_open = True
-            self.joined_channel = False
-
-            if self.oled:
-                try:
-                    self.oled.fill(0)
-                    self.oled.text("Twitch: Socket OK", 0, 0, 1)
-                    self.oled.text("Warte auf JOIN...", 0, 10, 1)
-                    self.oled.show()
-                except Exception:
-                    pass
-
-            print("Twitch: Verbunden, JOIN wird erwartet...")
-            return True
         except Exception as e:
-            print("Twitch Connect Fehler:", e)
-            self.disconnect()
-            return False
+            log.error("Twitch Socket-Fehler:", e)
+            self._lost(now, "Socket")
+            return
+        self._go(IRC_WAIT, now, self.connect_timeout)
+        self._phase("twitch_irc")  # einmal je Verbindungsversuch, nicht je Tick
+        self._step_irc_wait(now)
+
+    def _step_irc_wait(self, now):
+        # Port ohne non-blocking connect blockiert hier einmal (eigene Watchdog-Stufe;
+        # die Brotkrume steht schon seit _step_irc_connect)
+        self._stage("twitch_irc", persist=False)
+        try:
+            self.sock.connect(("irc.chat.twitch.tv", 6667))
+        except OSError as e:
+            err = getattr(e, "errno", None)
+            if err in _CONNECTING:
+                return  # nächster Tick
+            if err not in _CONNECTED:
+                log.error("Twitch Connect Fehler:", e)
+                self._lost(now, "Connect")
+                return
+        except Exception as e:
+            log.error("Twitch Connect Fehler:", e)
+            self._lost(now, "Connect")
+            return
+        finally:
+            self._stage_done()
+        self._login(now)
+
+    def _login(self, now):
+        """Anmelden und JOIN senden; die Bestätigung kommt über den Empfang."""
+        token = self.secrets.get("twitch_token")
+        nick = (self.secrets.get("twitch_nick") or TWITCH_CHANNEL or "").lower()
+        channel = f"#{TWITCH_CHANNEL}"
+        self._send_line(f"PASS oauth:{token}")
+        self._send_line(f"NICK {nick}")
+        self._send_line("CAP REQ :twitch.tv/tags")
+        self._send_line("CAP REQ :twitch.tv/commands")
+        self._send_line("CAP REQ :twitch.tv/membership")
+        self._send_line(f"JOIN {channel}")
+
+        self.socket_open = True
+        self.joined_channel = False
+        self.last_rx = now
+        if self.mux is not None:
+            self.mux.register(self.sock, self._on_readable, self.budget)
+        self._go(JOINING, now, self.join_timeout)
+        self._set_status("Twitch: JOIN...")
 
     def disconnect(self):
         try:
             if self.sock:
+                if self.mux is not None:
+                    self.mux.unregister(self.sock)
                 try:
                     self.sock.close()
                 except Exception:
                     pass
         finally:
             self.sock = None
+            self._rx.clear()  # angefangene Zeile gehört zur alten Verbindung
             self.socket_open = False
             self.joined_channel = False
+            self._ping_sent = 0
+            self.state = IDLE
+            self.deadline = 0
+            self._phase_end()
+            self._set_status("")
 
     # ---------- IRC I/O ----------
     def _send_line(self, line):
@@ -310,104 +637,236 @@ class TwitchController:
         try:
             self.sock.send(bytes(line + "\r\n", "utf-8"))
         except Exception as e:
-            print("Twitch Sendefehler:", e)
+            log.error("Twitch Sendefehler:", e)
 
-    def _handle_system_ping(self, line):
-        if line.startswith("PING"):
+    def _handle_system_ping(self, raw):
+        if raw.startswith(b"PING"):
             try:
-                self.sock.send(bytes(line.replace("PING", "PONG"), "utf-8"))
+                self.sock.send(b"PONG" + raw[4:] + b"\r\n")
             except Exception:
                 pass
 
-    def _check_join_ack(self, line):
-        if " 001 " in line:
+    def _server_line(self, raw):
+        """Zeilen vom Server selbst: PONG auf unseren PING (RTT), RECONNECT."""
+        if raw.startswith(b":tmi.twitch.tv PONG"):
+            if self._ping_sent:
+                now = time.monotonic()
+                self.rtt_ms = int((now - self._ping_sent) * 1000)
+                self._ping_sent = 0
+                self._next_ping = now + self.ping_interval
+                if DEBUG_ON:
+                    log.debug("Twitch RTT ms:", self.rtt_ms)
+        elif raw.startswith(b":tmi.twitch.tv RECONNECT"):
+            self._reconnect_req = True  # step() wechselt den Socket
+
+    def _check_join_ack(self, raw):
+        if b" 001 " in raw:
             self.socket_open = True
-        if (" JOIN #" + TWITCH_CHANNEL) in line or " 353 " in line:
+        if self._join_pat in raw or b" 353 " in raw:
             if not self.joined_channel:
-                print("Twitch: JOIN bestätigt.")
+                log.info("Twitch: JOIN bestätigt.")
             self.joined_channel = True
-        if ("Login authentication failed" in line
-            or "Improperly formatted auth" in line
-            or "Error logging in" in line
-            or "authentication failed" in line.lower()):
-            print("Twitch IRC Auth FEHLGESCHLAGEN -> 'twitch_token' & 'twitch_nick' prüfen.")
-            self.disconnect()
+        if b"NOTICE" in raw and (b"Improperly formatted auth" in raw
+                                 or b"Error logging in" in raw
+                                 or b"authentication failed" in raw.lower()):
+            if self._token_cached:
+                # Cache lag falsch (z.B. Token widerrufen): vergessen, erneuern, neu verbinden
+                log.warn("Twitch: Token aus dem Cache abgelehnt -> Refresh.")
+                self._forget_expiry()
+                self.disconnect()
+                self._token_cached = False
+                self._go(REFRESH, time.monotonic())
+                self._set_status("Twitch: Token...")
+                return
+            log.error("Twitch IRC Auth FEHLGESCHLAGEN -> 'twitch_token' & 'twitch_nick' prüfen.")
+            self._fail("Login abgelehnt")
+
+    def _count_drop(self):
+        if self.stats:
+            self.stats.dropped += 1
 
-    def _parse_tags(self, tag_str):
-        tags = {}
-        for p in tag_str.split(";"):
-            if "=" in p:
-                k, v = p.split("=", 1)
-                tags[k] = v
-        return tags
+    def _on_readable(self, now, budget):
+        """NetMux-Callback: verfügbare Daten (höchstens `budget` Bytes) lesen. Rückgabe: gelesene Bytes."""
+        return self.receive_zoom_commands(budget, now)
+
+    def pop_command(self):
+        """Nächste Einlösung in Ankunftsreihenfolge: (zoom:int, sender:str) oder None."""
+        if not self.pending:
+            return None
+        return self.pending.pop(0)
 
-    def receive_zoom_command(self):
+    def receive_zoom_commands(self, limit=0, now=None):
         """
-        Non-blocking: liest IRC, beantwortet PING, setzt join-Status.
+        Non-blocking: liest alles Verfügbare (höchstens `limit` Bytes, 0 = Ringgröße,
+        höchstens read_time Sekunden), setzt Zeilen über Chunk-Grenzen zusammen,
+        beantwortet PING, setzt join-Status.
         Erwartet PRIVMSG mit Tag 'custom-reward-id' == TWITCH_CUSTOM_REWARD_ID.
         Liest erste Zahl 1..30 aus der Nachricht.
-        Rückgabe: (zoom:int, sender:str) oder None
+        Jede Einlösung landet in Reihenfolge in `pending` (abholen mit pop_command()).
+        Fehler und geschlossene Verbindung führen zum Wiederverbinden (Backoff).
+        Rückgabe: gelesene Bytes
         """
         if not self.sock:
-            return None
-        try:
-            n = self.sock.recv_into(self._rx_buf)
-            if n <= 0:
-                return None
-            data = bytes(memoryview(self._rx_buf)[:n]).decode("utf-8", "ignore")
-            lines = data.split("\r\n")
-        except OSError as e:
-            err = getattr(e, "errno", None)
-            if err in (11, 116, 110):
-                return None
-            print("Twitch Empfangsfehler:", e)
-            self.disconnect()
-            return None
-        except Exception as e:
-            print("Twitch Empfangsfehler:", e)
-            self.disconnect()
-            return None
-
-        for line in lines:
-            if not line:
-                continue
-            # print("IRC:", line)  # Debug bei Bedarf
-
-            self._handle_system_ping(line)
-            self._check_join_ack(line)
-
-            if "PRIVMSG" not in line:
-                continue
-
-            tags = {}
-            prefix_end = 0
-            if line.startswith("@"):
-                tag_end = line.find(" ")
-                if tag_end > 0:
-                    tag_str = line[1:tag_end]
-                    tags = self._parse_tags(tag_str)
-                    prefix_end = tag_end + 1
-
-            # Nur Channel-Points-Reward
-            reward_id = tags.get("custom-reward-id")
-            if reward_id != TWITCH_CUSTOM_REWARD_ID:
-                continue
-
-            # Nachricht (nach " :")
-            msg_start = line.find(" :", prefix_end)
-            message = line[msg_start + 2:] if msg_start != -1 else ""
-            m = re.search(r"\b(\d{1,2})\b", message)
-            if not m:
-                continue
+            return 0
+        if now is None:
+            now = time.monotonic()
+        ring = self._rx
+        limit = limit or ring.size
+        deadline = time.monotonic() + self.read_time
+        total = 0
+        while total < limit:
             try:
-                val = int(m.group(1))
-            except ValueError:
-                continue
-            if not (1 <= val <= 30):
-                continue
+                n = ring.recv(self.sock, limit - total)
+            except OSError as e:
+                err = getattr(e, "errno", None)
+                if err in (11, 116, 110):
+                    break
+                log.error("Twitch Empfangsfehler:", e)
+                self._count_drop()
+                self._lost(now, "Empfangsfehler")
+                break
+            except Exception as e:
+                log.error("Twitch Empfangsfehler:", e)
+                self._count_drop()
+                self._lost(now, "Empfangsfehler")
+                break
+            if not n or n <= 0:
+                if n == 0:
+                    self._lost(now, "getrennt")  # Gegenstelle hat geschlossen
+                break
+            total += n
+            # Zeilen sofort abarbeiten: der Ring ist danach wieder frei
+            while self.sock:
+                line = ring.readline()
+                if line is None:
+                    break
+                self._handle_line(line)
+            if not self.sock or time.monotonic() >= deadline:
+                break
+        if total:
+            self.last_rx = now
+        return total
+
+    def _handle_line(self, line):
+        """Eine vollständige IRC-Zeile (memoryview, ohne "\r\n") auswerten.
+        Schneller Pfad auf Bytes: ohne Reward-Tag wird nichts dekodiert."""
+        if not line:
+            return
+        raw = bytes(line)
+        if DEBUG_ON:
+            log.debug("IRC:", raw)
 
-            sender = tags.get("display-name", "twitch")
-            print(f"Twitch Reward: {sender} -> Zoom {val}x")
-            return (val, sender)
+        if raw[0] == 58:  # ":" -> Server-Zeile (Chat beginnt mit Tags "@")
+            self._server_line(raw)
+            if not self.sock:
+                return
+        else:
+            self._handle_system_ping(raw)
+        if not self.joined_channel:
+            self._check_join_ack(raw)
+            if not self.sock:
+                return
+
+        # Nur Channel-Points-Reward: Tag-Sequenz suchen, bevor irgendetwas zerlegt wird
+        tag_end = raw.find(b" ") if raw.startswith(b"@") else -1
+        k = raw.find(self._reward_pat)
+        if k < 0 or k > tag_end or not _tag_start(raw[k - 1]) \
+                or not _tag_stop(raw[k + len(self._reward_pat)]):
+            # auch Text in der Nachricht, der wie der Tag aussieht, landet hier
+            if self.stats and b" PRIVMSG " in raw:
+                self.stats.rx += 1
+                self.stats.ignored += 1
+            return
+        if b" PRIVMSG " not in raw:
+            return
+        if self.stats:
+            self.stats.rx += 1
+
+        # Nachricht (nach " :" hinter den Tags)
+        msg_start = raw.find(b" :", tag_end)
+        val = _first_number(raw, msg_start + 2) if msg_start != -1 else 0
+        if not (1 <= val <= 30):
+            self._count_drop()
+            return
 
+        sender = _tag_value(raw, b"display-name=", tag_end) or "twitch"
+        msg_id = _tag_value(raw, b"id=", tag_end)
+        if msg_id:
+            if msg_id in self._seen:
+                # nach einem Reconnect erneut zugestellt
+                log.info("Twitch: Einlösung schon verarbeitet:", msg_id)
+                if self.stats:
+                    self.stats.ignored += 1
+                return
+            self._seen[self._seen_i] = msg_id
+            self._seen_i = (self._seen_i + 1) % len(self._seen)
+        if len(self.pending) >= self.max_events:
+            # main holt jeden Tick alles ab; voll nur, wenn die Schleife hängt
+            log.warn("Twitch: Einlösungen-Puffer voll, verworfen:", sender)
+            self._count_drop()
+            return
+        log.info("Twitch Reward: Viewer/Zoom", sender, val, msg_id)
+        self.pending.append((val, sender))
+
+
+def _wall_time():
+    """Unix-Zeit, wenn die Uhr gestellt ist (SNTP), sonst None."""
+    t = time.time()
+    return t if t > _EPOCH_VALID else None
+
+
+def _expires_at(expires_in):
+    """Absolute Ablaufzeit aus expires_in, sofern die Uhr gestellt ist."""
+    wall = _wall_time()
+    if wall is None or not expires_in:
         return None
+    return wall + int(expires_in)
+
+
+def _tag_value(raw, key, tag_end):
+    """Wert des IRC-Tags `key` (b"name=") aus raw[:tag_end] als str, sonst None."""
+    k = 0
+    while True:
+        k = raw.find(key, k + 1, tag_end)
+        if k < 0:
+            return None
+        if _tag_start(raw[k - 1]):
+            break
+    k += len(key)
+    e = raw.find(b";", k, tag_end)
+    if e < 0:
+        e = tag_end
+    return raw[k:e].decode("utf-8", "ignore")
+
+
+def _first_number(raw, i):
+    """Erste freistehende Zahl mit 1-2 Ziffern ab raw[i] (wie r"\b(\d{1,2})\b"), sonst 0."""
+    n = len(raw)
+    prev_word = False
+    while i < n:
+        c = raw[i]
+        if 48 <= c <= 57:
+            start = i
+            val = 0
+            while i < n and 48 <= raw[i] <= 57:
+                val = val * 10 + raw[i] - 48
+                i += 1
+            if not prev_word and i - start <= 2 and (i == n or not _is_word(raw[i])):
+                return val
+            prev_word = True
+            continue
+        prev_word = _is_word(c)
+        i += 1
+    return 0
+
+
+def _tag_start(c):
+    return c == 64 or c == 59  # "@" oder ";"
+
+
+def _tag_stop(c):
+    return c == 59 or c == 32  # ";" oder " "
+
+
+def _is_word(c):
+    return 48 <= c <= 57 or 65 <= c <= 90 or 97 <= c <= 122 or c == 95
@@ -44,4 +44,66 @@ DISPLAY_HEIGHT = 64
 # Timing-Konstanten
 ZOOM_DEBOUNCE = 0.0
 BRIGHTNESS_DEBOUNCE = 0.05
-TWITCH_ZOOM_TIMEOUT = 20  # Sekunden
\ No newline at end of file
+TWITCH_ZOOM_TIMEOUT = 20  # Sekunden: garantierter Slot je Einlösung
+ZOOM_QUEUE_SIZE = 8       # Warteschlange (zoom_queue.py): max. wartende Viewer
+
+# HTTP-Server (http_server.py): non-blocking, Keep-Alive, mehrere Verbindungen
+HTTP_PORT = 80
+HTTP_MAX_CONN = 4           # gleichzeitige Verbindungen (feste Slots)
+HTTP_BUF_SIZE = 1024        # Bytes je Verbindung: Header + Body eines Requests (begrenzt auch Batches)
+HTTP_IDLE_TIMEOUT = 10.0    # Sekunden ohne Daten -> Verbindung schließen
+HTTP_READ_BUDGET = 1024     # Bytes je Verbindung und Tick
+HTTP_BATCH_MAX = 16         # Befehle je Batch-Request (JSON-Array oder NDJSON)
+WS_PING = 10.0              # Sekunden ohne Daten -> Ping an die Bedienseite, nach 3x schließen
+WS_STATE_INTERVAL = 0.1     # Sekunden: Zustand höchstens so oft an die Bedienseite pushen
+
+# Netz-Multiplexer (netmux.py): alle Sockets einmal pro Tick, select.poll() wenn
+# der Port es kann, sonst Round-Robin mit Backoff für leere Sockets
+NETMUX_SLOTS = 8            # Sockets gesamt (Listen-Socket + Verbindungen)
+NETMUX_TICK_BUDGET = 4096   # Bytes je Tick über alle Sockets
+NETMUX_MAX_SKIP = 3         # leere Sockets höchstens so viele Ticks auslassen
+
+# Rate-Limit für Zoom-Requests (rate_limit.py): Token-Buckets global + je Viewer
+# Abgelehnte Requests bekommen HTTP 429 mit Retry-After
+RATE_GLOBAL_PER_SEC = 1.0       # global: Zoom-Befehle pro Sekunde (Dauerrate)
+RATE_GLOBAL_BURST = 5           # global: so viele direkt hintereinander
+RATE_VIEWER_PER_SEC = 1 / 15.0  # je Viewer: ein Befehl alle 15 s ...
+RATE_VIEWER_BURST = 2           # ... nach einem Burst von 2
+RATE_VIEWER_SLOTS = 32          # Viewer-Tabelle (LRU), fester Speicher
+
+# Monitoring (metrics.py): GET /metrics liefert Zähler im Prometheus-Textformat
+METRICS_PREFIX = "visca_"       # Präfix aller Metriknamen
+# Verwaltungs-Adressen: nur diese bekommen GET /metrics und GET /log (sonst 403)
+HTTP_MGMT_HOSTS = ()            # z.B. ("192.168.1.10",); leer = beide abgeschaltet
+
+# Watchdog / Hänger-Erkennung (stall_guard.py)
+WATCHDOG_TIMEOUT = 8.0  # Sekunden (RP2040-Maximum ~8.3 s)
+STALL_BUDGETS = {       # Sekunden je Stufe, Überschreitung -> Bericht + Reset
+    "wifi": 7.0,
+    "power": 7.0,       # set_power(True) wartet 5 s auf die Kamera
+    "http": 0.5,
+    "buttons": 0.5,
+    "zoom": 0.5,
+    "oled": 0.5,
+}
+
+# Speicher / GC (mem_monitor.py): nur in Leerlauf-Fenstern sammeln
+GC_MIN_FREE = 24 * 1024     # Bytes: unter dieser Reserve wird im Leerlauf gesammelt
+GC_MAX_INTERVAL = 30.0      # Sekunden: spätestens dann im Leerlauf sammeln
+MEM_REPORT_INTERVAL = 60.0  # Sekunden: Low-Water-Bericht auf der Konsole
+
+# Logging (log.py): Level 10=DEBUG, 20=INFO, 30=WARN, 40=ERROR
+LOG_LEVEL = 20
+LOG_BUFFER_LINES = 64       # RAM-Ring, Ausgabe auf die Konsole nur im Leerlauf
+LOG_FLUSH_LINES = 4         # max. Zeilen je Leerlauf-Fenster
+LOG_ECHO = False            # True: sofort ausgeben (nur zur Entwicklung)
+
+# OLED (oled_display.py): nur geänderte Bereiche senden, Bildrate begrenzen
+DISPLAY_MAX_FPS = 10
+# Font für den Glyphen-Blitter (wird beim Start einmal in den RAM geladen)
+FONT_PATH = "font5x8.bin"
+
+# Diagnoseseite (diagnostics.py): Taste aus PIN_CONFIG schaltet um
+DIAG_BUTTON = "connected_button"  # in dieser Variante sonst unbelegt
+DIAG_HOLD = 0.0                   # 0 = sofort beim Drücken umschalten
+DIAG_INTERVAL = 0.5               # Sekunden zwischen Aktualisierungen der Seite
@@ -0,0 +1,54 @@
+# control_page.py — Bedienseite für den Browser (GET /), Live-Steuerung per WebSocket (/ws)
+# - Statisches HTML/JS, einmal als bytes im Flash; keine Formatierung zur Laufzeit
+# - Client -> Gerät (JSON-Text): zuerst {"secret": "..."}, danach
+#     {"zoom": 1..30} (0 = zurück zum Poti), {"freeze": true|false},
+#     {"af": true|false}, {"bright": 0..20}
+# - Gerät -> Client: Zustand bei jeder Änderung
+#     {"zoom", "source": "viewer"|"operator"|"poti", "viewer", "freeze", "af",
+#      "bright", "power", "depth"}
+#   sowie {"ok": false, "error": "..."} bei abgelehnten Befehlen
+
+PAGE = b"""<!doctype html>
+<html><head><meta charset="utf-8"><meta name="viewport" content="width=device-width">
+<title>Optilia Control</title>
+<style>
+body{font:16px sans-serif;max-width:420px;margin:16px auto;padding:0 8px}
+fieldset{margin:8px 0}input[type=range]{width:100%}button{margin:2px}
+#st{font:bold 20px monospace}.off{opacity:.4}
+</style></head><body>
+<h3>Optilia Control</h3>
+<div id="login"><input id="secret" type="password" placeholder="Secret">
+<button onclick="connect()">Verbinden</button></div>
+<div id="ui" class="off">
+<div id="st">-</div><div id="viewer"></div>
+<fieldset><legend>Zoom <span id="zv"></span></legend>
+<input id="zoom" type="range" min="1" max="30" value="1" onchange="send({zoom:+this.value})">
+<button onclick="send({zoom:0})">Poti</button></fieldset>
+<fieldset><legend>Helligkeit <span id="bv"></span></legend>
+<input id="bright" type="range" min="0" max="20" value="4" onchange="send({bright:+this.value})"></fieldset>
+<button id="fz" onclick="send({freeze:!s.freeze})">Freeze</button>
+<button id="af" onclick="send({af:!s.af})">AF</button>
+<div id="err"></div></div>
+<script>
+var ws=null,s={};
+function $(i){return document.getElementById(i);}
+function send(o){if(ws&&ws.readyState==1)ws.send(JSON.stringify(o));}
+function draw(){
+ $("st").textContent=(s.power?"":"AUS | ")+s.zoom+"x "+s.source+(s.depth?" (+"+s.depth+")":"");
+ $("viewer").textContent=s.viewer?("Viewer: "+s.viewer):"";
+ $("zv").textContent=s.zoom+"x";$("bv").textContent=s.bright;
+ $("zoom").value=s.zoom;$("bright").value=s.bright;
+ $("fz").textContent="Freeze: "+(s.freeze?"an":"aus");
+ $("af").textContent=s.af?"AF":"MF";
+}
+function connect(){
+ ws=new WebSocket("ws://"+location.host+"/ws");
+ ws.onopen=function(){send({secret:$("secret").value});};
+ ws.onmessage=function(e){var m=JSON.parse(e.data);
+  if(m.error){$("err").textContent=m.error;
+   if(m.error=="Invalid secret")ws.onclose=null;return;}
+  $("err").textContent="";s=m;$("ui").className="";draw();};
+ ws.onclose=function(){$("ui").className="off";setTimeout(connect,2000);};
+}
+</script></body></html>
+"""
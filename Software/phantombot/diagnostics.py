@@ -0,0 +1,155 @@
+# diagnostics.py — Live-Diagnoseseite auf dem OLED
+# - LoopStats: Zähler der Hauptschleife (Durchläufe, längster Durchlauf,
+#   Netz-Eingänge empfangen/verworfen/ignoriert); je Tick nur ein paar
+#   Integer-Operationen
+# - DiagPage: eigene OLED-Seite mit Schleifenfrequenz, UART-Bytes/s,
+#   UART-Empfangspuffer, Netz-Zählern, Zoom-Warteschlange (Tiefe, Wartezeit),
+#   freiem Heap und WiFi-RSSI.
+#   Formatiert wird nur, wenn die Seite sichtbar ist, und nur alle `interval` s
+# - PageButton: Taste aus PIN_CONFIG mit Kurz-/Langdruck (Seite umschalten)
+
+import gc
+
+try:
+    import wifi
+except ImportError:
+    wifi = None
+
+PAGE_MAIN = 0
+PAGE_DIAG = 1
+
+SHORT = 1
+LONG = 2
+
+
+class LoopStats:
+    def __init__(self):
+        self.ticks = 0
+        self.worst = 0.0
+        self._last = None
+        # Netz-Eingänge (UDP-Pakete, HTTP-Requests, IRC-Nachrichten)
+        self.rx = 0
+        self.dropped = 0
+        self.ignored = 0
+
+    def tick(self, now):
+        """Zu Beginn jedes Schleifendurchlaufs."""
+        last = self._last
+        if last is not None:
+            dt = now - last
+            if dt > self.worst:
+                self.worst = dt
+        self._last = now
+        self.ticks += 1
+
+
+class DiagPage:
+    def __init__(self, display, stats, visca, net_label="NET", interval=0.5, queue=None):
+        self.display = display
+        self.stats = stats
+        self.visca = visca
+        self.net_label = net_label
+        self.interval = interval
+        self.queue = queue  # zoom_queue.ZoomQueue (optional)
+
+        self.f_loop = display.add_field(0, 0, 21, PAGE_DIAG)
+        self.f_uart = display.add_field(0, 10, 21, PAGE_DIAG)
+        self.f_net = display.add_field(0, 20, 21, PAGE_DIAG)
+        self.f_queue = display.add_field(0, 30, 21, PAGE_DIAG)
+        self.f_heap = display.add_field(0, 40, 21, PAGE_DIAG)
+        self.f_rssi = display.add_field(0, 50, 21, PAGE_DIAG)
+
+        self._t0 = 0.0
+        self._ticks0 = 0
+        self._tx0 = 0
+
+    @property
+    def visible(self):
+        return self.display.page == PAGE_DIAG
+
+    def toggle(self, now):
+        """Zwischen Haupt- und Diagnoseseite umschalten."""
+        if self.visible:
+            self.display.show_page(PAGE_MAIN)
+            return
+        self._start(now)
+        self.display.show_page(PAGE_DIAG)
+        self.update(now, force=True)
+
+    def _start(self, now):
+        self._t0 = now
+        self._ticks0 = self.stats.ticks
+        self._tx0 = self.visca.tx_bytes
+        self.stats.worst = 0.0
+
+    def update(self, now, force=False):
+        """Texte neu setzen (nur sichtbar und nur alle `interval` Sekunden)."""
+        if not self.visible:
+            return
+        dt = now - self._t0
+        if not force and dt < self.interval:
+            return
+        stats = self.stats
+        d = self.display
+        if dt > 0:
+            hz = (stats.ticks - self._ticks0) / dt
+            bps = (self.visca.tx_bytes - self._tx0) / dt
+            d.set(self.f_loop, "Loop {:4.0f}Hz max{:4.0f}ms".format(hz, stats.worst * 1000))
+            d.set(self.f_uart, "UART {:4.0f}B/s rxq {}".format(bps, _in_waiting(self.visca.uart)))
+        d.set(self.f_net, "{} rx{} dr{} ig{}".format(
+            self.net_label, stats.rx, stats.dropped, stats.ignored))
+        q = self.queue
+        if q is not None:
+            d.set(self.f_queue, "Queue {} wait{:3.0f}s/{:3.0f}s".format(
+                q.depth, q.oldest_wait(now), q.max_wait))
+        d.set(self.f_heap, "Heap {} B".format(gc.mem_free()))
+        d.set(self.f_rssi, "RSSI {}".format(_rssi()))
+        self._start(now)
+
+
+class PageButton:
+    """
+    Entprellte Taste (active-low). update() liefert SHORT beim Loslassen,
+    LONG einmalig nach `hold` Sekunden gedrückt (hold=0: LONG schon beim Drücken).
+    """
+
+    def __init__(self, pin, hold=1.0, debounce=0.05):
+        self.pin = pin
+        self.hold = hold
+        self.debounce = debounce
+        self.stable = True
+        self.last_change = 0.0
+        self.pressed_at = 0.0
+        self.long_fired = False
+
+    def update(self, now):
+        value = self.pin.value
+        if value != self.stable and (now - self.last_change) > self.debounce:
+            self.stable = value
+            self.last_change = now
+            if not value:
+                self.pressed_at = now
+                self.long_fired = False
+            elif not self.long_fired:
+                return SHORT
+        if not self.stable and not self.long_fired and (now - self.pressed_at) >= self.hold:
+            self.long_fired = True
+            return LONG
+        return 0
+
+
+def _in_waiting(uart):
+    try:
+        return uart.in_waiting
+    except Exception:
+        return "-"
+
+
+def _rssi():
+    try:
+        ap = wifi.radio.ap_info
+        if ap is not None:
+            return "{} dBm".format(ap.rssi)
+    except Exception:
+        pass
+    return "-"
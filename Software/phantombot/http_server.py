@@ -0,0 +1,539 @@
+# http_server.py — Non-blocking HTTP/1.1-Server mit Keep-Alive (PhantomBot -> Pico)
+# - Listen-Socket und alle Verbindungen mit Timeout 0: poll() wartet nie aufs Netz
+# - Mehrere gleichzeitige Verbindungen in festen Slots, je Slot ein vorab
+#   angelegter Empfangspuffer (keine Allokation pro recv)
+# - Inkrementeller Parser: Header bis "\r\n\r\n", dann genau Content-Length
+#   Bytes Body, auch über mehrere TCP-Segmente und Schleifendurchläufe verteilt
+# - HTTP/1.1 Keep-Alive (Standard) bzw. "Connection: close"; Antworten tragen
+#   immer Content-Length. Folgt direkt ein weiterer Request (Pipelining),
+#   wird er im selben Puffer weitergeparst
+# - Leerlaufende Verbindungen werden nach idle_timeout geschlossen
+# - Mit NetMux (netmux.py) melden sich Listen-Socket und Verbindungen dort an
+#   und werden nur gelesen, wenn sie bereit bzw. fällig sind; poll() erledigt
+#   dann nur noch die Timeouts
+# - WebSocket (RFC 6455): req.accept_websocket() schaltet den Slot nach dem
+#   101-Handshake auf Frames um. Frames werden im selben Slot-Puffer
+#   inkrementell geparst und in place entmaskiert; Text/Binär gehen an
+#   ws_handler(req, payload). Nur unfragmentierte Nachrichten bis zur
+#   Puffergröße; Ping/Pong/Close erledigt der Server, Ping alle ws_ping s
+
+from binascii import b2a_base64
+
+try:
+    import hashlib
+except ImportError:
+    hashlib = None
+
+_FREE = 0
+_HEAD = 1
+_BODY = 2
+_WS = 3
+
+_WS_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+WS_TEXT = 0x1
+WS_BINARY = 0x2
+_WS_CLOSE = 0x8
+_WS_PING = 0x9
+_WS_PONG = 0xA
+
+_STATUS_TEXT = {
+    200: "OK",
+    400: "Bad Request",
+    401: "Unauthorized",
+    403: "Forbidden",
+    404: "Not Found",
+    413: "Payload Too Large",
+    429: "Too Many Requests",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class HttpRequest:
+    """Request eines Slots; wird wiederverwendet. body ist ein memoryview in den Slot-Puffer."""
+
+    def __init__(self, server, slot):
+        self.server = server
+        self.slot = slot
+        self.method = ""
+        self.path = ""
+        self.body = b""
+        self.keep_alive = True
+        self.replied = False
+        self.ws_key = None  # Sec-WebSocket-Key, nur bei Upgrade-Requests
+
+    @property
+    def remote(self):
+        """IP-Adresse der Gegenseite (str) oder None."""
+        addr = self.server._addr[self.slot]
+        return addr[0] if addr else None
+
+    def text(self):
+        """Body als String (allokiert)."""
+        return str(self.body, "utf-8")
+
+    def reply(self, status, body=b"", content_type="application/json", headers=""):
+        """Antwort mit Content-Length senden (body: bytes oder str)."""
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        head = "HTTP/1.1 {} {}\r\nContent-Type: {}\r\nContent-Length: {}\r\nConnection: {}\r\n{}\r\n".format(
+            status, _STATUS_TEXT.get(status, ""), content_type, len(body),
+            "keep-alive" if self.keep_alive else "close", headers)
+        self.replied = True
+        self.server._send(self.slot, head.encode("utf-8"), body)
+
+    def accept_websocket(self):
+        """Upgrade auf WebSocket (101); danach gehen Nachrichten an ws_handler. False: kein Upgrade möglich."""
+        if not self.ws_key or hashlib is None or self.server.ws_handler is None:
+            return False
+        digest = hashlib.new("sha1", self.ws_key.encode("ascii") + _WS_GUID).digest()
+        head = ("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                "Sec-WebSocket-Accept: {}\r\n\r\n").format(str(b2a_base64(digest), "ascii").strip())
+        self.replied = True
+        self.keep_alive = True
+        self.server._upgrade(self.slot, head.encode("ascii"))
+        return True
+
+
+class HttpServer:
+    def __init__(self, pool, port, handler, max_conn=4, buf_size=1024,
+                 idle_timeout=10.0, send_timeout=0.2, mux=None, budget=1024,
+                 ws_handler=None, ws_ping=10.0):
+        """handler(req) wird für jeden vollständigen Request aufgerufen und antwortet mit req.reply().
+        ws_handler(req, payload) bekommt jede WebSocket-Nachricht (payload: memoryview)."""
+        self.handler = handler
+        self.ws_handler = ws_handler
+        self.ws_ping = ws_ping  # WebSocket ohne Daten: Ping nach ws_ping s, Schluss nach 3 * ws_ping
+        self.idle_timeout = idle_timeout
+        self.send_timeout = send_timeout
+        self.mux = mux
+        self.budget = budget  # Bytes je Verbindung und Tick
+
+        self.server = pool.socket(pool.AF_INET, pool.SOCK_STREAM)
+        self.server.setsockopt(pool.SOL_SOCKET, pool.SO_REUSEADDR, 1)
+        self.server.bind(("", port))
+        self.server.listen(max_conn)
+        self.server.settimeout(0)
+
+        # Slots: parallele Listen, Puffer vorab angelegt
+        self._conn = [None] * max_conn
+        self._addr = [None] * max_conn    # Adresse der Gegenseite (für req.remote)
+        self._buf = [bytearray(buf_size) for _ in range(max_conn)]
+        self._mv = [memoryview(b) for b in self._buf]
+        self._len = [0] * max_conn
+        self._state = bytearray(max_conn)
+        self._head_end = [0] * max_conn   # Index nach "\r\n\r\n"
+        self._body_len = [0] * max_conn
+        self._scan = [0] * max_conn       # ab hier weiter nach "\r\n\r\n" suchen
+        self._last = [0.0] * max_conn
+        self._pinged = bytearray(max_conn)
+        self._ws_hdr = bytearray(4)
+        self._ws_hdr_mv = memoryview(self._ws_hdr)
+        self._req = [HttpRequest(self, i) for i in range(max_conn)]
+        # Callbacks je Slot einmal anlegen (keine Closure je Verbindung)
+        self._reader = [self._make_reader(i) for i in range(max_conn)]
+        if mux is not None:
+            mux.register(self.server, self._on_listen, 0)
+
+        # Monitoring
+        self.requests = 0
+        self._polled = 0
+        self.accepted = 0
+        self.rejected = 0    # alle Slots belegt
+        self.errors = 0
+        self.ws_messages = 0
+
+    @property
+    def max_conn(self):
+        return len(self._conn)
+
+    def is_websocket(self, i):
+        return self._state[i] == _WS
+
+    @property
+    def connections(self):
+        n = 0
+        for c in self._conn:
+            if c is not None:
+                n += 1
+        return n
+
+    def close(self):
+        for i in range(len(self._conn)):
+            self._close(i)
+        if self.mux is not None:
+            self.mux.unregister(self.server)
+        try:
+            self.server.close()
+        except Exception:
+            pass
+        self.server = None
+
+    # ---------- Schleife ----------
+    def poll(self, now):
+        """Einmal pro Tick: annehmen, lesen, Requests beantworten, Timeouts. Rückgabe: Anzahl Requests seit dem letzten poll()."""
+        if self.server is None:
+            return 0
+        if self.mux is None:
+            self._accept(now)
+            for i in range(len(self._conn)):
+                self._read(i, now, self.budget)
+        for i in range(len(self._conn)):
+            if self._conn[i] is None:
+                continue
+            idle = now - self._last[i]
+            if self._state[i] == _WS:
+                if idle > 3 * self.ws_ping:
+                    self._close(i)
+                elif idle > self.ws_ping and not self._pinged[i]:
+                    self._pinged[i] = 1
+                    self.ws_send(i, b"", _WS_PING)
+            elif idle > self.idle_timeout:
+                self._close(i)
+        handled = self.requests - self._polled
+        self._polled = self.requests
+        return handled
+
+    def _make_reader(self, i):
+        def reader(now, budget):
+            return self._read(i, now, budget)
+        return reader
+
+    def _on_listen(self, now, budget):
+        return 1 if self._accept(now) else 0
+
+    def _read(self, i, now, budget):
+        """Höchstens `budget` Bytes lesen und alle vollständigen Requests beantworten."""
+        conn = self._conn[i]
+        if conn is None:
+            return 0
+        n = self._len[i]
+        end = min(len(self._buf[i]), n + budget)
+        got = -1
+        if n < end:
+            try:
+                got = conn.recv_into(self._mv[i][n:end])
+            except OSError:
+                got = -1  # nichts da (EAGAIN) oder Fehler: Timeout prüft poll()
+            if got == 0:
+                self._close(i)  # Gegenseite hat geschlossen
+                return 1
+            if got > 0:
+                self._len[i] = n + got
+                self._last[i] = now
+                self._pinged[i] = 0
+        while self._conn[i] is not None and self._parse(i):
+            pass
+        return got if got > 0 else 0
+
+    def _accept(self, now):
+        try:
+            conn, addr = self.server.accept()
+        except OSError:
+            return False
+        for i in range(len(self._conn)):
+            if self._conn[i] is None:
+                conn.settimeout(0)
+                self._conn[i] = conn
+                self._addr[i] = addr
+                self._len[i] = 0
+                self._state[i] = _HEAD
+                self._scan[i] = 0
+                self._last[i] = now
+                self.accepted += 1
+                if self.mux is not None:
+                    try:
+                        self.mux.register(conn, self._reader[i], self.budget)
+                    except RuntimeError:
+                        self._close(i)
+                        self.rejected += 1
+                        return False
+                return True
+        # alle Slots belegt
+        self.rejected += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+        return False
+
+    # ---------- Parser ----------
+    def _parse(self, i):
+        """Schritt des Parsers; True, wenn danach schon der nächste Request im Puffer liegt."""
+        if self._state[i] == _WS:
+            return self._parse_ws(i)
+        buf = self._buf[i]
+        n = self._len[i]
+        if self._state[i] == _HEAD:
+            end = _find_head_end(buf, self._scan[i], n)
+            if end < 0:
+                if n >= len(buf):
+                    self._fail(i, 413)
+                self._scan[i] = max(0, n - 3)
+                return False
+            self._head_end[i] = end
+            if not self._parse_head(i, end):
+                self._fail(i, 400)
+                return False
+            if end + self._body_len[i] > len(buf):
+                self._fail(i, 413)
+                return False
+            self._state[i] = _BODY
+        end = self._head_end[i]
+        total = end + self._body_len[i]
+        if n < total:
+            return False
+
+        req = self._req[i]
+        req.body = self._mv[i][end:total]
+        req.replied = False
+        self.requests += 1
+        try:
+            self.handler(req)
+            if not req.replied:
+                req.reply(500)
+        except Exception:
+            self.errors += 1
+            if not req.replied:
+                req.keep_alive = False
+                try:
+                    req.reply(500)
+                except Exception:
+                    pass
+        if self._conn[i] is None:
+            return False
+        if not req.keep_alive:
+            self._close(i)
+            return False
+
+        # Rest (nächster Request) an den Pufferanfang schieben
+        rest = n - total
+        for k in range(rest):
+            buf[k] = buf[total + k]
+        self._len[i] = rest
+        if self._state[i] != _WS:  # accept_websocket() im Handler
+            self._state[i] = _HEAD
+        self._scan[i] = 0
+        return rest > 0
+
+    def _parse_ws(self, i):
+        """Ein WebSocket-Frame; True, wenn danach schon der nächste im Puffer liegt."""
+        buf = self._buf[i]
+        n = self._len[i]
+        if n < 2:
+            return False
+        b0 = buf[0]
+        op = b0 & 0x0F
+        length = buf[1] & 0x7F
+        h = 2
+        if length == 126:
+            if n < 4:
+                return False
+            length = (buf[2] << 8) | buf[3]
+            h = 4
+        elif length == 127:
+            self.ws_close(i, 1009)  # Nachricht zu groß
+            return False
+        if not buf[1] & 0x80:
+            self.ws_close(i, 1002)  # Client-Frames müssen maskiert sein
+            return False
+        h += 4
+        total = h + length
+        if total > len(buf):
+            self.ws_close(i, 1009)
+            return False
+        if n < total:
+            return False
+        if not b0 & 0x80 or op == 0:
+            self.ws_close(i, 1003)  # keine fragmentierten Nachrichten
+            return False
+
+        # Payload in place entmaskieren
+        m = h - 4
+        for k in range(length):
+            buf[h + k] ^= buf[m + (k & 3)]
+        payload = self._mv[i][h:total]
+
+        if op == WS_TEXT or op == WS_BINARY:
+            self.ws_messages += 1
+            try:
+                self.ws_handler(self._req[i], payload)
+            except Exception:
+                self.errors += 1
+        elif op == _WS_PING:
+            self.ws_send(i, payload, _WS_PONG)
+        elif op == _WS_CLOSE:
+            self.ws_send(i, payload[:2], _WS_CLOSE)
+            self._close(i)
+            return False
+        elif op != _WS_PONG:
+            self.ws_close(i, 1002)
+            return False
+        if self._conn[i] is None:
+            return False
+
+        rest = n - total
+        for k in range(rest):
+            buf[k] = buf[total + k]
+        self._len[i] = rest
+        return rest > 0
+
+    def _parse_head(self, i, end):
+        buf = self._buf[i]
+        req = self._req[i]
+        # Request-Zeile: "METHOD /pfad HTTP/1.x"
+        line_end = _find(buf, 0, end, 13)
+        sp1 = _find(buf, 0, line_end, 32)
+        sp2 = _find(buf, sp1 + 1, line_end, 32)
+        if sp1 <= 0 or sp2 < 0:
+            return False
+        try:
+            req.method = str(self._mv[i][:sp1], "ascii")
+            req.path = str(self._mv[i][sp1 + 1:sp2], "ascii")
+        except Exception:
+            return False
+        # HTTP/1.0 ohne Keep-Alive-Header: schließen
+        req.keep_alive = buf[line_end - 1] != 48  # "...1.0"
+        req.ws_key = None
+        self._body_len[i] = 0
+
+        # Header-Zeilen: nur Content-Length, Connection und Sec-WebSocket-Key werden gebraucht
+        s = line_end + 2
+        while s < end - 2:
+            e = _find(buf, s, end, 13)
+            if e < 0:
+                break
+            colon = _find(buf, s, e, 58)
+            if colon > s:
+                v = colon + 1
+                while v < e and buf[v] == 32:
+                    v += 1
+                if _ieq(buf, s, colon, b"content-length"):
+                    length = 0
+                    for k in range(v, e):
+                        d = buf[k] - 48
+                        if not 0 <= d <= 9:
+                            return False
+                        length = length * 10 + d
+                    self._body_len[i] = length
+                elif _ieq(buf, s, colon, b"connection"):
+                    if _ieq(buf, v, e, b"close"):
+                        req.keep_alive = False
+                    elif _ieq(buf, v, e, b"keep-alive"):
+                        req.keep_alive = True
+                elif _ieq(buf, s, colon, b"sec-websocket-key"):
+                    try:
+                        req.ws_key = str(self._mv[i][v:e], "ascii")
+                    except Exception:
+                        return False
+            s = e + 2
+        return True
+
+    # ---------- Senden / Schließen ----------
+    def _send(self, i, head, body):
+        conn = self._conn[i]
+        if conn is None:
+            return
+        try:
+            conn.settimeout(self.send_timeout)
+            _send_all(conn, head)
+            if body:
+                _send_all(conn, body)
+            conn.settimeout(0)
+        except OSError:
+            self.errors += 1
+            self._close(i)
+
+    def ws_send(self, i, payload, opcode=WS_TEXT):
+        """WebSocket-Nachricht (bytes/str, < 64 KiB) an Slot i; Server-Frames sind unmaskiert."""
+        if self._state[i] != _WS:
+            return False
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+        n = len(payload)
+        hdr = self._ws_hdr
+        hdr[0] = 0x80 | opcode
+        if n < 126:
+            hdr[1] = n
+            h = 2
+        else:
+            hdr[1] = 126
+            hdr[2] = (n >> 8) & 0xFF
+            hdr[3] = n & 0xFF
+            h = 4
+        self._send(i, self._ws_hdr_mv[:h], payload)
+        return self._conn[i] is not None
+
+    def _upgrade(self, i, head):
+        self._send(i, head, b"")
+        if self._conn[i] is not None:
+            self._state[i] = _WS
+            self._pinged[i] = 0
+
+    def ws_close(self, i, code=1000):
+        """WebSocket mit Close-Frame (Statuscode) beenden."""
+        hdr = self._ws_hdr
+        hdr[2] = code >> 8
+        hdr[3] = code & 0xFF
+        self.ws_send(i, bytes(self._ws_hdr_mv[2:4]), _WS_CLOSE)
+        self._close(i)
+
+    def _fail(self, i, status):
+        req = self._req[i]
+        req.keep_alive = False
+        req.reply(status)
+        self._close(i)
+
+    def _close(self, i):
+        conn = self._conn[i]
+        if conn is None:
+            return
+        self._conn[i] = None
+        self._addr[i] = None
+        self._len[i] = 0
+        self._state[i] = _FREE
+        if self.mux is not None:
+            self.mux.unregister(conn)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+def _find(buf, s, e, byte):
+    for k in range(s, e):
+        if buf[k] == byte:
+            return k
+    return -1
+
+
+def _find_head_end(buf, s, n):
+    """Index nach dem ersten "\r\n\r\n" in buf[s:n], sonst -1."""
+    for k in range(s, n - 3):
+        if buf[k] == 13 and buf[k + 1] == 10 and buf[k + 2] == 13 and buf[k + 3] == 10:
+            return k + 4
+    return -1
+
+
+def _ieq(buf, s, e, word):
+    """buf[s:e] == word (word klein geschrieben), ohne Groß-/Kleinschreibung."""
+    n = len(word)
+    if e - s != n:
+        return False
+    for k in range(n):
+        b = buf[s + k]
+        if 65 <= b <= 90:
+            b |= 0x20
+        if b != word[k]:
+            return False
+    return True
+
+
+def _send_all(conn, data):
+    """send() kann teilweise senden: Rest nachschieben."""
+    mv = memoryview(data)
+    while len(mv):
+        n = conn.send(mv)
+        if not n:
+            raise OSError("send")
+        mv = mv[n:]
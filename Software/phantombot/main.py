@@ -4,22 +4,75 @@ import json
 import wifi
 import socketpool
 import digitalio
-import gc
 
 from config import (
     ZOOM_DEBOUNCE,
     BRIGHTNESS_DEBOUNCE,
     TWITCH_ZOOM_TIMEOUT,
+    ZOOM_QUEUE_SIZE,
+    RATE_GLOBAL_PER_SEC,
+    RATE_GLOBAL_BURST,
+    RATE_VIEWER_PER_SEC,
+    RATE_VIEWER_BURST,
+    RATE_VIEWER_SLOTS,
     DISPLAY_WIDTH,
     DISPLAY_HEIGHT,
     TWITCH_CUSTOM_REWARD_ID,
+    WATCHDOG_TIMEOUT,
+    STALL_BUDGETS,
+    GC_MIN_FREE,
+    GC_MAX_INTERVAL,
+    MEM_REPORT_INTERVAL,
+    LOG_FLUSH_LINES,
+    DISPLAY_MAX_FPS,
+    FONT_PATH,
+    DIAG_BUTTON,
+    DIAG_HOLD,
+    DIAG_INTERVAL,
+    HTTP_PORT,
+    HTTP_MAX_CONN,
+    HTTP_BUF_SIZE,
+    HTTP_IDLE_TIMEOUT,
+    HTTP_READ_BUDGET,
+    HTTP_BATCH_MAX,
+    HTTP_MGMT_HOSTS,
+    METRICS_PREFIX,
+    WS_PING,
+    WS_STATE_INTERVAL,
+    NETMUX_SLOTS,
+    NETMUX_TICK_BUDGET,
+    NETMUX_MAX_SKIP,
 )
 from hardware_setup import setup_hardware
-from visca_commands import ViscaCamera
+from visca_commands import ViscaCamera, TX_CLASSES
+from stall_guard import StallGuard
+from mem_monitor import MemMonitor
+from log import log, DEBUG_ON
+from oled_display import StatusDisplay, GlyphFont
+from rate_limit import RateLimiter, viewer_key, ALLOWED, LIMIT_GLOBAL
+from zoom_queue import ZoomQueue, QUEUE_FULL, CHANGED_CURRENT, CHANGED_NEXT
+from diagnostics import LoopStats, DiagPage, PageButton, LONG
+from http_server import HttpServer
+from control_page import PAGE as CONTROL_PAGE
+from netmux import NetMux
+from metrics import Metrics, COUNTER, GAUGE
 
 # Secret für PhantomBot-Validierung
 PHANTOM_SECRET = "ehajo"
 HTTP_ENDPOINT = "/zoom"
+LOG_ENDPOINT = "/log"
+METRICS_ENDPOINT = "/metrics"
+WS_ENDPOINT = "/ws"
+
+# Zoom-Quelle (Priorität: Viewer-Slot > Bedienseite > Poti)
+SRC_POTI = 0
+SRC_OPERATOR = 1
+SRC_VIEWER = 2
+SOURCE_NAMES = ("poti", "operator", "viewer")
+# Antworten an die Bedienseite (konstant -> keine Allokation)
+WS_ERR_INVALID = b'{"ok": false, "error": "Invalid command"}'
+WS_ERR_SECRET = b'{"ok": false, "error": "Invalid secret"}'
+WS_ERR_POWER = b'{"ok": false, "error": "Camera off"}'
 
 class SystemState:
     OFF = 0
@@ -28,9 +81,71 @@ class SystemState:
 def scale_adc_to_zoom(adc_value):
     return 30 - int((adc_value / 65535) * 29)
 
+# Vorformatierte Texte: in der Schleife keine String-Formatierung (Heap)
+BRIGHT_TEXT = tuple("Bright: {}".format(b) for b in range(21))
+ZOOM_TEXT = tuple("Zoom: {}x".format(z) for z in range(31))
+ZOOM_OVERLAY_TEXT = tuple("{:2d}x".format(z) for z in range(31))
+
 # ---------- Setup ----------
 pins, uart, i2c, oled, encoder, poti = setup_hardware()
-visca = ViscaCamera(uart)
+visca = ViscaCamera(uart, batch_size=256)  # ganzer Overlay-Satz eines Ticks in einem Write
+
+# OLED-Felder (Position, Breite in Zeichen)
+# Font einmal in den RAM laden; ohne Datei zeichnet oled.text() wie bisher
+try:
+    font = GlyphFont(FONT_PATH)
+except OSError as e:
+    font = None
+    log.warn("Font nicht geladen:", FONT_PATH, e)
+display = StatusDisplay(oled, DISPLAY_WIDTH, DISPLAY_HEIGHT, DISPLAY_MAX_FPS, font)
+F_LIVE = display.add_field(0, 0, 6)
+F_AF = display.add_field(0, DISPLAY_HEIGHT - 10, 2)
+F_BRIGHT = display.add_field(50, DISPLAY_HEIGHT - 30, 10)
+F_ZOOM = display.add_field(50, DISPLAY_HEIGHT - 20, 9)
+F_MODE = display.add_field(50, DISPLAY_HEIGHT - 10, 6)
+
+# Diagnoseseite (zweite OLED-Seite, per DIAG_BUTTON)
+# Warteschlange für Zoom-Einlösungen: jede bekommt einen festen Slot
+zoom_queue = ZoomQueue(ZOOM_QUEUE_SIZE, TWITCH_ZOOM_TIMEOUT)
+
+stats = LoopStats()
+diag = DiagPage(display, stats, visca, "HTTP", DIAG_INTERVAL, zoom_queue)
+
+# Monitoring (metrics.py): Zähler für GET /metrics; gespiegelte Werte
+# (Empfang, UART, Warteschlange) übernimmt erst render_metrics()
+metrics = Metrics(METRICS_PREFIX)
+M_RX = metrics.add("commands_received_total", COUNTER, "Commands received per source.", 'source="http"')
+M_RX_WS = metrics.add("commands_received_total", COUNTER, "", 'source="websocket"')
+M_APPLIED = metrics.add("commands_applied_total", COUNTER, "Commands queued or applied to the camera.")
+M_COALESCED = metrics.add("commands_coalesced_total", COUNTER, "VISCA packets sent in a shared UART write.")
+M_REJ_RATE = metrics.add("commands_rejected_total", COUNTER, "Commands rejected by reason.", 'reason="rate_limit"')
+M_REJ_QUEUE = metrics.add("commands_rejected_total", COUNTER, "", 'reason="queue_full"')
+M_REJ_INVALID = metrics.add("commands_rejected_total", COUNTER, "", 'reason="invalid"')
+M_REJ_POWER = metrics.add("commands_rejected_total", COUNTER, "", 'reason="power_off"')
+M_REJ_DENIED = metrics.add("commands_rejected_total", COUNTER, "", 'reason="denied"')
+# je Paketklasse ein Index ab M_UART_BYTES bzw. M_UART_PACKETS (Reihenfolge wie TX_CLASSES)
+M_UART_BYTES = metrics.count
+for c in TX_CLASSES:
+    metrics.add("uart_bytes_total", COUNTER, "VISCA bytes by packet class.", 'class="{}"'.format(c))
+M_UART_PACKETS = metrics.count
+for c in TX_CLASSES:
+    metrics.add("uart_packets_total", COUNTER, "VISCA packets by packet class.", 'class="{}"'.format(c))
+M_CAMERA_ERRORS = metrics.add("camera_errors_total", COUNTER, "UART writes that timed out or were cut short.")
+M_OVERRIDES = metrics.add("override_activations_total", COUNTER, "Viewer zoom slots started.")
+M_QUEUE_DEPTH = metrics.add("queue_depth", GAUGE, "Viewers waiting for a zoom slot.")
+
+# Watchdog: Bericht vom letzten Hänger zeigen, dann scharf schalten
+guard = StallGuard(WATCHDOG_TIMEOUT)
+stall_report = guard.last_report()
+if stall_report:
+    guard.show_report(oled, stall_report)
+    display.invalidate()  # Bericht wurde direkt aufs OLED gemalt
+guard.start()
+
+# Heap-Überwachung: Low-Water je Schleifen-Abschnitt, GC nur im Leerlauf
+MEM_HTTP, MEM_BUTTONS, MEM_ZOOM, MEM_OLED = range(4)
+mem = MemMonitor(("http", "buttons", "zoom", "oled"), GC_MIN_FREE, GC_MAX_INTERVAL)
+last_mem_report = time.monotonic()
 
 # Secrets (nur WiFi)
 try:
@@ -40,26 +155,15 @@ except Exception:
     secrets = {}
 
 # WiFi verbinden
+guard.enter("wifi", STALL_BUDGETS["wifi"], persist=True)
 try:
     if not wifi.radio.connected:
-        wifi.radio.connect(secrets["wifi"]["ssid"], secrets["wifi"]["password"])
-        print("Verbunden mit WiFi. IP:", wifi.radio.ipv4_address)
+        wifi.radio.connect(secrets["wifi"]["ssid"], secrets["wifi"]["password"],
+                           timeout=STALL_BUDGETS["wifi"] - 1)
+        log.info("Verbunden mit WiFi. IP:", wifi.radio.ipv4_address)
 except Exception as e:
-    print("WiFi-Verbindung fehlgeschlagen:", e)
-
-# HTTP-Server Setup
-if wifi.radio.connected:
-    pool = socketpool.SocketPool(wifi.radio)
-    server = pool.socket(pool.AF_INET, pool.SOCK_STREAM)
-    server.setsockopt(pool.SOL_SOCKET, pool.SO_REUSEADDR, 1)
-    server.bind(('', 80))
-    server.listen(5)
-    server.settimeout(0.02)
-    print("HTTP-Server auf Port 80 gestartet.")
-else:
-    pool = None
-    server = None
-    print("Kein WiFi: HTTP-Server deaktiviert.")
+    log.error("WiFi-Verbindung fehlgeschlagen:", e)
+guard.leave()
 
 # LEDs Grundzustand
 pins["power_led_green"].value = True
@@ -72,9 +176,11 @@ pins["freeze_led_green"].value = True
 pins["freeze_led_red"].value = False
 
 # Kamera-Defaults
+guard.enter("power", STALL_BUDGETS["power"], persist=True)
 visca.set_power(True)
 visca.set_freeze(False)
 visca.set_autofocus(True)
+guard.leave()
 brightness = 4
 encoder.position = brightness
 visca.set_brightness(brightness)
@@ -87,93 +193,313 @@ button_debounce = {
     "power_button": {"last_time": 0, "stable_state": True},
     "focus_button": {"last_time": 0, "stable_state": True},
     "freeze_button": {"last_time": 0, "stable_state": True},
-    "connected_button": {"last_time": 0, "stable_state": True}
 }
+page_button = PageButton(pins[DIAG_BUTTON], DIAG_HOLD, DEBOUNCE_TIME)
+
+# Rate-Limit für Zoom-Requests (global + je Viewer)
+limiter = RateLimiter(RATE_GLOBAL_PER_SEC, RATE_GLOBAL_BURST,
+                      RATE_VIEWER_PER_SEC, RATE_VIEWER_BURST, RATE_VIEWER_SLOTS)
 
 last_zoom_sent = None
 last_overlay_zoom = None
 last_viewer = ""
 zoom_override = None
-zoom_timeout = 0
+
+# Bedienseite (WebSocket): Zoom vom Bediener, bis das Poti bewegt wird
+operator_zoom = None
+operator_poti = 0
+zoom_now = 1
+zoom_source = SRC_POTI
+ws_auth = bytearray(HTTP_MAX_CONN)  # je HTTP-Slot: Secret bestätigt
+ws_sig = -1
+last_ws_push = 0.0
 last_brightness_time = 0
-last_oled_update = 0
-OLED_UPDATE_INTERVAL = 0.1  # 100 ms
 
-def handle_http_request(conn):
+def handle_http_request(req):
+    """Ein vollständiger Request (Header + Body) vom HttpServer; Antwort per req.reply()."""
+    if req.method == 'GET' and (req.path == METRICS_ENDPOINT or req.path == LOG_ENDPOINT):
+        # Diagnose (Zähler, Log-Inhalte) nur an Verwaltungs-Adressen
+        if req.remote not in HTTP_MGMT_HOSTS:
+            metrics.inc(M_REJ_DENIED)
+            req.reply(403, b'{"ok": false, "error": "Forbidden"}')
+        elif req.path == LOG_ENDPOINT:
+            stats.rx += 1
+            send_log_dump(req)
+        else:
+            # Scrapes zählen nicht als Befehle
+            req.reply(200, render_metrics(), content_type="text/plain; version=0.0.4")
+        return
+    if req.method == 'GET' and req.path == WS_ENDPOINT:
+        # Bedienseite: Upgrade, Secret kommt als erste Nachricht
+        if req.accept_websocket():
+            ws_auth[req.slot] = 0
+        else:
+            req.keep_alive = False
+            req.reply(400, b'{"ok": false, "error": "WebSocket upgrade required"}')
+        return
+    if req.method == 'GET' and req.path == '/':
+        req.reply(200, CONTROL_PAGE, content_type="text/html; charset=utf-8")
+        return
+    stats.rx += 1
+    if req.method != 'POST' or req.path != HTTP_ENDPOINT:
+        stats.ignored += 1
+        req.reply(404, b'{"ok": false, "error": "Not found"}')
+        return
+    text = req.text().strip()
+    # Erst als ein JSON-Dokument (auch mehrzeilig formatiert); Batch = JSON-Array
+    # oder, wenn das nicht parst, NDJSON (ein Objekt je Zeile)
     try:
-        request = conn.recv(1024).decode('utf-8')
-        if not request:
-            return False
-        lines = request.split('\r\n')
-        if len(lines) < 2:
-            return False
-        first_line = lines[0]
-        parts = first_line.split(' ')
-        if len(parts) < 2 or parts[0] != 'POST' or parts[1] != HTTP_ENDPOINT:
-            conn.send(b'HTTP/1.1 404 Not Found\r\n\r\n')
-            return True
-        body_start = request.find('\r\n\r\n') + 4
-        body = request[body_start:].strip()
-        try:
-            data = json.loads(body)
-            if data.get('secret') != PHANTOM_SECRET:
-                conn.send(b'HTTP/1.1 401 Unauthorized\r\n\r\n{"ok": false, "error": "Invalid secret"}')
-                return True
-            zoom_val = int(data.get('zoom', 0))
-            viewer = str(data.get('viewer', 'unknown'))[:10]
-            if 1 <= zoom_val <= 30:
-                global zoom_override, zoom_timeout, last_viewer
-                zoom_override = zoom_val
-                zoom_timeout = time.monotonic() + TWITCH_ZOOM_TIMEOUT
-                last_viewer = viewer
-                visca.set_overlay_text("KAMERAKIND:", line=0x10)
-                visca.set_overlay_text(viewer, line=0x11)
-                print(f"PhantomBot: {viewer} -> Zoom {zoom_val}x")
-                conn.send(b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n\r\n{"ok": true}')
-            else:
-                conn.send(b'HTTP/1.1 400 Bad Request\r\n\r\n{"ok": false, "error": "Invalid zoom"}')
-        except json.JSONDecodeError:
-            conn.send(b'HTTP/1.1 400 Bad Request\r\n\r\n{"ok": false, "error": "Invalid JSON"}')
-        gc.collect()
-        return True
-    except Exception as e:
-        print(f"HTTP-Fehler: {e}")
-        try:
-            conn.send(b'HTTP/1.1 500 Internal Server Error\r\n\r\n')
-        except:
-            pass
-        return True
+        data = json.loads(text)
+    except ValueError:
+        data = None
+        if '\n' in text:
+            try:
+                data = [json.loads(line) for line in text.split('\n') if line.strip()]
+            except ValueError:
+                data = None
+        if data is None:
+            stats.dropped += 1
+            metrics.inc(M_REJ_INVALID)
+            req.reply(400, b'{"ok": false, "error": "Invalid JSON"}')
+            return
+    if isinstance(data, list):
+        handle_batch(req, data)
+        return
+    if not isinstance(data, dict) or data.get('secret') != PHANTOM_SECRET:
+        stats.dropped += 1
+        metrics.inc(M_REJ_INVALID)
+        req.reply(401, b'{"ok": false, "error": "Invalid secret"}')
+        return
+    status, body, retry = queue_zoom(data, time.monotonic())
+    req.reply(status, body, headers="Retry-After: {}\r\n".format(retry) if retry else "")
+
+def handle_batch(req, items):
+    """Mehrere Zoom-Befehle in einem Request; Secret einmal (erstes Element), Ergebnis je Befehl.
+
+    Das erste Element trägt das Secret, allein ({"secret": ...}) oder mit dem
+    ersten Befehl. Weitere Elemente brauchen keins; ein abweichendes Secret
+    lehnt nur dieses Element ab.
+    """
+    if not items or not isinstance(items[0], dict) \
+            or items[0].get('secret') != PHANTOM_SECRET:
+        stats.dropped += 1
+        metrics.inc(M_REJ_INVALID)
+        req.reply(401, b'{"ok": false, "error": "Invalid secret"}')
+        return
+    # reine Secret-Zeile ist kein Befehl
+    commands = items[1:] if len(items[0]) == 1 else items
+    if len(commands) > HTTP_BATCH_MAX:
+        stats.dropped += 1
+        metrics.inc(M_REJ_INVALID)
+        req.reply(413, b'{"ok": false, "error": "Batch too large"}')
+        return
+    stats.rx += len(commands) - 1
+
+    now = time.monotonic()
+    results = []
+    accepted = 0
+    for data in commands:
+        if not isinstance(data, dict):
+            stats.dropped += 1
+            metrics.inc(M_REJ_INVALID)
+            results.append('{"ok": false, "error": "Invalid command"}')
+            continue
+        if data.get('secret', PHANTOM_SECRET) != PHANTOM_SECRET:
+            stats.dropped += 1
+            metrics.inc(M_REJ_INVALID)
+            results.append('{"ok": false, "error": "Invalid secret"}')
+            continue
+        status, body, retry = queue_zoom(data, now)
+        if status == 200:
+            accepted += 1
+        results.append(body)
+    req.reply(200, '{{"ok": true, "accepted": {}, "results": [{}]}}'.format(accepted, ", ".join(results)))
+
+def queue_zoom(data, now):
+    """Einen Zoom-Befehl (Secret bereits geprüft) einreihen -> (HTTP-Status, JSON, Retry-After)."""
+    try:
+        zoom_val = int(data.get('zoom', 0))
+    except (TypeError, ValueError):
+        zoom_val = 0
+    viewer = str(data.get('viewer', 'unknown'))[:10]
+    if not 1 <= zoom_val <= 30:
+        stats.dropped += 1
+        metrics.inc(M_REJ_INVALID)
+        return 400, '{"ok": false, "error": "Invalid zoom"}', 0
+    viewer_raw = viewer.encode('utf-8')
+    limit = limiter.allow(viewer_key(viewer_raw), now)
+    if limit != ALLOWED:
+        stats.dropped += 1
+        metrics.inc(M_REJ_RATE)
+        return rate_limited(limit)
+    # Einreihen; Overlay/Zoom folgen im Zoom-Abschnitt der Hauptschleife
+    pos = zoom_queue.push(zoom_val, viewer_raw, now)
+    if pos == QUEUE_FULL:
+        stats.dropped += 1
+        metrics.inc(M_REJ_QUEUE)
+        return 503, '{"ok": false, "error": "Queue full"}', 0
+    metrics.inc(M_APPLIED)
+    wait = int(zoom_queue.wait_estimate(now, pos))
+    log.info("PhantomBot: Viewer/Zoom/Position", viewer, zoom_val, pos)
+    return 200, '{{"ok": true, "position": {}, "wait": {}}}'.format(pos, wait), 0
+
+def rate_limited(limit):
+    """429 mit Retry-After (ganze Sekunden, aufgerundet)."""
+    retry = int(limiter.wait) + 1
+    scope = "global" if limit == LIMIT_GLOBAL else "viewer"
+    if DEBUG_ON:
+        log.debug("HTTP RATE-LIMIT:", scope, "retry", retry)
+    return 429, '{{"ok": false, "error": "Rate limited", "scope": "{}", "retry_after": {}}}'.format(scope, retry), retry
+
+def render_metrics():
+    """Gespiegelte Zähler übernehmen und alle Metriken als Text liefern (nur beim Abruf)."""
+    metrics.set(M_RX, stats.rx - metrics.v[M_RX_WS])  # stats.rx zählt beide Quellen
+    metrics.set(M_COALESCED, visca.coalesced)
+    for c in range(len(TX_CLASSES)):
+        metrics.set(M_UART_BYTES + c, visca.class_bytes[c])
+        metrics.set(M_UART_PACKETS + c, visca.class_packets[c])
+    metrics.set(M_CAMERA_ERRORS, visca.errors)
+    metrics.set(M_OVERRIDES, zoom_queue.served)
+    metrics.set(M_QUEUE_DEPTH, zoom_queue.depth)
+    return metrics.render()
+
+def handle_ws_message(req, payload):
+    """Nachricht der Bedienseite (JSON): zuerst das Secret, danach Befehle."""
+    global operator_zoom, operator_poti, brightness
+    i = req.slot
+    try:
+        data = json.loads(str(payload, "utf-8"))
+    except (ValueError, UnicodeError):
+        data = None
+    if not isinstance(data, dict):
+        stats.dropped += 1
+        metrics.inc(M_REJ_INVALID)
+        server.ws_send(i, WS_ERR_INVALID)
+        return
+    if not ws_auth[i]:
+        if data.get('secret') != PHANTOM_SECRET:
+            stats.dropped += 1
+            metrics.inc(M_REJ_INVALID)
+            server.ws_send(i, WS_ERR_SECRET)
+            server.ws_close(i, 1008)
+            return
+        ws_auth[i] = 1
+        server.ws_send(i, ws_state_json())
+        return
+
+    stats.rx += 1
+    metrics.inc(M_RX_WS)
+    if state == SystemState.OFF:
+        stats.ignored += 1
+        metrics.inc(M_REJ_POWER)
+        server.ws_send(i, WS_ERR_POWER)
+        return
+    try:
+        zoom = int(data.get('zoom', -1))
+        bright = int(data.get('bright', -1))
+    except (TypeError, ValueError):
+        zoom = bright = -2
+    if zoom < -1 or zoom > 30 or bright < -1 or bright > 20:
+        stats.dropped += 1
+        metrics.inc(M_REJ_INVALID)
+        server.ws_send(i, WS_ERR_INVALID)
+        return
+
+    if zoom == 0:
+        operator_zoom = None
+    elif zoom > 0:
+        operator_zoom = zoom
+        operator_poti = scale_adc_to_zoom(poti.value)
+    if 'freeze' in data:
+        on = bool(data['freeze'])
+        if on != visca.freeze:
+            visca.set_freeze(on)
+            pins["freeze_led_green"].value = not visca.freeze
+            pins["freeze_led_red"].value = visca.freeze
+    if 'af' in data:
+        on = bool(data['af'])
+        if on != visca.autofocus:
+            visca.set_autofocus(on)
+            pins["autofocus_led_green"].value = visca.autofocus
+            pins["autofocus_led_red"].value = not visca.autofocus
+    if bright >= 0:
+        brightness = bright
+        encoder.position = brightness  # Encoder folgt, sonst setzt er den Wert zurück
+        visca.set_brightness(brightness)
+    metrics.inc(M_APPLIED)
+    if DEBUG_ON:
+        log.debug("WS:", data)
+
+def ws_state_json():
+    """Zustand für die Bedienseite (allokiert; nur bei Änderung bzw. Anmeldung)."""
+    return json.dumps({
+        "zoom": zoom_now,
+        "source": SOURCE_NAMES[zoom_source],
+        "viewer": last_viewer,
+        "freeze": visca.freeze,
+        "af": visca.autofocus,
+        "bright": brightness,
+        "power": state != SystemState.OFF,
+        "depth": zoom_queue.depth,
+    })
+
+def send_log_dump(req):
+    """GET /log: Log-Ring als text/plain (ältester Eintrag zuerst)."""
+    req.reply(200, "\n".join(log.lines()) + "\n", content_type="text/plain; charset=utf-8")
 
 def update_oled(zoom, autofocus, freeze):
-    oled.fill(0)
-    oled.text("Live" if not freeze else "Freeze", 0, 0, 1)
-    oled.text("AF" if autofocus else "MF", 0, DISPLAY_HEIGHT - 10, 1)
-    oled.text(f"Bright: {brightness}", 50, DISPLAY_HEIGHT - 30, 1)
-    oled.text(f"Zoom: {zoom}x", 50, DISPLAY_HEIGHT - 20, 1)
-    oled.text("Manual", 50, DISPLAY_HEIGHT - 10, 1)
-    oled.show()
+    # Nur Felder setzen; gezeichnet/gesendet wird in display.render() (nur Änderungen)
+    display.set(F_LIVE, "Live" if not freeze else "Freeze")
+    display.set(F_AF, "AF" if autofocus else "MF")
+    display.set(F_BRIGHT, BRIGHT_TEXT[brightness])
+    display.set(F_ZOOM, ZOOM_TEXT[zoom])
+    display.set(F_MODE, "Manual")
+
+# HTTP-Server Setup (non-blocking, Keep-Alive, mehrere Verbindungen)
+# Alle Sockets laufen über den Multiplexer: gelesen wird nur, was bereit ist
+if wifi.radio.connected:
+    pool = socketpool.SocketPool(wifi.radio)
+    mux = NetMux(NETMUX_SLOTS, NETMUX_TICK_BUDGET, NETMUX_MAX_SKIP)
+    server = HttpServer(pool, HTTP_PORT, handle_http_request, HTTP_MAX_CONN,
+                        HTTP_BUF_SIZE, HTTP_IDLE_TIMEOUT, mux=mux, budget=HTTP_READ_BUDGET,
+                        ws_handler=handle_ws_message, ws_ping=WS_PING)
+    log.info("HTTP-Server auf Port", HTTP_PORT, "gestartet, Netz-Modus", mux.mode)
+else:
+    pool = None
+    mux = None
+    server = None
+    log.warn("Kein WiFi: HTTP-Server deaktiviert.")
+
+# Ab hier ordnet ein harter Watchdog-Reset der Hauptschleife zu
+guard.enter("loop", persist=True)
 
 while True:
     now = time.monotonic()
+    guard.feed()
+    mem.begin_tick()
+    stats.tick(now)
+    metrics.tick(now)
+    busy = False
 
-    # ---------- HTTP-Server (non-blocking) ----------
-    if server:
-        try:
-            conn, addr = server.accept()
-            if conn:
-                handle_http_request(conn)
-                conn.close()
-        except OSError:
-            pass
+    # ---------- HTTP-Server (non-blocking, über den Multiplexer) ----------
+    guard.enter("http", STALL_BUDGETS["http"])
+    if mux and mux.service(now):
+        busy = True
+    if server and server.poll(now):
+        busy = True
+    guard.leave()
+    mem.mark(MEM_HTTP)
 
     # ---------- Power ----------
+    guard.enter("power", STALL_BUDGETS["power"])
     current_power_state = pins["power_button"].value
     if current_power_state != button_debounce["power_button"]["stable_state"]:
         if (now - button_debounce["power_button"]["last_time"]) > DEBOUNCE_TIME:
             button_debounce["power_button"]["stable_state"] = current_power_state
             button_debounce["power_button"]["last_time"] = now
             if not current_power_state:  # Button gedrückt (active-low)
-                print("Power button pressed")  # Debugging
+                if DEBUG_ON:
+                    log.debug("Power button pressed")
                 if state == SystemState.OFF:
                     state = SystemState.MANUAL
                     pins["power_led_green"].value = True
@@ -184,26 +510,23 @@ while True:
                     pins["power_led_green"].value = False
                     pins["power_led_red"].value = True
                     visca.set_power(False)
-                    zoom_override = None
-                    last_viewer = ""
-                    visca.set_overlay_text("", line=0x10)
-                    visca.set_overlay_text("", line=0x11)
+                    # Warteschlange leeren; Overlay-Zeilen leert der Zoom-Abschnitt
+                    zoom_queue.clear()
                     if server:
-                        try:
-                            server.close()
-                        except:
-                            pass
-                    oled.fill(0)
-                    oled.show()
+                        server.close()
+                    display.clear()
+    guard.leave()
 
     # ---------- Focus ----------
+    guard.enter("buttons", STALL_BUDGETS["buttons"])
     current_focus_state = pins["focus_button"].value
     if current_focus_state != button_debounce["focus_button"]["stable_state"]:
         if (now - button_debounce["focus_button"]["last_time"]) > DEBOUNCE_TIME:
             button_debounce["focus_button"]["stable_state"] = current_focus_state
             button_debounce["focus_button"]["last_time"] = now
             if not current_focus_state and state != SystemState.OFF:
-                print("Focus button pressed")  # Debugging
+                if DEBUG_ON:
+                    log.debug("Focus button pressed")
                 visca.set_autofocus(not visca.autofocus)
                 pins["autofocus_led_green"].value = visca.autofocus
                 pins["autofocus_led_red"].value = not visca.autofocus
@@ -215,11 +538,16 @@ while True:
             button_debounce["freeze_button"]["stable_state"] = current_freeze_state
             button_debounce["freeze_button"]["last_time"] = now
             if not current_freeze_state and state != SystemState.OFF:
-                print("Freeze button pressed")  # Debugging
+                if DEBUG_ON:
+                    log.debug("Freeze button pressed")
                 visca.set_freeze(not visca.freeze)
                 pins["freeze_led_green"].value = not visca.freeze
                 pins["freeze_led_red"].value = visca.freeze
 
+    # ---------- Diagnoseseite ----------
+    if page_button.update(now) == LONG:
+        diag.toggle(now)
+
     # ---------- Brightness ----------
     if (now - last_brightness_time) > BRIGHTNESS_DEBOUNCE:
         pos = encoder.position
@@ -227,29 +555,91 @@ while True:
             brightness = max(0, min(20, pos))
             visca.set_brightness(brightness)
             last_brightness_time = now
+    guard.leave()
+    mem.mark(MEM_BUTTONS)
+
+    # ---------- Warteschlange: Slots weiterschalten, Overlay einmal pro Tick ----------
+    guard.enter("zoom", STALL_BUDGETS["zoom"])
+    # Overlay- und Zoom-Befehle eines Ticks (z.B. nach einem Batch) als ein UART-Write
+    visca.begin_batch()
+    try:
+        changed = zoom_queue.update(now)
+        if changed & CHANGED_CURRENT:
+            if zoom_queue.active:
+                zoom_override = zoom_queue.zoom
+                last_viewer = zoom_queue.viewer()
+                visca.set_overlay_text("KAMERAKIND:", line=0x10)
+                visca.set_overlay_text(last_viewer, line=0x11)
+            else:
+                zoom_override = None
+                last_viewer = ""
+                visca.set_overlay_text("", line=0x10)
+                visca.set_overlay_text("", line=0x11)
+        if changed & CHANGED_NEXT:
+            nxt = zoom_queue.next_viewer()
+            visca.set_overlay_text((">" + nxt) if nxt else "", line=0x12)
+
+        # ---------- Zoom berechnen & anwenden ----------
+        poti_zoom = scale_adc_to_zoom(poti.value)
+        if operator_zoom is not None and abs(poti_zoom - operator_poti) > 1:
+            operator_zoom = None  # Poti bewegt: Bedienseite gibt ab
+        if zoom_override is not None:
+            zoom_now = zoom_override
+            zoom_source = SRC_VIEWER
+        elif operator_zoom is not None:
+            zoom_now = operator_zoom
+            zoom_source = SRC_OPERATOR
+        else:
+            zoom_now = poti_zoom
+            zoom_source = SRC_POTI
+        if state != SystemState.OFF and zoom_now != last_zoom_sent:
+            visca.set_zoom(zoom_now)
+            last_zoom_sent = zoom_now
+            busy = True
+
+        # ---------- Overlay Zoom ----------
+        if zoom_now != last_overlay_zoom:
+            visca.set_overlay_text(ZOOM_OVERLAY_TEXT[zoom_now], line=0x1A)
+            last_overlay_zoom = zoom_now
+    finally:
+        visca.end_batch()
+
+    # ---------- Bedienseite: Zustand nur bei Änderung pushen ----------
+    if server and (now - last_ws_push) >= WS_STATE_INTERVAL:
+        # Signatur als kleiner int (< 2^30) -> Vergleich ohne Allokation
+        sig = (zoom_now | zoom_source << 5 | visca.freeze << 7 | visca.autofocus << 8
+               | brightness << 9 | (state != SystemState.OFF) << 14
+               | (zoom_queue.version & 0x7FFF) << 15)
+        if sig != ws_sig:
+            ws_sig = sig
+            last_ws_push = now
+            msg = None
+            for i in range(server.max_conn):
+                if ws_auth[i] and server.is_websocket(i):
+                    if msg is None:
+                        msg = ws_state_json()
+                    server.ws_send(i, msg)
+    guard.leave()
+    mem.mark(MEM_ZOOM)
+
+    # ---------- OLED Update (nur Änderungen, max. DISPLAY_MAX_FPS) ----------
+    guard.enter("oled", STALL_BUDGETS["oled"])
+    update_oled(zoom_now, visca.autofocus, visca.freeze)
+    diag.update(now)
+    display.render(now)
+    guard.leave()
+    mem.mark(MEM_OLED)
 
-    # ---------- Override Timeout ----------
-    if zoom_override is not None and now > zoom_timeout:
-        zoom_override = None
-        last_viewer = ""
-        visca.set_overlay_text("", line=0x10)
-        visca.set_overlay_text("", line=0x11)
-
-    # ---------- Zoom berechnen & anwenden ----------
-    zoom_now = zoom_override if zoom_override is not None else scale_adc_to_zoom(poti.value)
-    if state != SystemState.OFF and zoom_now != last_zoom_sent:
-        visca.set_zoom(zoom_now)
-        last_zoom_sent = zoom_now
-
-    # ---------- Overlay Zoom ----------
-    if zoom_now != last_overlay_zoom:
-        visca.set_overlay_text(f"{zoom_now:2d}x", line=0x1A)
-        last_overlay_zoom = zoom_now
-
-    # ---------- OLED Update (weniger häufig) ----------
-    if now - last_oled_update > OLED_UPDATE_INTERVAL:
-        update_oled(zoom_now, visca.autofocus, visca.freeze)
-        last_oled_update = now
+    # ---------- Leerlauf-Fenster: GC, Speicherbericht, Log auf die Konsole ----------
+    if not busy:
+        mem.idle(now)
+        if (now - last_mem_report) > MEM_REPORT_INTERVAL:
+            for line in mem.report():
+                log.info(line)
+            log.info("QUEUE tiefe/bedient/max_wait:", zoom_queue.depth, zoom_queue.served,
+                     int(zoom_queue.max_wait))
+            last_mem_report = now
+        log.flush(LOG_FLUSH_LINES)
 
     # ---------- Minimale Schleifenverzögerung ----------
     time.sleep(0.005)  # 5 ms für schnellere Reaktion
\ No newline at end of file
@@ -0,0 +1,158 @@
+# netmux.py — Ein Multiplexer für alle Netz-Eingänge (UDP, HTTP, IRC)
+# - Jeder Socket wird einmal mit einem Callback registriert:
+#     callback(now, budget) -> Anzahl verarbeiteter Bytes (0 = nichts da)
+#   Der Callback liest non-blocking und hört nach `budget` Bytes auf
+# - service() einmal pro Tick:
+#   * mit select.poll() (wenn der Port es für Sockets kann): nur bereite
+#     Sockets werden aufgerufen
+#   * sonst Round-Robin über alle Sockets; wer leer war, wird mit wachsendem
+#     Abstand (bis max_skip Ticks) gefragt -> Kosten folgen dem Verkehr,
+#     nicht der Zahl der Listener
+# - Tick-Budget über alle Sockets; ist es erschöpft, beginnt der nächste
+#   Tick beim nächsten Socket (kein Listener verhungert)
+# - Feste Slot-Tabelle, Zähler je Slot für Diagnose
+
+try:
+    import select
+except ImportError:
+    select = None
+
+
+class NetMux:
+    def __init__(self, slots=8, tick_budget=4096, max_skip=4):
+        self.tick_budget = tick_budget
+        self.max_skip = max_skip
+
+        # Slots: parallele Listen, None = frei
+        self._sock = [None] * slots
+        self._cb = [None] * slots
+        self._budget = [0] * slots
+        self._skip = bytearray(slots)   # Ticks bis zur nächsten Abfrage (Round-Robin)
+        self._idle = bytearray(slots)   # Backoff-Stufe nach leeren Abfragen
+        self._next = 0
+
+        self._poller = None
+        if select is not None and hasattr(select, "poll"):
+            try:
+                self._poller = select.poll()
+            except Exception:
+                self._poller = None
+
+        # Monitoring
+        self.bytes = [0] * slots
+        self.calls = [0] * slots
+        self.empty = 0      # Abfragen ohne Daten
+        self.errors = 0
+        self.last_error = None
+
+    @property
+    def mode(self):
+        return "poll" if self._poller is not None else "rr"
+
+    # ---------- Registrierung ----------
+    def register(self, sock, callback, budget=1024):
+        """Socket anmelden; liefert den Slot."""
+        for i in range(len(self._sock)):
+            if self._sock[i] is None:
+                self._sock[i] = sock
+                self._cb[i] = callback
+                self._budget[i] = budget
+                self._skip[i] = 0
+                self._idle[i] = 0
+                self.bytes[i] = 0
+                self.calls[i] = 0
+                if self._poller is not None:
+                    try:
+                        self._poller.register(sock, select.POLLIN)
+                    except Exception:
+                        # Port kann Sockets nicht pollen -> Round-Robin für alle
+                        self._poller = None
+                return i
+        raise RuntimeError("netmux: keine freien Slots")
+
+    def unregister(self, sock):
+        for i in range(len(self._sock)):
+            if self._sock[i] is sock:
+                self._sock[i] = None
+                self._cb[i] = None
+                if self._poller is not None:
+                    try:
+                        self._poller.unregister(sock)
+                    except Exception:
+                        pass
+                return True
+        return False
+
+    def wake(self, sock):
+        """Socket im nächsten Tick sicher abfragen (z.B. nach eigenem Senden)."""
+        for i in range(len(self._sock)):
+            if self._sock[i] is sock:
+                self._skip[i] = 0
+                self._idle[i] = 0
+                return
+
+    # ---------- Tick ----------
+    def service(self, now):
+        """Bereite bzw. fällige Sockets bedienen. Rückgabe: verarbeitete Bytes."""
+        if self._poller is not None:
+            return self._service_poll(now)
+        return self._service_rr(now)
+
+    def _service_poll(self, now):
+        total = 0
+        try:
+            events = self._poller.poll(0)
+        except Exception:
+            self._poller = None
+            return self._service_rr(now)
+        for ev in events:
+            if total >= self.tick_budget:
+                break
+            sock = ev[0]
+            for i in range(len(self._sock)):
+                if self._sock[i] is sock:
+                    total += self._call(i, now)
+                    break
+        return total
+
+    def _service_rr(self, now):
+        total = 0
+        n = len(self._sock)
+        start = self._next
+        for k in range(n):
+            i = (start + k) % n
+            if self._cb[i] is None:
+                continue
+            if total >= self.tick_budget:
+                self._next = i  # nächster Tick beginnt hier
+                return total
+            if self._skip[i]:
+                self._skip[i] -= 1
+                continue
+            got = self._call(i, now)
+            total += got
+            if got:
+                self._idle[i] = 0
+            else:
+                idle = self._idle[i]
+                if idle < self.max_skip:
+                    idle += 1
+                    self._idle[i] = idle
+                self._skip[i] = idle
+        self._next = (start + 1) % n
+        return total
+
+    def _call(self, i, now):
+        self.calls[i] += 1
+        try:
+            got = self._cb[i](now, self._budget[i])
+        except Exception as e:
+            self.errors += 1
+            self.last_error = e
+            return 0
+        if got:
+            self.bytes[i] += got
+        else:
+            self.empty += 1
+            got = 0
+        return got
@@ -0,0 +1,117 @@
+# rate_limit.py — Token-Bucket-Begrenzung für Zoom-Befehle aus dem Netz
+# - Ein globaler Bucket (schützt Objektivmotor und UART vor Bursts)
+# - Ein Bucket je Viewer in einer Tabelle fester Größe; ist sie voll, wird
+#   der am längsten unbenutzte Viewer verdrängt (LRU)
+# - Viewer werden über einen 20-Bit-Hash ihres Namens identifiziert: keine
+#   String-Kopie pro Anfrage, Kosten je Anfrage O(1), Speicher fest begrenzt
+#   (eine seltene Hash-Kollision teilt sich höchstens einen Bucket)
+
+from micropython import const
+
+ALLOWED = const(0)
+LIMIT_GLOBAL = const(1)
+LIMIT_VIEWER = const(2)
+
+
+def viewer_key(buf, start=0, end=None):
+    """
+    FNV-1a über den Namen (ohne Groß-/Kleinschreibung), auf 20 Bit gekürzt.
+    20 Bit halten das Produkt unter 2**30 -> bleibt ein Small-Int (keine Allokation).
+    """
+    if end is None:
+        end = len(buf)
+    h = 0x1C9DC
+    for i in range(start, end):
+        b = buf[i]
+        if 65 <= b <= 90:
+            b |= 0x20
+        h = ((h ^ b) * 0x193) & 0xFFFFF
+    return h
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate      # Token pro Sekunde
+        self.burst = burst    # maximale Token (Burst-Größe)
+        self.tokens = burst
+        self.last = 0.0
+
+    def refill(self, now):
+        tokens = self.tokens + (now - self.last) * self.rate
+        self.tokens = tokens if tokens < self.burst else self.burst
+        self.last = now
+
+    def wait(self):
+        """Sekunden bis zum nächsten vollen Token (nach refill())."""
+        missing = 1.0 - self.tokens
+        return missing / self.rate if missing > 0 and self.rate else 0.0
+
+
+class RateLimiter:
+    def __init__(self, global_rate, global_burst, viewer_rate, viewer_burst, slots=32):
+        self.bucket = TokenBucket(global_rate, global_burst)
+        self.viewer_rate = viewer_rate
+        self.viewer_burst = viewer_burst
+
+        # Viewer-Tabelle: parallele Listen, Schlüssel -> Slot über dict
+        self._slot = {}
+        self._key = [None] * slots
+        self._tokens = [0.0] * slots
+        self._last = [0.0] * slots
+        self._used = 0
+
+        # Statistik / Rückmeldung
+        self.wait = 0.0          # nach Ablehnung: Sekunden bis erneut erlaubt
+        self.rejected_global = 0
+        self.rejected_viewer = 0
+        self.evictions = 0
+
+    def _viewer_slot(self, key, now):
+        i = self._slot.get(key)
+        if i is not None:
+            return i
+        if self._used < len(self._key):
+            i = self._used
+            self._used += 1
+        else:
+            # LRU: Slot mit der ältesten Nutzung verdrängen (feste Tabellengröße)
+            last = self._last
+            i = 0
+            for j in range(1, len(last)):
+                if last[j] < last[i]:
+                    i = j
+            del self._slot[self._key[i]]
+            self.evictions += 1
+        self._slot[key] = i
+        self._key[i] = key
+        self._tokens[i] = self.viewer_burst
+        self._last[i] = now
+        return i
+
+    def allow(self, key, now):
+        """
+        Prüft Viewer- und globalen Bucket und verbraucht nur bei Erfolg je ein Token.
+        Rückgabe ALLOWED, LIMIT_VIEWER oder LIMIT_GLOBAL (dann ist self.wait gesetzt).
+        """
+        i = self._viewer_slot(key, now)
+        tokens = self._tokens[i] + (now - self._last[i]) * self.viewer_rate
+        if tokens > self.viewer_burst:
+            tokens = self.viewer_burst
+        self._tokens[i] = tokens
+        self._last[i] = now
+        if tokens < 1.0:
+            self.wait = (1.0 - tokens) / self.viewer_rate if self.viewer_rate else 0.0
+            self.rejected_viewer += 1
+            return LIMIT_VIEWER
+
+        bucket = self.bucket
+        bucket.refill(now)
+        if bucket.tokens < 1.0:
+            self.wait = bucket.wait()
+            self.rejected_global += 1
+            return LIMIT_GLOBAL
+
+        bucket.tokens -= 1.0
+        self._tokens[i] = tokens - 1.0
+        self.wait = 0.0
+        return ALLOWED
@@ -0,0 +1,191 @@
+# stall_guard.py — Watchdog-gestützte Hänger-Erkennung mit Stufen-Zuordnung
+# - Hardware-Watchdog (RESET-Modus), wird aus der Hauptschleife gefüttert
+# - Fortschrittsmarker: welche Stufe gerade läuft (Name, Start, Budget)
+# - Budget überschritten -> Stufe + Timing ins NVM, danach Reset
+# - Blockierende Stufen (WiFi, Twitch, Power) hinterlegen vorab eine
+#   "Brotkrume" im NVM, damit auch ein harter Watchdog-Reset zuordenbar ist
+# - Nächster Boot: Bericht auf OLED und Konsole
+
+import time
+import microcontroller
+from watchdog import WatchDogMode
+
+WATCHDOG_MAX = 8.0  # RP2040: Hardware-Maximum ~8.3 s
+
+_MAGIC = 0xA5
+_KIND_NONE = 0
+_KIND_BREADCRUMB = 1
+_KIND_OVERRUN = 2
+_NAME_LEN = 12
+# Layout: magic, kind, elapsed_ms (u32 BE), budget_ms (u32 BE), name (12 Bytes)
+_REC_LEN = 10 + _NAME_LEN
+
+
+class StallGuard:
+    def __init__(self, timeout, nvm_offset=0):
+        self.timeout = min(timeout, WATCHDOG_MAX)
+        self.nvm_offset = nvm_offset
+        self.enabled = False
+
+        self.stage_name = "boot"
+        self.stage_budget = self.timeout
+        self.stage_start = time.monotonic()
+
+        # Langsamste gemessene Dauer je Stufe (Sekunden)
+        self.worst = {}
+
+        self._outer_name = None
+        self._outer_budget = None
+        self._outer_crumb = None
+        self._crumb = None      # Stufe der aktuellen NVM-Brotkrume
+        self._rec = bytearray(_REC_LEN)
+
+    # ---------- Watchdog ----------
+    def start(self):
+        """Hardware-Watchdog scharf schalten (ab hier muss gefüttert werden)."""
+        wdt = microcontroller.watchdog
+        wdt.timeout = self.timeout
+        wdt.mode = WatchDogMode.RESET
+        wdt.feed()
+        self.enabled = True
+
+    def feed(self):
+        if self.enabled:
+            microcontroller.watchdog.feed()
+
+    # ---------- Stufen ----------
+    def enter(self, name, budget=None, persist=False):
+        """
+        Markiert den Beginn einer Stufe.
+        persist=True nur für seltene, blockierende Stufen: schreibt die
+        Brotkrume ins NVM (Flash!), damit ein harter Reset zugeordnet werden kann.
+        """
+        self.feed()
+        self.stage_name = name
+        self.stage_budget = budget if budget else self.timeout
+        self.stage_start = time.monotonic()
+        if persist:
+            self._write(_KIND_BREADCRUMB, name, 0, self.stage_budget)
+            self._crumb = name
+
+    def leave(self):
+        """Beendet die aktuelle Stufe. Budget überschritten -> protokollieren + Reset."""
+        elapsed = time.monotonic() - self.stage_start
+        name = self.stage_name
+        if elapsed > self.worst.get(name, 0.0):
+            self.worst[name] = elapsed
+        if elapsed > self.stage_budget:
+            self.trip(elapsed)
+        self.feed()
+        return elapsed
+
+    def push(self, name, budget=None, persist=False):
+        """Wie enter(), merkt sich aber die äußere Stufe (eine Ebene) für pop()."""
+        self._outer_name = self.stage_name
+        self._outer_budget = self.stage_budget
+        self._outer_crumb = self._crumb
+        self.enter(name, budget, persist)
+
+    def pop(self):
+        """Beendet die innere Stufe und setzt die äußere mit frischer Startzeit fort."""
+        elapsed = self.leave()
+        if self._outer_name is not None:
+            self.enter(self._outer_name, self._outer_budget)
+            self._outer_name = None
+            # Brotkrume der inneren Stufe wieder auf die äußere zurückdrehen
+            if self._outer_crumb and self._crumb != self._outer_crumb:
+                self._write(_KIND_BREADCRUMB, self._outer_crumb, 0, self.timeout)
+                self._crumb = self._outer_crumb
+        return elapsed
+
+    def crumb(self, name):
+        """
+        Setzt nur die NVM-Brotkrume (ohne Stufe/Timing), z.B. einmal für eine
+        Phase aus vielen kurzen Stufen statt je Stufe. Rückgabe: bisherige Brotkrume.
+        """
+        prev = self._crumb
+        if name and name != prev:
+            self._write(_KIND_BREADCRUMB, name, 0, self.timeout)
+            self._crumb = name
+        return prev
+
+    def trip(self, elapsed):
+        """Stufe hat ihr Budget gesprengt: Bericht ins NVM schreiben und neu starten."""
+        print("STALL: Stufe '{}' {:.0f} ms (Budget {:.0f} ms) -> Reset".format(
+            self.stage_name, elapsed * 1000, self.stage_budget * 1000))
+        self._write(_KIND_OVERRUN, self.stage_name, elapsed, self.stage_budget)
+        microcontroller.reset()
+
+    # ---------- NVM ----------
+    def _write(self, kind, name, elapsed, budget):
+        rec = self._rec
+        rec[0] = _MAGIC
+        rec[1] = kind
+        _put_u32(rec, 2, int(elapsed * 1000))
+        _put_u32(rec, 6, int(budget * 1000))
+        raw = name.encode("utf-8")[:_NAME_LEN]
+        for i in range(_NAME_LEN):
+            rec[10 + i] = raw[i] if i < len(raw) else 0
+        start = self.nvm_offset
+        # Flash-Schreibzugriffe sparen: nur schreiben, wenn sich etwas ändert
+        if microcontroller.nvm[start:start + _REC_LEN] != rec:
+            microcontroller.nvm[start:start + _REC_LEN] = rec
+
+    def last_report(self):
+        """
+        Liefert den Bericht des letzten Hängers als (stufe, elapsed_ms, budget_ms)
+        oder None. elapsed_ms ist None, wenn der Hardware-Watchdog zugeschlagen
+        hat (die Stufe wurde nie beendet).
+        """
+        start = self.nvm_offset
+        rec = microcontroller.nvm[start:start + _REC_LEN]
+        if rec[0] != _MAGIC:
+            return None
+        kind = rec[1]
+        if kind == _KIND_OVERRUN:
+            elapsed_ms = _get_u32(rec, 2)
+        elif kind == _KIND_BREADCRUMB and _watchdog_reset():
+            elapsed_ms = None
+        else:
+            return None
+        name = bytes(rec[10:10 + _NAME_LEN]).split(b"\x00", 1)[0].decode("utf-8")
+        budget_ms = _get_u32(rec, 6)
+        # Bericht nur einmal anzeigen
+        microcontroller.nvm[start + 1] = _KIND_NONE
+        return (name, elapsed_ms, budget_ms)
+
+    def show_report(self, oled, report, hold=2.0):
+        """Stall-Bericht auf Konsole und OLED ausgeben."""
+        name, elapsed_ms, budget_ms = report
+        if elapsed_ms is None:
+            timing = ">{} ms WDT".format(budget_ms)
+        else:
+            timing = "{}/{} ms".format(elapsed_ms, budget_ms)
+        print("STALL-Bericht vom letzten Lauf: Stufe '{}' {}".format(name, timing))
+        try:
+            oled.fill(0)
+            oled.text("STALL vor Reset:", 0, 0, 1)
+            oled.text(name, 0, 16, 1)
+            oled.text(timing, 0, 28, 1)
+            oled.show()
+            time.sleep(hold)
+        except Exception as e:
+            print("OLED-Fehler (Stall-Bericht):", e)
+
+
+def _watchdog_reset():
+    try:
+        return microcontroller.cpu.reset_reason == microcontroller.ResetReason.WATCHDOG
+    except Exception:
+        return False
+
+
+def _put_u32(buf, pos, value):
+    buf[pos] = (value >> 24) & 0xFF
+    buf[pos + 1] = (value >> 16) & 0xFF
+    buf[pos + 2] = (value >> 8) & 0xFF
+    buf[pos + 3] = value & 0xFF
+
+
+def _get_u32(buf, pos):
+    return (buf[pos] << 24) | (buf[pos + 1] << 16) | (buf[pos + 2] << 8) | buf[pos + 3]
@@ -41,8 +41,94 @@ DISPLAY_HEIGHT = 64
 ZOOM_DEBOUNCE = 0.0
 BRIGHTNESS_DEBOUNCE = 0.05
 
-# Override-Timeout: wie lange !zoom per UDP aktiv bleibt
+# Override-Timeout: wie lange ein !zoom per UDP aktiv bleibt (garantierter Slot je Einlösung)
 ZOOM_OVERRIDE_TIMEOUT = 20  # Sekunden
+# Warteschlange für Einlösungen (zoom_queue.py): max. wartende Viewer
+ZOOM_QUEUE_SIZE = 8
 
 # UDP (Streamer.bot -> Pico)
 UDP_PORT = 4242
+# Pakete je Tick: Budget passt sich der restlichen Schleifenzeit an
+UDP_LOOP_TARGET = 0.02      # Sekunden: angestrebte Dauer eines Schleifendurchlaufs
+UDP_DRAIN_MIN = 0.002       # Sekunden: Mindestbudget zum Leeren des Sockets
+UDP_DRAIN_MAX_PACKETS = 64  # harte Obergrenze je Tick
+UDP_READ_BUDGET = 4096      # Bytes je Tick vom UDP-Socket
+
+# Netz-Multiplexer (netmux.py): alle Sockets einmal pro Tick, select.poll() wenn
+# der Port es kann, sonst Round-Robin mit Backoff für leere Sockets
+NETMUX_SLOTS = 8            # Sockets gesamt (UDP, OBS-Listen-Socket + Verbindungen)
+NETMUX_TICK_BUDGET = 8192   # Bytes je Tick über alle Sockets
+NETMUX_MAX_SKIP = 3         # leere Sockets höchstens so viele Ticks auslassen
+
+# Multicast: ein Datagramm steuert mehrere Stationen (udp_protocol.py, "@ziele"-Präfix)
+UDP_MULTICAST_GROUP = None  # z.B. "239.255.42.42"; None = nur Unicast
+STATION_ID = 1              # 1..127, adressierbar mit "@1" bzw. dst=1
+STATION_GROUPS = ()         # Gruppen 1..29, adressierbar mit "@g2" bzw. dst=0x82
+
+# Rate-Limit für Zoom-Befehle (rate_limit.py): Token-Buckets global + je Viewer
+RATE_GLOBAL_PER_SEC = 1.0       # global: Zoom-Befehle pro Sekunde (Dauerrate)
+RATE_GLOBAL_BURST = 5           # global: so viele direkt hintereinander
+RATE_VIEWER_PER_SEC = 1 / 15.0  # je Viewer: ein Befehl alle 15 s ...
+RATE_VIEWER_BURST = 2           # ... nach einem Burst von 2
+RATE_VIEWER_SLOTS = 32          # Viewer-Tabelle (LRU), fester Speicher
+RATE_LIMIT_REPLY = True         # abgelehnte Befehle dem Absender melden
+
+# Telemetrie (telemetry.py): Zustandsmeldungen an Abonnenten ("SUB" per UDP)
+TELEMETRY_SLOTS = 4             # gleichzeitige Abonnenten (feste Tabelle)
+TELEMETRY_TIMEOUT = 60.0        # Sekunden ohne erneutes "SUB" -> Abo läuft ab
+TELEMETRY_HEARTBEAT = 5.0       # Sekunden zwischen Vollzuständen
+TELEMETRY_MIN_INTERVAL = 0.05   # Sekunden: Deltas höchstens so oft
+
+# Viewer-Overlay: Kamera-Titel kosten ~100 ms UART je Override (9600 Baud)
+# "full": ZOOM BY/Viewer/Nächster + Zoomstufe, "minimal": nur Zoomstufe, "off": keine
+CAMERA_OVERLAY = "full"
+# OBS-Browserquelle (obs_feed.py): http://<pico>:OBS_FEED_PORT/ in OBS einbinden
+OBS_FEED = False
+OBS_FEED_PORT = 8080
+OBS_FEED_CLIENTS = 3            # gleichzeitige Event-Streams
+OBS_FEED_SEND_TIMEOUT = 0.05    # Sekunden je send(); Timeout schließt den Stream
+OBS_FEED_SEND_BUDGET = 0.2      # Sekunden Senden je Stufe, deutlich unter STALL_BUDGETS
+
+# Monitoring (metrics.py): UDP "METRICS" liefert Zähler im Prometheus-Textformat
+METRICS_PREFIX = "visca_"       # Präfix aller Metriknamen
+# Verwaltungs-Adressen: nur diese bekommen Antworten auf METRICS und LOGDUMP und
+# dürfen Telemetrie abonnieren (SUB/UNSUB). Absender-IP ist fälschbar -> sonst
+# Verstärker für fremden Verkehr, Logs offen und Telemetrie-Slots fremd belegt
+UDP_MGMT_HOSTS = ()             # z.B. ("192.168.1.10",); leer = alle vier abgeschaltet
+
+# Watchdog / Hänger-Erkennung (stall_guard.py)
+WATCHDOG_TIMEOUT = 8.0  # Sekunden (RP2040-Maximum ~8.3 s)
+STALL_BUDGETS = {       # Sekunden je Stufe, Überschreitung -> Bericht + Reset
+    "wifi": 7.0,
+    "power": 7.0,       # set_power(True) wartet 5 s auf die Kamera
+    "udp": 0.5,
+    "buttons": 0.5,
+    "zoom": 0.5,
+    "oled": 0.5,
+    "telemetry": 0.5,
+    "obs": 0.5,
+}
+
+# Speicher / GC (mem_monitor.py): nur in Leerlauf-Fenstern sammeln
+GC_MIN_FREE = 24 * 1024     # Bytes: unter dieser Reserve wird im Leerlauf gesammelt
+GC_MAX_INTERVAL = 30.0      # Sekunden: spätestens dann im Leerlauf sammeln
+MEM_REPORT_INTERVAL = 60.0  # Sekunden: Low-Water-Bericht auf der Konsole
+
+# UDP-Debugausgaben (RAW/TXT/TOK je Paket) — kostet Heap und USB-Zeit
+UDP_DEBUG = False
+
+# Logging (log.py): Level 10=DEBUG, 20=INFO, 30=WARN, 40=ERROR
+LOG_LEVEL = 20
+LOG_BUFFER_LINES = 64       # RAM-Ring, Ausgabe auf die Konsole nur im Leerlauf
+LOG_FLUSH_LINES = 4         # max. Zeilen je Leerlauf-Fenster
+LOG_ECHO = False            # True: sofort ausgeben (nur zur Entwicklung)
+
+# OLED (oled_display.py): nur geänderte Bereiche senden, Bildrate begrenzen
+DISPLAY_MAX_FPS = 10
+# Font für den Glyphen-Blitter (wird beim Start einmal in den RAM geladen)
+FONT_PATH = "font5x8.bin"
+
+# Diagnoseseite (diagnostics.py): Taste aus PIN_CONFIG, langer Druck schaltet um
+DIAG_BUTTON = "connected_button"  # kurzer Druck: Zoom-Overlay an/aus (wie bisher)
+DIAG_HOLD = 1.0                   # Sekunden gedrückt halten
+DIAG_INTERVAL = 0.5               # Sekunden zwischen Aktualisierungen der Seite
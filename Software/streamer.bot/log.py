@@ -0,0 +1,136 @@
+# log.py — Leveled, gepuffertes Logging statt synchronem print()
+# - Level-Check zur Importzeit: `if DEBUG_ON: log.debug(...)` kostet abgeschaltet
+#   nur einen Vergleich, die Argumente werden gar nicht erst ausgewertet
+# - Einträge landen in einem festen RAM-Ring (keine Allokation pro Eintrag,
+#   bis zu drei Argumente ohne Tupel), Formatierung erst beim Ausgeben
+# - Ausgabe auf die serielle Konsole nur im Leerlauf (flush), ältester zuerst
+# - lines() liefert den Puffer formatiert, z.B. für einen Netz-Dump
+
+import time
+from micropython import const
+
+from config import LOG_LEVEL, LOG_BUFFER_LINES, LOG_ECHO
+
+try:
+    from supervisor import ticks_ms, runtime
+except ImportError:
+    ticks_ms = None
+    runtime = None
+
+DEBUG = const(10)
+INFO = const(20)
+WARN = const(30)
+ERROR = const(40)
+
+# Zur Importzeit festgelegt -> Aufrufer prüfen eine Konstante statt eine Methode
+DEBUG_ON = LOG_LEVEL <= DEBUG
+INFO_ON = LOG_LEVEL <= INFO
+
+_NO = object()  # Platzhalter "kein Argument"
+
+
+def _level_char(lvl):
+    if lvl >= ERROR:
+        return "E"
+    if lvl >= WARN:
+        return "W"
+    if lvl >= INFO:
+        return "I"
+    return "D"
+
+
+def _now_ms():
+    if ticks_ms:
+        return ticks_ms()
+    return int(time.monotonic() * 1000)
+
+
+class RingLog:
+    def __init__(self, size, level=INFO, echo=False):
+        self.size = size
+        self.level = level
+        self.echo = echo
+
+        self._lvl = bytearray(size)
+        self._ts = [0] * size
+        self._msg = [None] * size
+        self._a = [None] * size
+        self._b = [None] * size
+        self._c = [None] * size
+
+        self._head = 0      # nächster Schreibplatz
+        self._count = 0     # belegte Einträge
+        self._unflushed = 0  # davon noch nicht auf der Konsole
+        self.dropped = 0    # überschrieben, bevor sie ausgegeben wurden
+
+    # ---------- Schreiben ----------
+    def _put(self, lvl, msg, a, b, c):
+        i = self._head
+        self._lvl[i] = lvl
+        self._ts[i] = _now_ms()
+        self._msg[i] = msg
+        self._a[i] = a
+        self._b[i] = b
+        self._c[i] = c
+        self._head = (i + 1) % self.size
+        if self._count < self.size:
+            self._count += 1
+        if self._unflushed < self.size:
+            self._unflushed += 1
+        else:
+            self.dropped += 1
+        if self.echo:
+            self.flush()
+
+    def debug(self, msg, a=_NO, b=_NO, c=_NO):
+        if self.level <= DEBUG:
+            self._put(DEBUG, msg, a, b, c)
+
+    def info(self, msg, a=_NO, b=_NO, c=_NO):
+        if self.level <= INFO:
+            self._put(INFO, msg, a, b, c)
+
+    def warn(self, msg, a=_NO, b=_NO, c=_NO):
+        if self.level <= WARN:
+            self._put(WARN, msg, a, b, c)
+
+    def error(self, msg, a=_NO, b=_NO, c=_NO):
+        if self.level <= ERROR:
+            self._put(ERROR, msg, a, b, c)
+
+    # ---------- Lesen ----------
+    def format(self, i):
+        """Formatiert Slot i (erst hier entstehen Strings)."""
+        out = "[{:>9.3f}] {} {}".format(self._ts[i] / 1000, _level_char(self._lvl[i]), self._msg[i])
+        for arg in (self._a[i], self._b[i], self._c[i]):
+            if arg is not _NO:
+                out += " " + str(arg)
+        return out
+
+    def flush(self, max_lines=None):
+        """
+        Gibt noch nicht ausgegebene Einträge auf der Konsole aus (ältester zuerst).
+        Ohne USB-Host bleibt alles im Ring (Netz-Dump geht weiterhin).
+        """
+        if not self._unflushed:
+            return 0
+        if runtime is not None and not runtime.serial_connected:
+            return 0
+        if self.dropped:
+            print("[log] {} Einträge verworfen (Ring voll)".format(self.dropped))
+            self.dropped = 0
+        n = self._unflushed if max_lines is None else min(max_lines, self._unflushed)
+        start = (self._head - self._unflushed) % self.size
+        for k in range(n):
+            print(self.format((start + k) % self.size))
+        self._unflushed -= n
+        return n
+
+    def lines(self):
+        """Alle Einträge im Ring formatiert (ältester zuerst), ohne sie zu verbrauchen."""
+        start = (self._head - self._count) % self.size
+        for k in range(self._count):
+            yield self.format((start + k) % self.size)
+
+
+log = RingLog(LOG_BUFFER_LINES, LOG_LEVEL, LOG_ECHO)
@@ -1,22 +1,115 @@
 # main.py — Optilia VISCA Controller (YouTube/Streamer.bot via UDP)
 # + Zoom-Overlay Anzeige per Tastendruck umschaltbar (standard: EIN)
 #   -> nutzt connected_button (GP11) als Toggle-Taste
+#   -> lange gedrückt (DIAG_HOLD): Live-Diagnoseseite auf dem OLED
+# + UDP: FREEZE/AF/BRIGHT/WB/PRESET zusätzlich zu ZOOM, mehrere Befehle je
+#   Datagramm werden im selben Tick angewendet (VISCA als ein UART-Write)
 
 import time
 import json
 import wifi
 import socketpool
 import digitalio  # wichtig
-import gc
 
 from config import (
     BRIGHTNESS_DEBOUNCE,
     ZOOM_OVERRIDE_TIMEOUT,
+    ZOOM_QUEUE_SIZE,
     DISPLAY_HEIGHT,
     UDP_PORT,
+    UDP_LOOP_TARGET,
+    UDP_DRAIN_MIN,
+    UDP_DRAIN_MAX_PACKETS,
+    UDP_READ_BUDGET,
+    NETMUX_SLOTS,
+    NETMUX_TICK_BUDGET,
+    NETMUX_MAX_SKIP,
+    UDP_MULTICAST_GROUP,
+    STATION_ID,
+    STATION_GROUPS,
+    RATE_GLOBAL_PER_SEC,
+    RATE_GLOBAL_BURST,
+    RATE_VIEWER_PER_SEC,
+    RATE_VIEWER_BURST,
+    RATE_VIEWER_SLOTS,
+    RATE_LIMIT_REPLY,
+    TELEMETRY_SLOTS,
+    TELEMETRY_TIMEOUT,
+    TELEMETRY_HEARTBEAT,
+    TELEMETRY_MIN_INTERVAL,
+    CAMERA_OVERLAY,
+    OBS_FEED,
+    OBS_FEED_PORT,
+    OBS_FEED_CLIENTS,
+    OBS_FEED_SEND_TIMEOUT,
+    OBS_FEED_SEND_BUDGET,
+    WATCHDOG_TIMEOUT,
+    STALL_BUDGETS,
+    GC_MIN_FREE,
+    GC_MAX_INTERVAL,
+    MEM_REPORT_INTERVAL,
+    UDP_DEBUG,
+    LOG_FLUSH_LINES,
+    DISPLAY_WIDTH,
+    DISPLAY_MAX_FPS,
+    FONT_PATH,
+    DIAG_BUTTON,
+    DIAG_HOLD,
+    DIAG_INTERVAL,
+    METRICS_PREFIX,
+    UDP_MGMT_HOSTS,
 )
 from hardware_setup import setup_hardware
-from visca_commands import ViscaCamera
+from visca_commands import ViscaCamera, TX_CLASSES
+from stall_guard import StallGuard
+from mem_monitor import MemMonitor
+from log import log, DEBUG_ON
+from oled_display import StatusDisplay, GlyphFont
+from udp_protocol import (
+    UdpCommandParser,
+    group_mask,
+    CMD_ZOOM,
+    CMD_OFF,
+    CMD_LOGDUMP,
+    CMD_PING,
+    CMD_FREEZE,
+    CMD_AF,
+    CMD_BRIGHT,
+    CMD_WB,
+    CMD_PRESET,
+    CMD_SUB,
+    CMD_UNSUB,
+    CMD_METRICS,
+    ARG_TOGGLE,
+    ST_OK,
+    ST_RATE_GLOBAL,
+    ST_RATE_VIEWER,
+    ST_QUEUE_FULL,
+    ST_POWER_OFF,
+    ST_NO_SLOT,
+    ST_DENIED,
+    FLAG_OVERRIDE,
+    FLAG_FREEZE,
+    FLAG_AUTOFOCUS,
+    FLAG_POWER,
+)
+from zoom_queue import ZoomQueue, QUEUE_FULL, CHANGED_CURRENT, CHANGED_NEXT
+from rate_limit import RateLimiter, viewer_key, ALLOWED, LIMIT_GLOBAL
+from telemetry import (
+    Telemetry,
+    T_ZOOM,
+    T_SOURCE,
+    T_REMAIN,
+    T_AF,
+    T_FREEZE,
+    T_BRIGHT,
+    T_POWER,
+    T_DEPTH,
+)
+from obs_feed import ObsFeed
+from netmux import NetMux
+from metrics import Metrics, COUNTER, GAUGE
+from diagnostics import LoopStats, DiagPage, PageButton, SHORT, LONG
 
 
 class SystemState:
@@ -29,112 +122,291 @@ def scale_adc_to_zoom(adc_value):
     return 30 - int((adc_value / 65535) * 29)
 
 
-def clamp_zoom(z):
-    try:
-        z = int(z)
-    except Exception:
-        return None
-    if z < 1:
-        z = 1
-    if z > 30:
-        z = 30
-    return z
-
-
-def safe_decode(raw: bytes) -> str:
-    """
-    CircuitPython-freundliches Decoding:
-    - bevorzugt UTF-8 (ohne errors keyword)
-    - fallback: ASCII-like mit Ersetzung nicht-druckbarer Bytes durch Leerzeichen
-    """
-    try:
-        return raw.decode("utf-8")
-    except Exception:
-        out = []
-        for b in raw:
-            if 32 <= b <= 126:
-                out.append(chr(b))
+# Vorformatierte Texte: in der Schleife keine String-Formatierung (Heap)
+BRIGHT_TEXT = tuple("Bright:{:2d}".format(b) for b in range(21))
+ZOOM_TEXT = tuple("Zoom:  {:2d}x".format(z) for z in range(31))
+ZOOM_OVERLAY_TEXT = tuple("{:2d}x".format(z) for z in range(31))
+
+_status_viewer = None
+_status_override = None
+_status_overlay = None
+_status_depth = None
+_status_text = ""
+
+
+def status_text(viewer, override_active, zoom_overlay_enabled, depth=0):
+    """Statuszeile nur neu bauen, wenn sich Viewer/Override/Overlay/Warteschlange ändern."""
+    global _status_viewer, _status_override, _status_overlay, _status_depth, _status_text
+    if (viewer != _status_viewer or override_active != _status_override
+            or zoom_overlay_enabled != _status_overlay or depth != _status_depth):
+        if override_active:
+            v = viewer if viewer else "YT"
+            if depth:
+                _status_text = "!zoom:{} +{}".format(v, depth)
             else:
-                out.append(" ")
-        return "".join(out)
-
-
-def parse_udp_message(msg: str):
-    """
-    Unterstützte Formate (case-insensitive):
-      - "ZOOM 12 Hannes"
-      - "!zoom 12 Hannes"
-      - "ZOOM:12:Hannes"
-      - "ZOOM=12;Hannes"
-      - "ZOOM 12" (Viewer optional)
-      - "ZOOMOFF" / "ZOOM OFF" / "!zoomoff" => Override sofort aus
-
-    Rückgabe: (zoom:int|None, viewer:str, force_off:bool)
-    """
-    if not msg:
-        return None, "", False
-
-    s = msg.strip()
-    if not s:
-        return None, "", False
-
-    low = s.lower().strip()
-
-    # Override sofort aus
-    if low in ("zoomoff", "!zoomoff", "zoom off", "!zoom off", "zoom:off", "zoom=off"):
-        return None, "", True
-
-    # vereinheitlichen: trenner -> spaces
-    s_norm = s.replace(";", " ").replace("=", " ").replace(":", " ")
-    parts = [p for p in s_norm.split() if p]
-    if not parts:
-        return None, "", False
-
-    p0 = parts[0].lower()
-
-    if p0 in ("zoom", "!zoom"):
-        if len(parts) >= 2 and parts[1].lower() == "off":
-            return None, "", True
-
-        if len(parts) >= 2:
-            zoom = clamp_zoom(parts[1])
-            viewer = parts[2] if len(parts) >= 3 else ""
-            return zoom, viewer[:10], False
-
-        return None, "", False
-
-    # Fallback: "zoom12" / "!zoom12"
-    if low.startswith("zoom") or low.startswith("!zoom"):
-        digits = ""
-        for ch in s:
-            if ch.isdigit():
-                digits += ch
-            elif digits:
+                _status_text = "!zoom: {} OVR".format(v)
+        else:
+            _status_text = "Overlay:ON" if zoom_overlay_enabled else "Overlay:OFF"
+        _status_viewer = viewer
+        _status_override = override_active
+        _status_overlay = zoom_overlay_enabled
+        _status_depth = depth
+    return _status_text
+
+
+# Antworten auf abgelehnte Zoom-Befehle (konstant -> keine Allokation)
+REPLY_LIMIT_GLOBAL = b"BUSY global\n"
+REPLY_LIMIT_VIEWER = b"BUSY viewer\n"
+REPLY_QUEUE_FULL = b"BUSY queue\n"
+REPLY_NO_SLOT = b"BUSY subscribers\n"
+
+
+def ack_flags():
+    """Zustandsbits für Binär-Acks."""
+    flags = 0
+    if zoom_queue.active:
+        flags |= FLAG_OVERRIDE
+    if visca.freeze:
+        flags |= FLAG_FREEZE
+    if visca.autofocus:
+        flags |= FLAG_AUTOFOCUS
+    if state != SystemState.OFF:
+        flags |= FLAG_POWER
+    return flags
+
+
+def show_focus_leds():
+    pins["autofocus_led_green"].value = visca.autofocus
+    pins["autofocus_led_red"].value = not visca.autofocus
+
+
+def show_freeze_leds():
+    pins["freeze_led_green"].value = not visca.freeze
+    pins["freeze_led_red"].value = visca.freeze
+
+
+def apply_camera_command(cmd, arg):
+    """Kamera-Befehl aus dem Netz anwenden (FREEZE/AF/BRIGHT/WB/PRESET)."""
+    global brightness
+    if cmd == CMD_FREEZE:
+        on = (not visca.freeze) if arg == ARG_TOGGLE else bool(arg)
+        if on != visca.freeze:
+            visca.set_freeze(on)
+            show_freeze_leds()
+        log.info("UDP FREEZE:", "ON" if on else "OFF")
+    elif cmd == CMD_AF:
+        on = (not visca.autofocus) if arg == ARG_TOGGLE else bool(arg)
+        if on != visca.autofocus:
+            visca.set_autofocus(on)
+            show_focus_leds()
+        log.info("UDP FOCUS:", "AF" if on else "MF")
+    elif cmd == CMD_BRIGHT:
+        brightness = arg
+        encoder.position = brightness  # Encoder folgt, sonst setzt er den Wert zurück
+        visca.set_brightness(brightness)
+        log.info("UDP BRIGHT:", brightness)
+    elif cmd == CMD_WB:
+        visca.set_whitebalance(arg)
+        log.info("UDP WB:", arg)
+    elif cmd == CMD_PRESET:
+        visca.recall_preset(arg)
+        log.info("UDP PRESET:", arg)
+
+
+def join_multicast(pool, sock, group):
+    """Multicast-Gruppe beitreten; ohne Unterstützung im Port bleibt es bei Unicast."""
+    opt = getattr(pool, "IP_ADD_MEMBERSHIP", None)
+    if opt is None:
+        log.warn("Multicast nicht unterstützt, nur Unicast")
+        return False
+    try:
+        # ip_mreq: Gruppenadresse + Interface (0.0.0.0 = Standard)
+        mreq = bytes(int(p) for p in group.split(".")) + bytes(4)
+        sock.setsockopt(getattr(pool, "IPPROTO_IP", 0), opt, mreq)
+    except Exception as e:
+        log.warn("Multicast-Beitritt fehlgeschlagen:", group, e)
+        return False
+    log.info("UDP Multicast/Station/Gruppen:", group, STATION_ID, STATION_GROUPS)
+    return True
+
+
+def send_lines(sock, addr, lines, empty, max_datagram=480):
+    """Zeilen an den Absender schicken (mehrere Zeilen je Datagramm)."""
+    chunk = ""
+    for line in lines:
+        if chunk and len(chunk) + len(line) + 1 > max_datagram:
+            sock.sendto(chunk.encode("utf-8"), addr)
+            chunk = ""
+        chunk += line + "\n"
+    sock.sendto((chunk or empty).encode("utf-8"), addr)
+
+
+def send_log_dump(sock, addr):
+    """Log-Ring an den Absender schicken."""
+    send_lines(sock, addr, log.lines(), "(log leer)\n")
+
+
+def render_metrics():
+    """Gespiegelte Zähler übernehmen und alle Metriken als Text liefern (nur beim Abruf)."""
+    metrics.set(M_RX, stats.rx)
+    metrics.set(M_COALESCED, visca.coalesced)
+    for c in range(len(TX_CLASSES)):
+        metrics.set(M_UART_BYTES + c, visca.class_bytes[c])
+        metrics.set(M_UART_PACKETS + c, visca.class_packets[c])
+    metrics.set(M_CAMERA_ERRORS, visca.errors)
+    metrics.set(M_OVERRIDES, zoom_queue.served)
+    metrics.set(M_QUEUE_DEPTH, zoom_queue.depth)
+    return metrics.render()
+
+
+def send_metrics(sock, addr):
+    """UDP "METRICS": Prometheus-Text an den Absender (Zeilen nicht zerteilt)."""
+    send_lines(sock, addr, render_metrics().rstrip("\n").split("\n"), "\n")
+
+
+def service_udp(now, budget):
+    """NetMux-Callback: Datagramme lesen, bis Socket leer, Byte-Budget oder drain_until erreicht."""
+    packets_processed = 0
+    nbytes_total = 0
+    while packets_processed < UDP_DRAIN_MAX_PACKETS and nbytes_total < budget:
+        if packets_processed and time.monotonic() > drain_until:
+            break
+        try:
+            nbytes, addr = udp.recvfrom_into(udp_buf)  # CircuitPython!
+            if not nbytes or nbytes <= 0:
                 break
-        if digits:
-            return clamp_zoom(digits), "", False
-
-    return None, "", False
 
+            # Direkt auf dem Empfangspuffer parsen (keine Kopie, kein Decode)
+            count = udp_parser.parse(nbytes)
 
-def update_oled(oled, zoom, autofocus, freeze, brightness, viewer, override_active, zoom_overlay_enabled):
-    oled.fill(0)
-    oled.text("Live" if not freeze else "Freeze", 0, 0, 1)
-    oled.text("AF" if autofocus else "MF", 0, DISPLAY_HEIGHT - 10, 1)
+            if DEBUG_ON:
+                log.debug("UDP RX:", addr, "len=", nbytes)
+            if UDP_DEBUG and DEBUG_ON:
+                log.debug("UDP RAW:", bytes(udp_buf[:nbytes]))
+                log.debug("UDP CMD:", bytes(udp_parser.cmds[:count]), udp_parser.zoom,
+                          bytes(udp_parser.viewer_bytes()))
 
-    oled.text(f"Bright:{brightness:2d}", 50, DISPLAY_HEIGHT - 30, 1)
-    oled.text(f"Zoom:  {zoom:2d}x",     50, DISPLAY_HEIGHT - 20, 1)
+            stats.rx += 1
+            nbytes_total += nbytes
+            if not udp_parser.addressed:
+                # Multicast an andere Stationen: weder Ack noch Antwort
+                packets_processed += 1
+                continue
+            binary = udp_parser.binary
+            status = udp_parser.status if binary else ST_OK
+            qpos = udp_parser.dup_qpos if udp_parser.duplicate else 0
+
+            if not count:
+                # Text ohne (gültigen) Befehl, Binär-Duplikat oder fehlerhaftes Frame
+                stats.ignored += 1
+                if not udp_parser.duplicate:
+                    metrics.inc(M_REJ_INVALID)
+                if DEBUG_ON:
+                    log.debug("UDP PARSE: (ignored) status", status)
+
+            # Alle Aktionen des Datagramms in diesem Tick; VISCA als ein UART-Write
+            visca.begin_batch()
+            try:
+                for k in range(count):
+                    cmd = udp_parser.cmds[k]
+
+                    if (cmd == CMD_LOGDUMP or cmd == CMD_METRICS or cmd == CMD_SUB
+                            or cmd == CMD_UNSUB) and addr[0] not in UDP_MGMT_HOSTS:
+                        # Diagnose und Abos nur für Verwaltungs-Adressen (keine
+                        # Verstärkung, keine fremd belegten Telemetrie-Slots)
+                        stats.ignored += 1
+                        metrics.inc(M_REJ_DENIED)
+                        status = ST_DENIED
+
+                    elif cmd == CMD_LOGDUMP:
+                        send_log_dump(udp, addr)
+
+                    elif cmd == CMD_METRICS:
+                        send_metrics(udp, addr)
+
+                    elif cmd == CMD_ZOOM:
+                        # Rate-Limit je Viewer + global (OFF ist immer erlaubt)
+                        key = viewer_key(udp_buf, udp_parser.viewer_start, udp_parser.viewer_end)
+                        limit = limiter.allow(key, now)
+                        if limit == ALLOWED:
+                            # Nur einreihen; Overlay/Zoom folgen einmal im Zoom-Abschnitt
+                            pos = zoom_queue.push(udp_parser.zoom, udp_parser.viewer_bytes(), now)
+                            if pos == QUEUE_FULL:
+                                stats.dropped += 1
+                                metrics.inc(M_REJ_QUEUE)
+                                status = ST_QUEUE_FULL
+                                if RATE_LIMIT_REPLY and not binary:
+                                    udp.sendto(REPLY_QUEUE_FULL, addr)
+                            else:
+                                qpos = pos
+                                metrics.inc(M_APPLIED)
+                                if DEBUG_ON:
+                                    log.debug("UDP QUEUE: Position", pos, "Zoom", udp_parser.zoom)
+                        else:
+                            stats.dropped += 1
+                            metrics.inc(M_REJ_RATE)
+                            status = ST_RATE_GLOBAL if limit == LIMIT_GLOBAL else ST_RATE_VIEWER
+                            if DEBUG_ON:
+                                log.debug("UDP RATE-LIMIT:", limit, "wait", limiter.wait)
+                            if RATE_LIMIT_REPLY and not binary:
+                                udp.sendto(REPLY_LIMIT_GLOBAL if limit == LIMIT_GLOBAL
+                                           else REPLY_LIMIT_VIEWER, addr)
+
+                    elif cmd == CMD_OFF:
+                        zoom_queue.clear()
+                        metrics.inc(M_APPLIED)
+                        log.info("UDP PARSE: OVERRIDE OFF")
+
+                    elif cmd == CMD_SUB:
+                        if not telemetry.subscribe(addr, now):
+                            status = ST_NO_SLOT
+                            if not binary:
+                                udp.sendto(REPLY_NO_SLOT, addr)
+
+                    elif cmd == CMD_UNSUB:
+                        telemetry.unsubscribe(addr)
+
+                    elif cmd != CMD_PING:
+                        # Kamera-Befehle wie die Tasten nur bei eingeschalteter Kamera
+                        if state == SystemState.OFF:
+                            stats.ignored += 1
+                            metrics.inc(M_REJ_POWER)
+                            status = ST_POWER_OFF
+                        else:
+                            apply_camera_command(cmd, udp_parser.args[k])
+                            metrics.inc(M_APPLIED)
+            finally:
+                visca.end_batch()
+
+            # Binär-Frames: Ack mit Zustand und Empfangszeit (fester Puffer);
+            # angenommene Frames samt Ergebnis fürs Duplikat-Fenster merken
+            if binary:
+                udp_parser.remember(status, qpos)
+                udp.sendto(udp_parser.ack(status, last_zoom_sent or 0, qpos,
+                                          zoom_queue.depth, ack_flags()), addr)
+
+            packets_processed += 1
+
+        except OSError:
+            break
+        except Exception as e:
+            stats.dropped += 1
+            log.error("UDP-Fehler:", e)
+            break
+
+    return nbytes_total
+
+
+def update_oled(display, zoom, autofocus, freeze, brightness, viewer, override_active, zoom_overlay_enabled):
+    # Nur Felder setzen; gezeichnet/gesendet wird in display.render() (nur Änderungen)
+    display.set(F_LIVE, "Live" if not freeze else "Freeze")
+    display.set(F_AF, "AF" if autofocus else "MF")
+
+    display.set(F_BRIGHT, BRIGHT_TEXT[brightness])
+    display.set(F_ZOOM, ZOOM_TEXT[zoom])
 
     # Statuszeile: zeigt zusätzlich, ob Zoom-Overlay an/aus ist
-    if override_active:
-        v = viewer if viewer else "YT"
-        tail = "OVR"
-        oled.text(f"!zoom: {v} {tail}", 50, DISPLAY_HEIGHT - 10, 1)
-    else:
-        tail = "ON" if zoom_overlay_enabled else "OFF"
-        oled.text(f"Overlay:{tail}", 50, DISPLAY_HEIGHT - 10, 1)
-
-    oled.show()
+    display.set(F_STATUS, status_text(viewer, override_active, zoom_overlay_enabled, zoom_queue.depth))
 
 
 # =========================
@@ -143,6 +415,62 @@ def update_oled(oled, zoom, autofocus, freeze, brightness, viewer, override_acti
 pins, uart, i2c, oled, encoder, poti = setup_hardware()
 visca = ViscaCamera(uart)
 
+# OLED-Felder (Position, Breite in Zeichen)
+# Font einmal in den RAM laden; ohne Datei zeichnet oled.text() wie bisher
+try:
+    font = GlyphFont(FONT_PATH)
+except OSError as e:
+    font = None
+    log.warn("Font nicht geladen:", FONT_PATH, e)
+display = StatusDisplay(oled, DISPLAY_WIDTH, DISPLAY_HEIGHT, DISPLAY_MAX_FPS, font)
+F_LIVE = display.add_field(0, 0, 6)
+F_AF = display.add_field(0, DISPLAY_HEIGHT - 10, 2)
+F_BRIGHT = display.add_field(50, DISPLAY_HEIGHT - 30, 9)
+F_ZOOM = display.add_field(50, DISPLAY_HEIGHT - 20, 10)
+F_STATUS = display.add_field(50, DISPLAY_HEIGHT - 10, 13)
+
+# Warteschlange für Zoom-Einlösungen: jede bekommt einen festen Slot
+zoom_queue = ZoomQueue(ZOOM_QUEUE_SIZE, ZOOM_OVERRIDE_TIMEOUT)
+
+# Diagnoseseite (zweite OLED-Seite, per Langdruck auf DIAG_BUTTON)
+stats = LoopStats()
+diag = DiagPage(display, stats, visca, "UDP", DIAG_INTERVAL, zoom_queue)
+
+# Monitoring (metrics.py): Zähler für UDP "METRICS"; gespiegelte Werte
+# (Empfang, UART, Warteschlange) übernimmt erst render_metrics()
+metrics = Metrics(METRICS_PREFIX)
+M_RX = metrics.add("commands_received_total", COUNTER, "Commands received per source.", 'source="udp"')
+M_APPLIED = metrics.add("commands_applied_total", COUNTER, "Commands queued or applied to the camera.")
+M_COALESCED = metrics.add("commands_coalesced_total", COUNTER, "VISCA packets sent in a shared UART write.")
+M_REJ_RATE = metrics.add("commands_rejected_total", COUNTER, "Commands rejected by reason.", 'reason="rate_limit"')
+M_REJ_QUEUE = metrics.add("commands_rejected_total", COUNTER, "", 'reason="queue_full"')
+M_REJ_POWER = metrics.add("commands_rejected_total", COUNTER, "", 'reason="power_off"')
+M_REJ_INVALID = metrics.add("commands_rejected_total", COUNTER, "", 'reason="invalid"')
+M_REJ_DENIED = metrics.add("commands_rejected_total", COUNTER, "", 'reason="denied"')
+# je Paketklasse ein Index ab M_UART_BYTES bzw. M_UART_PACKETS (Reihenfolge wie TX_CLASSES)
+M_UART_BYTES = metrics.count
+for c in TX_CLASSES:
+    metrics.add("uart_bytes_total", COUNTER, "VISCA bytes by packet class.", 'class="{}"'.format(c))
+M_UART_PACKETS = metrics.count
+for c in TX_CLASSES:
+    metrics.add("uart_packets_total", COUNTER, "VISCA packets by packet class.", 'class="{}"'.format(c))
+M_CAMERA_ERRORS = metrics.add("camera_errors_total", COUNTER, "UART writes that timed out or were cut short.")
+M_OVERRIDES = metrics.add("override_activations_total", COUNTER, "Viewer zoom slots started.")
+M_QUEUE_DEPTH = metrics.add("queue_depth", GAUGE, "Viewers waiting for a zoom slot.")
+
+# Watchdog: Bericht vom letzten Hänger zeigen, dann scharf schalten
+guard = StallGuard(WATCHDOG_TIMEOUT)
+stall_report = guard.last_report()
+if stall_report:
+    guard.show_report(oled, stall_report)
+    display.invalidate()  # Bericht wurde direkt aufs OLED gemalt
+guard.start()
+
+# Heap-Überwachung: Low-Water je Schleifen-Abschnitt, GC nur im Leerlauf
+MEM_UDP, MEM_BUTTONS, MEM_ZOOM, MEM_OLED = range(4)
+mem = MemMonitor(("udp", "buttons", "zoom", "oled"), GC_MIN_FREE, GC_MAX_INTERVAL)
+last_mem_report = time.monotonic()
+
 # Secrets (nur WiFi)
 try:
     with open("secrets.json", "r") as f:
@@ -151,28 +479,51 @@ except Exception:
     secrets = {}
 
 # WiFi verbinden
+guard.enter("wifi", STALL_BUDGETS["wifi"], persist=True)
 try:
     if not wifi.radio.connected:
         ssid = secrets["wifi"]["ssid"]
         pw = secrets["wifi"]["password"]
-        print(f"Verbinde mit WLAN: {ssid}")
-        wifi.radio.connect(ssid, pw)
-        print("WiFi verbunden. IP:", wifi.radio.ipv4_address)
+        log.info("Verbinde mit WLAN:", ssid)
+        wifi.radio.connect(ssid, pw, timeout=STALL_BUDGETS["wifi"] - 1)
+        log.info("WiFi verbunden. IP:", wifi.radio.ipv4_address)
 except Exception as e:
-    print("WiFi-Verbindung fehlgeschlagen:", e)
+    log.error("WiFi-Verbindung fehlgeschlagen:", e)
+guard.leave()
 
 # UDP-Server Setup (non-blocking)
+# Alle Sockets (UDP, OBS-Feed) laufen über den Multiplexer: gelesen wird nur, was bereit ist
 udp = None
 udp_buf = None
+telemetry = None
+obs_feed = None
+mux = None
 if wifi.radio.connected:
     pool = socketpool.SocketPool(wifi.radio)
+    mux = NetMux(NETMUX_SLOTS, NETMUX_TICK_BUDGET, NETMUX_MAX_SKIP)
     udp = pool.socket(pool.AF_INET, pool.SOCK_DGRAM)
     udp.bind(("", UDP_PORT))
     udp.settimeout(0)  # non-blocking
+    if UDP_MULTICAST_GROUP:
+        join_multicast(pool, udp, UDP_MULTICAST_GROUP)
     udp_buf = bytearray(256)
-    print(f"UDP-Server bereit auf Port {UDP_PORT}")
+    udp_parser = UdpCommandParser(udp_buf, station=STATION_ID, groups=group_mask(STATION_GROUPS))
+    limiter = RateLimiter(RATE_GLOBAL_PER_SEC, RATE_GLOBAL_BURST,
+                          RATE_VIEWER_PER_SEC, RATE_VIEWER_BURST, RATE_VIEWER_SLOTS)
+    telemetry = Telemetry(udp, TELEMETRY_SLOTS, TELEMETRY_TIMEOUT,
+                          TELEMETRY_HEARTBEAT, TELEMETRY_MIN_INTERVAL)
+    if OBS_FEED:
+        try:
+            obs_feed = ObsFeed(pool, OBS_FEED_PORT, OBS_FEED_CLIENTS,
+                               send_timeout=OBS_FEED_SEND_TIMEOUT,
+                               send_budget=OBS_FEED_SEND_BUDGET, mux=mux)
+            log.info("OBS-Feed: http://{}:{}/".format(wifi.radio.ipv4_address, OBS_FEED_PORT))
+        except Exception as e:
+            log.error("OBS-Feed nicht gestartet:", e)
+    mux.register(udp, service_udp, UDP_READ_BUDGET)
+    log.info("UDP-Server bereit auf Port", UDP_PORT, "Netz-Modus", mux.mode)
 else:
-    print("Kein WiFi: UDP-Server deaktiviert.")
+    log.warn("Kein WiFi: UDP-Server deaktiviert.")
 
 # LEDs Grundzustand
 pins["power_led_green"].value = True
@@ -185,10 +536,12 @@ pins["freeze_led_green"].value = True
 pins["freeze_led_red"].value = False
 
 # Kamera-Defaults
-print("On-State Standardwerte an Kamera schicken...")
+log.info("On-State Standardwerte an Kamera schicken...")
+guard.enter("power", STALL_BUDGETS["power"], persist=True)
 visca.set_power(True)
 visca.set_freeze(False)
 visca.set_autofocus(True)
+guard.leave()
 
 brightness = 4
 encoder.position = brightness
@@ -202,21 +555,21 @@ button_debounce = {
     "power_button": {"last_time": 0, "stable_state": True},
     "focus_button": {"last_time": 0, "stable_state": True},
     "freeze_button": {"last_time": 0, "stable_state": True},
-    "connected_button": {"last_time": 0, "stable_state": True},  # Toggle Zoom-Overlay
 }
+# Kurz: Zoom-Overlay umschalten, lang: Diagnoseseite
+page_button = PageButton(pins[DIAG_BUTTON], DIAG_HOLD, DEBOUNCE_TIME)
 
 last_zoom_sent = None
 last_overlay_zoom = None
 
 zoom_override = None
-zoom_timeout = 0.0
 last_viewer = ""
 
 last_brightness_time = 0.0
-last_oled_update = 0.0
-OLED_UPDATE_INTERVAL = 0.1  # 100 ms
 
-UDP_MAX_PACKETS_PER_LOOP = 12
+# Zeit der übrigen Schleifen-Abschnitte im letzten Tick (für das UDP-Budget)
+loop_rest_time = 0.0
+drain_until = 0.0
 
 # Debug Heartbeat
 last_udp_heartbeat = time.monotonic()
@@ -225,80 +578,47 @@ UDP_HEARTBEAT_SEC = 10.0
 # =========================
 # Zoom-Overlay Toggle (NEU)
 # =========================
-zoom_overlay_enabled = True  # Standard: EIN (wie jetzt)
+zoom_overlay_enabled = CAMERA_OVERLAY != "off"  # Standard: EIN (wie jetzt)
+# Viewer-Titel (ZOOM BY/Viewer/Nächster) nur im Modus "full" auf die Kamera
+viewer_titles = CAMERA_OVERLAY == "full"
+obs_depth = -1
 
+# Ab hier ordnet ein harter Watchdog-Reset der Hauptschleife zu
+guard.enter("loop", persist=True)
 
 while True:
     now = time.monotonic()
+    guard.feed()
+    mem.begin_tick()
+    stats.tick(now)
+    metrics.tick(now)
+    busy = False
 
     # =========================
-    # UDP Empfang + Debug
+    # Netz-Empfang (UDP, OBS-Feed) + Debug
     # =========================
-    if udp and udp_buf:
-        packets_processed = 0
-
-        while packets_processed < UDP_MAX_PACKETS_PER_LOOP:
-            try:
-                nbytes, addr = udp.recvfrom_into(udp_buf)  # CircuitPython!
-                if not nbytes or nbytes <= 0:
-                    break
-
-                raw = bytes(udp_buf[:nbytes])
-                decoded = safe_decode(raw)
-                decoded_stripped = decoded.strip()
-
-                print("UDP RX:", addr, "len=", nbytes)
-                print("UDP RAW:", raw)
-                print("UDP TXT:", repr(decoded_stripped))
-
-                # Debug Tokens
-                norm = decoded_stripped.replace(";", " ").replace("=", " ").replace(":", " ")
-                parts_dbg = [p for p in norm.split() if p]
-                print("UDP TOK:", parts_dbg)
-
-                zoom_val, viewer, force_off = parse_udp_message(decoded_stripped)
-
-                if force_off:
-                    zoom_override = None
-                    zoom_timeout = 0.0
-                    last_viewer = ""
-                    visca.set_overlay_text("", line=0x10)
-                    visca.set_overlay_text("", line=0x11)
-                    print("UDP PARSE: OVERRIDE OFF")
-
-                elif zoom_val is not None:
-                    zoom_override = zoom_val
-                    zoom_timeout = now + ZOOM_OVERRIDE_TIMEOUT
-                    last_viewer = viewer
-
-                    visca.set_overlay_text("ZOOM BY:", line=0x10)
-                    visca.set_overlay_text(viewer if viewer else "YT", line=0x11)
-
-                    print(f"UDP PARSE: ZOOM={zoom_val} VIEWER='{last_viewer}' TIMEOUT={ZOOM_OVERRIDE_TIMEOUT}s")
-
-                else:
-                    print("UDP PARSE: (ignored)")
-
-                packets_processed += 1
-
-            except OSError:
-                break
-            except Exception as e:
-                print("UDP-Fehler:", e)
-                break
-
-        if packets_processed:
-            gc.collect()
+    guard.enter("udp", STALL_BUDGETS["udp"])
+    if mux:
+        rx_before = stats.rx
+        # Budget: was vom angestrebten Tick nach den übrigen Abschnitten übrig bleibt
+        drain_until = now + max(UDP_DRAIN_MIN, UDP_LOOP_TARGET - loop_rest_time)
+        if mux.service(now):
+            busy = True
+        if stats.rx != rx_before:
             last_udp_heartbeat = now
 
     if (now - last_udp_heartbeat) > UDP_HEARTBEAT_SEC:
         if udp:
-            print(f"[UDP] waiting... (port {UDP_PORT})")
+            log.debug("[UDP] waiting... port", UDP_PORT)
         last_udp_heartbeat = now
+    guard.leave()
+    mem.mark(MEM_UDP)
+    udp_done = time.monotonic()
 
     # =========================
     # Power
     # =========================
+    guard.enter("power", STALL_BUDGETS["power"])
     current_power_state = pins["power_button"].value
     if current_power_state != button_debounce["power_button"]["stable_state"]:
         if (now - button_debounce["power_button"]["last_time"]) > DEBOUNCE_TIME:
@@ -310,30 +630,28 @@ while True:
                     pins["power_led_green"].value = True
                     pins["power_led_red"].value = False
                     visca.set_power(True)
-                    print("POWER: ON")
+                    log.info("POWER: ON")
                 else:
                     state = SystemState.OFF
                     pins["power_led_green"].value = False
                     pins["power_led_red"].value = True
                     visca.set_power(False)
-                    print("POWER: OFF")
+                    log.info("POWER: OFF")
 
-                    zoom_override = None
-                    zoom_timeout = 0.0
-                    last_viewer = ""
-                    visca.set_overlay_text("", line=0x10)
-                    visca.set_overlay_text("", line=0x11)
+                    # Warteschlange leeren; Overlay-Zeilen leert der Zoom-Abschnitt
+                    zoom_queue.clear()
 
                     # Zoom-Overlay line ebenfalls leeren
                     visca.set_overlay_text("", line=0x1A)
                     last_overlay_zoom = None
 
-                    oled.fill(0)
-                    oled.show()
+                    display.clear()
+    guard.leave()
 
     # =========================
     # Focus
     # =========================
+    guard.enter("buttons", STALL_BUDGETS["buttons"])
     current_focus_state = pins["focus_button"].value
     if current_focus_state != button_debounce["focus_button"]["stable_state"]:
         if (now - button_debounce["focus_button"]["last_time"]) > DEBOUNCE_TIME:
@@ -341,9 +659,8 @@ while True:
             button_debounce["focus_button"]["last_time"] = now
             if not current_focus_state and state != SystemState.OFF:
                 visca.set_autofocus(not visca.autofocus)
-                pins["autofocus_led_green"].value = visca.autofocus
-                pins["autofocus_led_red"].value = not visca.autofocus
-                print("FOCUS:", "AF" if visca.autofocus else "MF")
+                show_focus_leds()
+                log.info("FOCUS:", "AF" if visca.autofocus else "MF")
 
     # =========================
     # Freeze
@@ -355,29 +672,26 @@ while True:
             button_debounce["freeze_button"]["last_time"] = now
             if not current_freeze_state and state != SystemState.OFF:
                 visca.set_freeze(not visca.freeze)
-                pins["freeze_led_green"].value = not visca.freeze
-                pins["freeze_led_red"].value = visca.freeze
-                print("FREEZE:", "ON" if visca.freeze else "OFF")
+                show_freeze_leds()
+                log.info("FREEZE:", "ON" if visca.freeze else "OFF")
 
     # =========================
-    # Toggle Zoom-Overlay per connected_button (NEU)
+    # Toggle Zoom-Overlay per connected_button (kurz) / Diagnoseseite (lang)
     # =========================
-    current_conn_state = pins["connected_button"].value
-    if current_conn_state != button_debounce["connected_button"]["stable_state"]:
-        if (now - button_debounce["connected_button"]["last_time"]) > DEBOUNCE_TIME:
-            button_debounce["connected_button"]["stable_state"] = current_conn_state
-            button_debounce["connected_button"]["last_time"] = now
-            if not current_conn_state and state != SystemState.OFF:
-                zoom_overlay_enabled = not zoom_overlay_enabled
-                print("ZOOM OVERLAY:", "ON" if zoom_overlay_enabled else "OFF")
-
-                if not zoom_overlay_enabled:
-                    # sofort ausblenden
-                    visca.set_overlay_text("", line=0x1A)
-                    last_overlay_zoom = None
-                else:
-                    # sofort aktuellen Zoom einblenden (wird weiter unten berechnet)
-                    last_overlay_zoom = None  # erzwingt Update
+    press = page_button.update(now)
+    if press == LONG:
+        diag.toggle(now)
+    elif press == SHORT and state != SystemState.OFF:
+        zoom_overlay_enabled = not zoom_overlay_enabled
+        log.info("ZOOM OVERLAY:", "ON" if zoom_overlay_enabled else "OFF")
+
+        if not zoom_overlay_enabled:
+            # sofort ausblenden
+            visca.set_overlay_text("", line=0x1A)
+            last_overlay_zoom = None
+        else:
+            # sofort aktuellen Zoom einblenden (wird weiter unten berechnet)
+            last_overlay_zoom = None  # erzwingt Update
 
     # =========================
     # Brightness
@@ -388,18 +702,34 @@ while True:
             brightness = max(0, min(20, pos))
             visca.set_brightness(brightness)
             last_brightness_time = now
-            print("BRIGHT:", brightness)
+            if DEBUG_ON:
+                log.debug("BRIGHT:", brightness)
+    guard.leave()
+    mem.mark(MEM_BUTTONS)
 
     # =========================
-    # Override Timeout
+    # Warteschlange: Slots weiterschalten, Overlay einmal pro Tick
     # =========================
-    if zoom_override is not None and now > zoom_timeout:
-        print("ZOOM OVERRIDE: timeout -> back to manual")
-        zoom_override = None
-        zoom_timeout = 0.0
-        last_viewer = ""
-        visca.set_overlay_text("", line=0x10)
-        visca.set_overlay_text("", line=0x11)
+    guard.enter("zoom", STALL_BUDGETS["zoom"])
+    changed = zoom_queue.update(now)
+    if changed & CHANGED_CURRENT:
+        if zoom_queue.active:
+            zoom_override = zoom_queue.zoom
+            last_viewer = zoom_queue.viewer()
+            if viewer_titles:
+                visca.set_overlay_text("ZOOM BY:", line=0x10)
+                visca.set_overlay_text(last_viewer if last_viewer else "YT", line=0x11)
+            log.info("ZOOM SLOT: Viewer/Zoom/wartend", last_viewer, zoom_override, zoom_queue.depth)
+        else:
+            log.info("ZOOM QUEUE: leer -> back to manual")
+            zoom_override = None
+            last_viewer = ""
+            if viewer_titles:
+                visca.set_overlay_text("", line=0x10)
+                visca.set_overlay_text("", line=0x11)
+    if changed & CHANGED_NEXT and viewer_titles:
+        nxt = zoom_queue.next_viewer("YT")
+        visca.set_overlay_text((">" + nxt) if nxt else "", line=0x12)
 
     # =========================
     # Zoom anwenden
@@ -409,32 +739,83 @@ while True:
     if state != SystemState.OFF and zoom_now != last_zoom_sent:
         visca.set_zoom(zoom_now)
         last_zoom_sent = zoom_now
+        busy = True
 
     # =========================
     # Overlay Zoom (Line 0x1A) nur wenn enabled
     # =========================
     if zoom_overlay_enabled:
         if zoom_now != last_overlay_zoom:
-            visca.set_overlay_text(f"{zoom_now:2d}x", line=0x1A)
+            visca.set_overlay_text(ZOOM_OVERLAY_TEXT[zoom_now], line=0x1A)
             last_overlay_zoom = zoom_now
     else:
         # wenn disabled: nichts aktualisieren
         pass
+    guard.leave()
+    mem.mark(MEM_ZOOM)
 
     # =========================
     # OLED Update
     # =========================
-    if now - last_oled_update > OLED_UPDATE_INTERVAL:
-        update_oled(
-            oled=oled,
-            zoom=zoom_now,
-            autofocus=visca.autofocus,
-            freeze=visca.freeze,
-            brightness=brightness,
-            viewer=last_viewer,
-            override_active=(zoom_override is not None),
-            zoom_overlay_enabled=zoom_overlay_enabled,
-        )
-        last_oled_update = now
+    guard.enter("oled", STALL_BUDGETS["oled"])
+    update_oled(
+        display=display,
+        zoom=zoom_now,
+        autofocus=visca.autofocus,
+        freeze=visca.freeze,
+        brightness=brightness,
+        viewer=last_viewer,
+        override_active=(zoom_override is not None),
+        zoom_overlay_enabled=zoom_overlay_enabled,
+    )
+    diag.update(now)
+    display.render(now)
+    guard.leave()
+    mem.mark(MEM_OLED)
+
+    # =========================
+    # OBS-Feed: Viewer-Overlay als Browserquelle (Events nur bei Änderung)
+    # =========================
+    if obs_feed:
+        guard.enter("obs", STALL_BUDGETS["obs"])
+        obs_feed.poll(now)
+        if changed or zoom_queue.depth != obs_depth:
+            obs_depth = zoom_queue.depth
+            active = zoom_queue.active
+            obs_feed.publish(active, last_viewer, zoom_queue.zoom,
+                             max(0, int(zoom_queue.until - now)) if active else 0,
+                             zoom_queue.next_viewer("YT"), obs_depth)
+        guard.leave()
 
+    # =========================
+    # Telemetrie: Zustand an Abonnenten (Delta bei Änderung, sonst Heartbeat)
+    # =========================
+    if telemetry:
+        guard.enter("telemetry", STALL_BUDGETS["telemetry"])
+        override = zoom_queue.active
+        telemetry.set(T_ZOOM, zoom_now)
+        telemetry.set(T_SOURCE, 1 if override else 0)
+        telemetry.set(T_REMAIN, int(zoom_queue.until - now) + 1 if override else 0)
+        telemetry.set(T_AF, 1 if visca.autofocus else 0)
+        telemetry.set(T_FREEZE, 1 if visca.freeze else 0)
+        telemetry.set(T_BRIGHT, brightness)
+        telemetry.set(T_POWER, 0 if state == SystemState.OFF else 1)
+        telemetry.set(T_DEPTH, zoom_queue.depth)
+        telemetry.update(now)
+        guard.leave()
+
+    # =========================
+    # Leerlauf-Fenster: GC, Speicherbericht, Log auf die Konsole
+    # =========================
+    if not busy:
+        mem.idle(now)
+        if (now - last_mem_report) > MEM_REPORT_INTERVAL:
+            for line in mem.report():
+                log.info(line)
+            log.info("QUEUE tiefe/bedient/max_wait:", zoom_queue.depth, zoom_queue.served,
+                     int(zoom_queue.max_wait))
+            last_mem_report = now
+        log.flush(LOG_FLUSH_LINES)
+
+    loop_rest_time = time.monotonic() - udp_done
     time.sleep(0.005)
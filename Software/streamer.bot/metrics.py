@@ -0,0 +1,176 @@
+# metrics.py — Zähler und Messwerte fürs Monitoring (Prometheus-Textformat)
+# - Jede Metrik wird beim Start einmal mit add() angelegt und bekommt einen
+#   Index (wie display.add_field); die Werte liegen in einer vorab angelegten
+#   Integer-Liste -> inc()/set() sind eine Addition bzw. Zuweisung
+# - Schleifenzeit als festes Histogramm in Millisekunden-Buckets; tick() kostet
+#   eine Subtraktion und ein paar Vergleiche. Perzentile (p50/p90/p99) werden
+#   erst beim Abruf aus den Buckets seit dem letzten Abruf berechnet
+# - Freier Heap und WLAN werden nur beim Abruf bzw. selten gelesen
+# - render() baut den Text nur beim Abruf (HTTP GET /metrics, UDP "METRICS")
+
+import gc
+
+try:
+    import wifi
+except ImportError:
+    wifi = None
+
+COUNTER = 0
+GAUGE = 1
+_KIND = ("counter", "gauge")
+
+# Obergrenzen der Schleifenzeit-Buckets in ms (letzter Bucket: darüber)
+LOOP_BUCKETS_MS = (2, 5, 10, 20, 50, 100, 200, 500, 1000)
+_QUANTILES = ((50, "0.5"), (90, "0.9"), (99, "0.99"))
+
+
+class Metrics:
+    def __init__(self, prefix="visca_", slots=32, wifi_interval=1.0):
+        self.prefix = prefix
+        self.wifi_interval = wifi_interval
+
+        # Metriken: parallele Listen, Werte vorab angelegt
+        self.v = [0] * slots
+        self._kind = bytearray(slots)
+        self._name = [None] * slots
+        self._help = [None] * slots
+        self._labels = [None] * slots
+        self._n = 0
+
+        # Schleifenzeit
+        nb = len(LOOP_BUCKETS_MS) + 1
+        self._hist = [0] * nb
+        self._hist_seen = [0] * nb   # Stand beim letzten Abruf
+        self._loop_sum_ms = 0
+        self._loop_count = 0
+        self._loop_max_ms = 0        # seit dem letzten Abruf
+        self._last_tick = None
+
+        # WLAN: Verbindungsabbrüche/-wiederaufbauten, gelesen alle wifi_interval s
+        self._wifi_up = None
+        self._wifi_next = 0.0
+        self.wifi_reconnects = 0
+
+    @property
+    def count(self):
+        """Anzahl angelegter Metriken = Index der nächsten."""
+        return self._n
+
+    # ---------- Anlegen ----------
+    def add(self, name, kind, help_text, labels=""):
+        """Metrik anlegen -> Index. Gleicher Name mit anderen Labels direkt danach
+        anlegen; HELP/TYPE kommen vom ersten Eintrag eines Namens."""
+        i = self._n
+        if i >= len(self.v):
+            raise ValueError("metrics: keine freien Slots")
+        self._kind[i] = kind
+        self._name[i] = self.prefix + name
+        self._help[i] = help_text
+        self._labels[i] = labels
+        self._n = i + 1
+        return i
+
+    # ---------- Hot-Path ----------
+    def inc(self, i, n=1):
+        self.v[i] += n
+
+    def set(self, i, value):
+        self.v[i] = value
+
+    def tick(self, now):
+        """Zu Beginn jedes Schleifendurchlaufs: Dauer des letzten Durchlaufs einsortieren."""
+        last = self._last_tick
+        self._last_tick = now
+        if last is None:
+            return
+        ms = int((now - last) * 1000)
+        k = 0
+        for le in LOOP_BUCKETS_MS:
+            if ms <= le:
+                break
+            k += 1
+        self._hist[k] += 1
+        self._loop_sum_ms += ms
+        self._loop_count += 1
+        if ms > self._loop_max_ms:
+            self._loop_max_ms = ms
+
+        if wifi is not None and now >= self._wifi_next:
+            self._wifi_next = now + self.wifi_interval
+            up = wifi.radio.connected
+            if up and self._wifi_up is False:
+                self.wifi_reconnects += 1
+            self._wifi_up = up
+
+    # ---------- Abruf ----------
+    def _quantile(self, pct, total):
+        """Obergrenze (ms) des Buckets, in dem das Perzentil seit dem letzten Abruf liegt."""
+        want = (total * pct + 99) // 100
+        seen = 0
+        for k in range(len(LOOP_BUCKETS_MS)):
+            seen += self._hist[k] - self._hist_seen[k]
+            if seen >= want:
+                return LOOP_BUCKETS_MS[k]
+        return self._loop_max_ms
+
+    def render(self):
+        """Alle Metriken als Prometheus-Text (allokiert; nur beim Abruf)."""
+        out = []
+        last = None
+        for i in range(self._n):
+            name = self._name[i]
+            if name != last:
+                out.append("# HELP {} {}\n# TYPE {} {}\n".format(
+                    name, self._help[i], name, _KIND[self._kind[i]]))
+                last = name
+            labels = self._labels[i]
+            if labels:
+                out.append("{}{{{}}} {}\n".format(name, labels, self.v[i]))
+            else:
+                out.append("{} {}\n".format(name, self.v[i]))
+
+        p = self.prefix
+        # Schleifenzeit: Histogramm seit Start
+        name = p + "loop_seconds"
+        out.append("# HELP {} Main loop duration.\n# TYPE {} histogram\n".format(name, name))
+        cum = 0
+        for k in range(len(LOOP_BUCKETS_MS)):
+            cum += self._hist[k]
+            out.append('{}_bucket{{le="{}"}} {}\n'.format(name, LOOP_BUCKETS_MS[k] / 1000, cum))
+        cum += self._hist[-1]
+        out.append('{}_bucket{{le="+Inf"}} {}\n'.format(name, cum))
+        out.append("{}_sum {}\n{}_count {}\n".format(name, self._loop_sum_ms / 1000, name, self._loop_count))
+
+        # Perzentile seit dem letzten Abruf
+        total = 0
+        for k in range(len(self._hist)):
+            total += self._hist[k] - self._hist_seen[k]
+        name = p + "loop_window_seconds"
+        out.append("# HELP {} Main loop duration percentiles since the previous scrape.\n"
+                   "# TYPE {} gauge\n".format(name, name))
+        if total:
+            for pct, q in _QUANTILES:
+                out.append('{}{{quantile="{}"}} {}\n'.format(name, q, self._quantile(pct, total) / 1000))
+        out.append('{}{{quantile="1"}} {}\n'.format(name, self._loop_max_ms / 1000))
+        for k in range(len(self._hist)):
+            self._hist_seen[k] = self._hist[k]
+        self._loop_max_ms = 0
+
+        # Heap und WLAN
+        out.append("# HELP {0}heap_free_bytes Free heap.\n# TYPE {0}heap_free_bytes gauge\n"
+                   "{0}heap_free_bytes {1}\n".format(p, gc.mem_free()))
+        out.append("# HELP {0}wifi_reconnects_total WiFi link came back after a loss.\n"
+                   "# TYPE {0}wifi_reconnects_total counter\n"
+                   "{0}wifi_reconnects_total {1}\n".format(p, self.wifi_reconnects))
+        if wifi is not None:
+            up = wifi.radio.connected
+            out.append("# HELP {0}wifi_connected WiFi link state.\n# TYPE {0}wifi_connected gauge\n"
+                       "{0}wifi_connected {1}\n".format(p, 1 if up else 0))
+            try:
+                ap = wifi.radio.ap_info if up else None
+            except Exception:
+                ap = None
+            if ap is not None:
+                out.append("# HELP {0}wifi_rssi_dbm Signal strength.\n# TYPE {0}wifi_rssi_dbm gauge\n"
+                           "{0}wifi_rssi_dbm {1}\n".format(p, ap.rssi))
+        return "".join(out)
@@ -0,0 +1,234 @@
+# obs_feed.py — Viewer-Overlay als OBS-Browserquelle (HTTP + Server-Sent Events)
+# - Kleiner non-blocking HTTP-Server im lokalen Netz:
+#     GET /        -> Overlay-Seite (HTML/JS, transparenter Hintergrund)
+#     GET /events  -> text/event-stream, je Zustandsänderung ein "data: {json}"
+#     GET /state   -> aktueller Zustand als JSON (einmalig)
+# - publish() baut das JSON nur, wenn sich Viewer/Zoom/Slot ändern; die
+#   Restzeit zählt die Seite selbst herunter (kein Event pro Sekunde)
+# - Damit bleibt der UART für das Objektiv frei: Kamera-Titel nur noch
+#   minimal oder gar nicht (CAMERA_OVERLAY in config.py)
+# - Pro Tick höchstens ein accept() und ein recv() je wartender Verbindung,
+#   Keep-Alive-Kommentar alle `keepalive` Sekunden erkennt tote Clients
+# - Mit NetMux (netmux.py) werden Listen-Socket und wartende Verbindungen dort
+#   angemeldet; poll() erledigt dann nur Timeouts und Keep-Alive
+# - Senden blockiert höchstens `send_timeout` je send() und `send_budget` je
+#   Watchdog-Stufe ("obs": poll + publish, "udp": Seitenabrufe eines Ticks);
+#   ein Stream, der nicht rechtzeitig abnimmt, wird beim ersten Timeout
+#   geschlossen (die Seite verbindet sich selbst neu)
+
+import json
+import time
+
+_PAGE = b"""<!doctype html>
+<html><head><meta charset="utf-8"><title>Zoom Overlay</title>
+<style>
+body{margin:0;background:transparent;font:bold 42px sans-serif;color:#fff;
+text-shadow:0 0 6px #000,0 0 2px #000}
+#box{position:absolute;left:24px;bottom:24px;display:none}
+#next{font-size:28px;opacity:.8}
+</style></head><body>
+<div id="box"><div id="main"></div><div id="next"></div></div>
+<script>
+var s={},until=0;
+function draw(){
+ var b=document.getElementById("box");
+ if(!s.active){b.style.display="none";return;}
+ var r=Math.max(0,Math.ceil((until-Date.now())/1000));
+ document.getElementById("main").textContent=
+  "ZOOM BY "+(s.viewer||"YT")+" | "+s.zoom+"x | "+r+"s";
+ document.getElementById("next").textContent=
+  s.next?("next: "+s.next+(s.depth>1?" (+"+(s.depth-1)+")":"")):"";
+ b.style.display="block";
+}
+function connect(){
+ var es=new EventSource("/events");
+ es.onmessage=function(e){s=JSON.parse(e.data);until=Date.now()+s.remain*1000;draw();};
+ es.onerror=function(){es.close();setTimeout(connect,2000);};
+}
+setInterval(draw,250);connect();
+</script></body></html>
+"""
+
+_HDR_PAGE = b"HTTP/1.1 200 OK\r\nContent-Type: text/html; charset=utf-8\r\nConnection: close\r\n\r\n"
+_HDR_JSON = b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nConnection: close\r\n\r\n"
+_HDR_EVENTS = (b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+               b"Access-Control-Allow-Origin: *\r\nConnection: keep-alive\r\n\r\n")
+_NOT_FOUND = b"HTTP/1.1 404 Not Found\r\nConnection: close\r\n\r\n"
+_KEEPALIVE = b": ping\n\n"
+
+
+class ObsFeed:
+    def __init__(self, pool, port=8080, max_clients=3, keepalive=15.0, send_timeout=0.05,
+                 send_budget=0.2, mux=None):
+        self.max_clients = max_clients
+        self.keepalive = keepalive
+        self.send_timeout = send_timeout
+        self.send_budget = send_budget
+        self.mux = mux
+
+        self.server = pool.socket(pool.AF_INET, pool.SOCK_STREAM)
+        self.server.setsockopt(pool.SOL_SOCKET, pool.SO_REUSEADDR, 1)
+        self.server.bind(("", port))
+        self.server.listen(2)
+        self.server.settimeout(0)
+        if mux is not None:
+            mux.register(self.server, self._accept, 0)
+
+        self._req = bytearray(256)
+        self._pending = []   # [conn, accept-Zeit]: Request noch nicht gelesen
+        self._clients = []   # Event-Streams
+        self._event = b"data: {}\n\n"
+        self._state = "{}"
+        self.last_keepalive = 0.0
+        self._deadline = 0.0   # Sendefrist der laufenden Stufe (time.monotonic)
+        self._read_tick = None  # Tick, für den die Frist der Seitenabrufe gilt
+
+        # Monitoring
+        self.events = 0
+        self.dropped = 0
+
+    @property
+    def count(self):
+        return len(self._clients)
+
+    # ---------- Zustand ----------
+    def publish(self, active, viewer, zoom, remain, next_viewer, depth):
+        """Neuen Zustand an alle Streams senden (nur bei Änderungen aufrufen)."""
+        self._state = json.dumps({
+            "active": active,
+            "viewer": viewer,
+            "zoom": zoom,
+            "remain": remain,
+            "next": next_viewer,
+            "depth": depth,
+        })
+        self._event = b"data: " + self._state.encode("utf-8") + b"\n\n"
+        self.events += 1
+        for conn in self._clients[:]:
+            self._send(conn, self._event)
+
+    # ---------- Server ----------
+    def poll(self, now):
+        """Einmal pro Tick: Verbindungen annehmen, Requests beantworten, Keep-Alive.
+        Startet die Sendefrist, die auch für publish() im selben Tick gilt."""
+        self._deadline = time.monotonic() + self.send_budget
+        if self.mux is None:
+            self._accept(now, 0)
+            for p in self._pending[:]:
+                self._read(p, now)
+
+        for p in self._pending[:]:
+            # Request kommt nicht: nach 2 s aufgeben
+            if now - p[1] > 2.0:
+                self._forget(p)
+                _close(p[0])
+
+        if self._clients and (now - self.last_keepalive) >= self.keepalive:
+            self.last_keepalive = now
+            for conn in self._clients[:]:
+                self._send(conn, _KEEPALIVE)
+
+    def _accept(self, now, budget):
+        try:
+            conn, addr = self.server.accept()
+        except OSError:
+            return 0
+        conn.settimeout(0)
+        p = [conn, now]
+        if self.mux is not None:
+            try:
+                self.mux.register(conn, lambda now, budget: self._read(p, now), len(self._req))
+            except RuntimeError:
+                _close(conn)
+                return 1
+        self._pending.append(p)
+        return 1
+
+    def _read(self, p, now):
+        conn = p[0]
+        try:
+            n = conn.recv_into(self._req)
+        except OSError:
+            return 0  # noch nichts da
+        self._forget(p)
+        if now != self._read_tick:
+            # erster Seitenabruf dieses Ticks: eigene Frist (Stufe "udp")
+            self._read_tick = now
+            self._deadline = time.monotonic() + self.send_budget
+        if n:
+            self._route(conn, n)
+        else:
+            _close(conn)
+        return n or 1
+
+    def _forget(self, p):
+        self._pending.remove(p)
+        if self.mux is not None:
+            self.mux.unregister(p[0])
+
+    def _route(self, conn, n):
+        req = self._req
+        if _starts(req, n, b"GET /events"):
+            if len(self._clients) >= self.max_clients:
+                # ältesten Stream schließen (OBS lädt die Quelle oft neu)
+                self._drop(self._clients[0])
+            self._clients.append(conn)
+            if self._send(conn, _HDR_EVENTS):
+                self._send(conn, self._event)
+            return
+        try:
+            if _starts(req, n, b"GET /state"):
+                self._send_all(conn, _HDR_JSON)
+                self._send_all(conn, self._state.encode("utf-8"))
+            elif _starts(req, n, b"GET / ") or _starts(req, n, b"GET /index"):
+                self._send_all(conn, _HDR_PAGE)
+                self._send_all(conn, _PAGE)
+            else:
+                self._send_all(conn, _NOT_FOUND)
+        except OSError:
+            pass
+        _close(conn)
+
+    def _send(self, conn, data):
+        try:
+            self._send_all(conn, data)
+            return True
+        except OSError:
+            self._drop(conn)  # auch beim ersten Timeout: nicht jeden Tick erneut warten
+            return False
+
+    def _send_all(self, conn, data):
+        """send() kann teilweise senden: Rest nachschieben. Jeder send() wartet höchstens
+        send_timeout, alle zusammen nur bis zur Frist der Stufe (sonst OSError)."""
+        mv = memoryview(data)
+        while len(mv):
+            left = self._deadline - time.monotonic()
+            if left <= 0:
+                raise OSError("send budget")
+            conn.settimeout(min(self.send_timeout, left))
+            n = conn.send(mv)
+            if not n:
+                raise OSError("send")
+            mv = mv[n:]
+
+    def _drop(self, conn):
+        if conn in self._clients:
+            self._clients.remove(conn)
+            self.dropped += 1
+        _close(conn)
+
+
+def _starts(buf, n, prefix):
+    if n < len(prefix):
+        return False
+    for i in range(len(prefix)):
+        if buf[i] != prefix[i]:
+            return False
+    return True
+
+
+def _close(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
@@ -0,0 +1,158 @@
+# telemetry.py — Zustandsmeldungen an abonnierte Netz-Clients (Push statt Polling)
+# - Clients melden sich per Datagramm an ("SUB" bzw. Binär-Opcode 0x09) und
+#   erneuern das Abo durch erneutes Senden; ohne Erneuerung läuft es nach
+#   `timeout` Sekunden ab. "UNSUB" meldet sofort ab. main.py nimmt beides nur
+#   von Adressen aus UDP_MGMT_HOSTS an (gefälschte Absender belegen keine Slots)
+# - Feste Abo-Tabelle (slots), Zustand als bytearray: set() kostet je Feld
+#   nur einen Vergleich, gesendet wird nur bei Änderung (Delta) und dazwischen
+#   in großen Abständen der Vollzustand (Heartbeat)
+# - Sendepuffer vorab angelegt, keine Allokation je Meldung
+#
+# Paketformat (Big Endian, Magic wie udp_protocol.py):
+#   0 magic 0xA7 | 1 version | 2 OP_STATE 0x90 | 3 laufende Nummer u8
+#   4 Maske der enthaltenen Felder | danach je gesetztem Bit ein Byte, in
+#   Feld-Reihenfolge. Heartbeat/Anmeldung: alle Bits gesetzt (Vollzustand)
+# Felder (Bit = Index):
+#   0 ZOOM | 1 SOURCE (0 Poti, 1 Override) | 2 REMAIN (Override-Rest in s)
+#   3 AF | 4 FREEZE | 5 BRIGHT | 6 POWER | 7 DEPTH (Warteschlange)
+
+from micropython import const
+
+T_ZOOM = const(0)
+T_SOURCE = const(1)
+T_REMAIN = const(2)
+T_AF = const(3)
+T_FREEZE = const(4)
+T_BRIGHT = const(5)
+T_POWER = const(6)
+T_DEPTH = const(7)
+
+FIELDS = const(8)
+OP_STATE = const(0x90)
+
+_MAGIC = const(0xA7)
+_VERSION = const(1)
+_HEADER = const(5)
+_ALL = const(0xFF)
+
+
+class Telemetry:
+    def __init__(self, sock, slots=4, timeout=60.0, heartbeat=5.0, min_interval=0.05):
+        self.sock = sock
+        self.timeout = timeout
+        self.heartbeat = heartbeat
+        self.min_interval = min_interval  # höchstens so oft Deltas senden
+
+        # Abo-Tabelle: parallele Listen, None = frei
+        self._addr = [None] * slots
+        self._expires = [0.0] * slots
+        self.count = 0
+
+        # Zustand + Maske der seit dem letzten Senden geänderten Felder
+        self._state = bytearray(FIELDS)
+        self._mask = 0
+
+        self._pkt = bytearray(_HEADER + FIELDS)
+        self._pkt[0] = _MAGIC
+        self._pkt[1] = _VERSION
+        self._pkt[2] = OP_STATE
+        mv = memoryview(self._pkt)
+        self._views = [mv[:n] for n in range(len(self._pkt) + 1)]
+        self._seq = 0
+
+        self.last_sent = 0.0
+        self.last_full = 0.0
+
+        # Monitoring
+        self.sent = 0
+        self.expired = 0
+        self.errors = 0
+
+    # ---------- Abos ----------
+    def subscribe(self, addr, now):
+        """Anmelden bzw. erneuern; neue Clients bekommen sofort den Vollzustand. False: Tabelle voll."""
+        free = -1
+        for i in range(len(self._addr)):
+            a = self._addr[i]
+            if a == addr:
+                self._expires[i] = now + self.timeout
+                return True
+            if a is None and free < 0:
+                free = i
+        if free < 0:
+            return False
+        if not self.count:
+            self._mask = 0  # erster Abonnent bekommt ohnehin den Vollzustand
+        self._addr[free] = addr
+        self._expires[free] = now + self.timeout
+        self.count += 1
+        self._send_to(addr, self._build(_ALL))
+        return True
+
+    def unsubscribe(self, addr):
+        for i in range(len(self._addr)):
+            if self._addr[i] == addr:
+                self._addr[i] = None
+                self.count -= 1
+                return True
+        return False
+
+    # ---------- Zustand ----------
+    def set(self, field, value):
+        """Feld setzen (0..255); nur eine Änderung markiert das Feld fürs nächste Delta."""
+        if value < 0:
+            value = 0
+        elif value > 255:
+            value = 255
+        if self._state[field] != value:
+            self._state[field] = value
+            self._mask |= 1 << field
+
+    def update(self, now):
+        """Einmal pro Tick: Abos ablaufen lassen, Delta oder Heartbeat senden."""
+        if not self.count:
+            self._mask = 0
+            return
+        for i in range(len(self._addr)):
+            if self._addr[i] is not None and now >= self._expires[i]:
+                self._addr[i] = None
+                self.count -= 1
+                self.expired += 1
+        if not self.count:
+            return
+
+        if (now - self.last_full) >= self.heartbeat:
+            mask = _ALL
+            self.last_full = now
+        elif self._mask and (now - self.last_sent) >= self.min_interval:
+            mask = self._mask
+        else:
+            return
+        self._mask = 0
+        self.last_sent = now
+
+        data = self._build(mask)
+        for a in self._addr:
+            if a is not None:
+                self._send_to(a, data)
+
+    # ---------- Senden ----------
+    def _build(self, mask):
+        pkt = self._pkt
+        self._seq = (self._seq + 1) & 0xFF
+        pkt[3] = self._seq
+        pkt[4] = mask
+        n = _HEADER
+        state = self._state
+        for f in range(FIELDS):
+            if mask & (1 << f):
+                pkt[n] = state[f]
+                n += 1
+        return self._views[n]
+
+    def _send_to(self, addr, data):
+        try:
+            self.sock.sendto(data, addr)
+            self.sent += 1
+        except OSError:
+            self.errors += 1
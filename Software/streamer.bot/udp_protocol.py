@@ -0,0 +1,687 @@
+# udp_protocol.py — Zero-Copy-Parser für UDP-Befehle (Streamer.bot -> Pico)
+# - Arbeitet direkt auf dem Empfangspuffer (kein bytes()-Kopieren, kein Decode)
+# - Ein Durchlauf: Tokens (Trenner: Whitespace ; = :) als Start/Ende-Indizes,
+#   Schlüsselwort-Vergleich ohne Groß-/Kleinschreibung gegen Byte-Konstanten,
+#   Zoom-Ziffern direkt als Integer
+# - Mehrere Befehle je Datagramm ("ZOOM 12;FREEZE ON;BRIGHT 6"): Ergebnis ist
+#   eine Aktionsliste (cmds/args), die main.py im selben Tick anwendet.
+#   Ist ein Befehl fehlerhaft, wird das ganze Datagramm verworfen
+# - Ergebnis in vorab angelegten Attributen (cmds, args, zoom, Viewer-Slice)
+#   -> keine Heap-Allokation pro Paket; nur viewer() baut bei Bedarf einen String
+#
+# Unterstützte Formate (case-insensitive, "!" vor dem Befehl erlaubt):
+#   "ZOOM 12 Hannes", "!zoom 12 Hannes", "ZOOM:12:Hannes", "ZOOM=12;Hannes",
+#   "ZOOM 12" (Viewer optional), "zoom12" / "!zoom12" (erste Ziffernfolge),
+#   "ZOOMOFF" / "ZOOM OFF" / "!zoomoff" => Override sofort aus,
+#   "LOGDUMP" => Log-Ring an den Absender,
+#   "FREEZE [ON|OFF]", "AF [ON|OFF]" (ohne Argument: umschalten),
+#   "BRIGHT 0..20", "WB AUTO|INDOOR|OUTDOOR|ONEPUSH|ATW|MANUAL|0..15",
+#   "PRESET 0..127" (Memory Recall),
+#   "SUB" / "UNSUB" => Zustandsmeldungen abonnieren/abbestellen (telemetry.py)
+#   "METRICS" => Zähler im Prometheus-Textformat an den Absender (metrics.py)
+#   LOGDUMP, METRICS, SUB und UNSUB gelten nur für Absender aus UDP_MGMT_HOSTS
+#   (config.py): große bzw. wiederkehrende Antworten auf ein kleines, fälschbares
+#   Datagramm, dazu Log-Inhalte
+# Befehle werden durch Zeilenumbruch oder ";" getrennt. Ein ";" trennt nur,
+# wenn danach ein bekannter Befehl folgt ("FREEZE ON;AF", "ZOOM 12 Hannes;AF").
+# Im ZOOM-Befehl steht bis zum Viewer ";" auch für den Viewer-Trenner
+# ("ZOOM=12;Hannes"); folgt dort ein Befehlswort ("ZOOM 12;af", "zoom=12;bright 4"),
+# ist unklar, ob Viewer oder Befehl gemeint ist -> ganzes Datagramm verworfen
+# (Viewer mit solchem Namen: "ZOOM 12 af", weitere Befehle per Zeilenumbruch).
+#
+# Adressierung (Multicast an mehrere Stationen): optionales Präfix
+#   "@<ziele> " vor den Befehlen, Ziele durch "," getrennt: Station-ID
+#   ("@3"), Gruppe ("@g2") oder alle ("@*"), z.B. "@1,g2 ZOOM 12".
+#   Ohne Präfix gilt das Datagramm für alle Stationen. Nicht adressierte
+#   Datagramme werden still verworfen (addressed = False, filtered += 1)
+#
+# Binärformat (automatisch erkannt am Magic-Byte 0xA7, Big Endian):
+#   0 magic 0xA7 | 1 version | 2 opcode | 3 argc | 4-5 seq u16 | 6-9 ts u32
+#   10.. argc Bytes Argumente
+#   Version 2: zusätzlich 10 dst (0 = alle, 1..127 Station, 0x80|g Gruppe g),
+#   Argumente ab Byte 11
+#   PING    0x00  -               (nur Ack, z.B. für Latenzmessung)
+#   ZOOM    0x01  zoom u8, viewer (argc-1 Bytes UTF-8, optional)
+#   ZOOMOFF 0x02  -
+#   LOGDUMP 0x03  -
+#   FREEZE  0x04  u8 0/1 (ohne Argument: umschalten)
+#   AF      0x05  u8 0/1 (ohne Argument: umschalten)
+#   BRIGHT  0x06  u8 0..20
+#   WB      0x07  u8 0..15
+#   PRESET  0x08  u8 0..127
+#   SUB     0x09  -
+#   UNSUB   0x0A  -
+#   METRICS 0x0B  -
+# Jedes Binär-Frame wird mit einem Ack beantwortet (ACK_LEN Bytes):
+#   0 magic | 1 version | 2 opcode|0x80 | 3 status | 4-5 seq | 6-9 ts (Echo)
+#   10-13 Empfangszeit des Geräts (ticks_ms u32) | 14 zoom | 15 Position in
+#   der Warteschlange | 16 Tiefe der Warteschlange | 17 Flags
+#   Version 2: zusätzlich 18 Station-ID des Geräts (ACK_LEN_V2 Bytes)
+# Wiederholte Frames (gleiche seq + ts) eines angenommenen Befehls werden nicht
+# erneut ausgeführt; das Ack wiederholt Status und Position des ersten Empfangs
+# und setzt FLAG_DUPLICATE. Abgelehnte Frames (Rate-Limit, Warteschlange voll,
+# Kamera aus, fehlerhaft) werden nicht gemerkt: eine Wiederholung mit derselben
+# seq wird neu geprüft.
+
+from micropython import const
+
+try:
+    from supervisor import ticks_ms
+except ImportError:
+    ticks_ms = None
+
+CMD_NONE = const(0)
+CMD_ZOOM = const(1)
+CMD_OFF = const(2)
+CMD_LOGDUMP = const(3)
+CMD_PING = const(4)
+CMD_FREEZE = const(5)
+CMD_AF = const(6)
+CMD_BRIGHT = const(7)
+CMD_WB = const(8)
+CMD_PRESET = const(9)
+CMD_SUB = const(10)
+CMD_UNSUB = const(11)
+CMD_METRICS = const(12)
+
+# Argument von FREEZE/AF
+ARG_OFF = const(0)
+ARG_ON = const(1)
+ARG_TOGGLE = const(2)
+
+BRIGHT_MAX = const(20)
+PRESET_MAX = const(127)
+
+# Binärformat
+BIN_MAGIC = const(0xA7)
+BIN_VERSION = const(1)
+BIN_VERSION_V2 = const(2)
+BIN_HEADER = const(10)
+BIN_HEADER_V2 = const(11)
+ACK_LEN = const(18)
+ACK_LEN_V2 = const(19)
+DST_ALL = const(0)
+DST_GROUP = const(0x80)
+
+OP_PING = const(0x00)
+OP_ZOOM = const(0x01)
+OP_ZOOMOFF = const(0x02)
+OP_LOGDUMP = const(0x03)
+OP_FREEZE = const(0x04)
+OP_AF = const(0x05)
+OP_BRIGHT = const(0x06)
+OP_WB = const(0x07)
+OP_PRESET = const(0x08)
+OP_SUB = const(0x09)
+OP_UNSUB = const(0x0A)
+OP_METRICS = const(0x0B)
+OP_ACK = const(0x80)
+
+ST_OK = const(0)
+ST_DUPLICATE = const(1)   # nicht mehr gesendet (Wiederholungen: FLAG_DUPLICATE)
+ST_RATE_GLOBAL = const(2)
+ST_RATE_VIEWER = const(3)
+ST_QUEUE_FULL = const(4)
+ST_BAD_FRAME = const(5)
+ST_UNKNOWN_OP = const(6)
+ST_POWER_OFF = const(7)
+ST_NO_SLOT = const(8)
+ST_DENIED = const(9)      # LOGDUMP/METRICS/SUB/UNSUB von außerhalb UDP_MGMT_HOSTS
+
+FLAG_OVERRIDE = const(0x01)
+FLAG_FREEZE = const(0x02)
+FLAG_AUTOFOCUS = const(0x04)
+FLAG_POWER = const(0x08)
+FLAG_DUPLICATE = const(0x10)  # Wiederholung: Status/Position vom ersten Empfang
+
+_DEDUP_WINDOW = const(16)
+# Index = Opcode
+_OP_CMD = (CMD_PING, CMD_ZOOM, CMD_OFF, CMD_LOGDUMP,
+           CMD_FREEZE, CMD_AF, CMD_BRIGHT, CMD_WB, CMD_PRESET,
+           CMD_SUB, CMD_UNSUB, CMD_METRICS)
+
+ZOOM_MIN = const(1)
+ZOOM_MAX = const(30)
+
+_MAX_TOKENS = const(3)
+MAX_ACTIONS = const(8)
+
+# Trenner: Whitespace/Steuerzeichen sowie ; = :
+_SEP = bytearray(256)
+for _b in range(33):
+    _SEP[_b] = 1
+for _b in b";=:":
+    _SEP[_b] = 1
+
+_KW_ZOOM = b"zoom"
+_KW_ZOOMOFF = b"zoomoff"
+_KW_OFF = b"off"
+_KW_LOGDUMP = b"logdump"
+_KW_ON = b"on"
+_KW_TOGGLE = b"toggle"
+
+# Argumenttypen der Dispatch-Tabelle
+_ARG_SWITCH = const(0)
+_ARG_BRIGHT = const(1)
+_ARG_WB = const(2)
+_ARG_PRESET = const(3)
+_ARG_NONE = const(4)
+
+# Dispatch-Tabelle: Schlüsselwort (ohne "!") -> Befehl, Argumenttyp
+_COMMANDS = (
+    (b"freeze", CMD_FREEZE, _ARG_SWITCH),
+    (b"af", CMD_AF, _ARG_SWITCH),
+    (b"bright", CMD_BRIGHT, _ARG_BRIGHT),
+    (b"wb", CMD_WB, _ARG_WB),
+    (b"preset", CMD_PRESET, _ARG_PRESET),
+    (b"sub", CMD_SUB, _ARG_NONE),
+    (b"unsub", CMD_UNSUB, _ARG_NONE),
+    (b"metrics", CMD_METRICS, _ARG_NONE),
+)
+# Argumenttyp je Befehl (Index = CMD_*), für Binär-Frames
+_CMD_ARG = (-1, -1, -1, -1, -1, _ARG_SWITCH, _ARG_SWITCH, _ARG_BRIGHT, _ARG_WB, _ARG_PRESET,
+            -1, -1, -1)
+
+# Weißabgleich-Modi (VISCA WB 0x35)
+_WB_MODES = (
+    (b"auto", 0),
+    (b"indoor", 1),
+    (b"outdoor", 2),
+    (b"onepush", 3),
+    (b"atw", 4),
+    (b"manual", 5),
+)
+
+
+class UdpCommandParser:
+    def __init__(self, buf, viewer_max=10, station=0, groups=0):
+        self.buf = buf
+        self.mv = memoryview(buf)
+        self.viewer_max = viewer_max
+
+        # Adressierung: eigene Station-ID und Gruppen als Bitmaske (group_mask())
+        self.station = station
+        self.groups = groups
+        self.addressed = True
+        self.filtered = 0
+
+        # Ergebnis des letzten parse(): Aktionsliste + Zoom/Viewer des ZOOM-Befehls
+        self.count = 0
+        self.cmds = bytearray(MAX_ACTIONS)
+        self.args = bytearray(MAX_ACTIONS)
+        self.cmd = CMD_NONE  # erste Aktion (für Debug-Ausgaben)
+        self.zoom = 0
+        self.viewer_start = 0
+        self.viewer_end = 0
+
+        # Token-Grenzen (nur die ersten _MAX_TOKENS werden gebraucht)
+        self._ts = [0] * _MAX_TOKENS
+        self._te = [0] * _MAX_TOKENS
+
+        # Binärformat: Status des letzten Frames, Ack-Puffer, Duplikat-Fenster
+        self.binary = False
+        self.version = BIN_VERSION
+        self.opcode = 0
+        self.status = ST_OK
+        self._ack = bytearray(ACK_LEN_V2)
+        self._ack[0] = BIN_MAGIC
+        self._ack[ACK_LEN] = station
+        mv = memoryview(self._ack)
+        self._ack_v1 = mv[:ACK_LEN]
+        self._ack_v2 = mv
+        self._seen_seq = [-1] * _DEDUP_WINDOW
+        self._seen_ts = [-1] * _DEDUP_WINDOW
+        self._seen_status = bytearray(_DEDUP_WINDOW)
+        self._seen_qpos = bytearray(_DEDUP_WINDOW)
+        self._seen_pos = 0
+        self._seq = -1       # seq/ts des zuletzt geparsten Frames (für remember())
+        self._ts_lo = -1
+        self.duplicate = False
+        self.dup_qpos = 0
+        self.duplicates = 0
+
+    def parse(self, n):
+        """Parst die ersten n Bytes des Puffers; Rückgabe ist die Anzahl Aktionen (self.count)."""
+        self.count = 0
+        self.cmd = CMD_NONE
+        self.zoom = 0
+        self.viewer_start = 0
+        self.viewer_end = 0
+
+        self.addressed = True
+        self.duplicate = False
+
+        if n and self.buf[0] == BIN_MAGIC:
+            self._parse_binary(n)
+        else:
+            self.binary = False
+            s = self._target(n)
+            if s < 0:
+                self.addressed = False
+                self.filtered += 1
+                return 0
+            self._parse_text(n, s)
+        if self.count:
+            self.cmd = self.cmds[0]
+        return self.count
+
+    def _add(self, cmd, arg=0):
+        i = self.count
+        if i >= MAX_ACTIONS:
+            return False
+        self.cmds[i] = cmd
+        self.args[i] = arg
+        self.count = i + 1
+        return True
+
+    # ---------- Adressierung ----------
+    def _target(self, n):
+        """Start der Befehle nach einem "@ziele"-Präfix; -1, wenn nicht für dieses Gerät."""
+        buf = self.buf
+        i = 0
+        while i < n and buf[i] <= 32:
+            i += 1
+        if i >= n or buf[i] != 64:  # @
+            return 0
+        i += 1
+        end = i
+        while end < n and buf[end] > 32:
+            end += 1
+        match = False
+        while i < end:
+            j = i
+            while j < end and buf[j] != 44:  # ,
+                j += 1
+            if not match:
+                match = self._target_item(i, j)
+            i = j + 1
+        return end if match else -1
+
+    def _target_item(self, s, e):
+        buf = self.buf
+        if e - s == 1 and buf[s] == 42:  # *
+            return True
+        if s < e and (buf[s] | 0x20) == 103:  # g<n>
+            g = _parse_int(buf, s + 1, e)
+            return g is not None and 0 < g < 30 and bool(self.groups & (1 << g))
+        station = _parse_int(buf, s, e)
+        return station is not None and station == self.station
+
+    def _dst_match(self, dst):
+        if dst == DST_ALL:
+            return True
+        if dst & DST_GROUP:
+            g = dst & 0x7F
+            return 0 < g < 30 and bool(self.groups & (1 << g))
+        return dst == self.station
+
+    # ---------- Text ----------
+    def _parse_text(self, n, s=0):
+        while s < n:
+            e = self._segment_end(s, n)
+            if e < 0 or not self._parse_segment(s, e):
+                # Alles oder nichts: ein fehlerhafter Befehl verwirft das Datagramm
+                self.count = 0
+                self.zoom = 0
+                return
+            s = e + 1
+
+    def _segment_end(self, s, n):
+        """Ende des Befehls ab s: Zeilenumbruch oder ";" vor einem bekannten Befehl;
+        -1, wenn ";" + Befehlswort an der Stelle des ZOOM-Viewers steht (mehrdeutig)."""
+        buf = self.buf
+        sep = _SEP
+        i = s
+        while i < n and sep[buf[i]] and buf[i] != 10:
+            i += 1
+        t = i
+        while i < n and not sep[buf[i]]:
+            i += 1
+        # ZOOM: Viewer ist das 3. Token ("zoom 12 Hannes") bzw. das 2. ("zoom12 Hannes")
+        p = t + 1 if t < i and buf[t] == 33 else t
+        viewer_tok = 0
+        if _eq(buf, p, i, _KW_ZOOM):
+            viewer_tok = 3
+        elif i - p > 4 and _startswith(buf, p, i, _KW_ZOOM) and _parse_int(buf, p + 4, i) is not None:
+            viewer_tok = 2
+        ntok = 1 if t < i else 0
+        while i < n:
+            b = buf[i]
+            if b == 10:
+                return i
+            if b == 59:
+                if self._starts_command(i + 1, n):
+                    return i if ntok >= viewer_tok else -1
+            elif not sep[b] and sep[buf[i - 1]]:
+                ntok += 1
+            i += 1
+        return n
+
+    def _starts_command(self, s, n):
+        buf = self.buf
+        sep = _SEP
+        while s < n and sep[buf[s]]:
+            s += 1
+        e = s
+        while e < n and not sep[buf[e]]:
+            e += 1
+        if s < e and buf[s] == 33:  # !
+            s += 1
+        if s >= e:
+            return False
+        if _eq(buf, s, e, _KW_ZOOM) or _eq(buf, s, e, _KW_ZOOMOFF) or _eq(buf, s, e, _KW_LOGDUMP):
+            return True
+        if e - s > 4 and _startswith(buf, s, e, _KW_ZOOM) and _parse_int(buf, s + 4, e) is not None:
+            return True
+        return _find_command(buf, s, e) >= 0
+
+    def _parse_segment(self, s, e):
+        buf = self.buf
+        sep = _SEP
+        ts = self._ts
+        te = self._te
+
+        # ---------- Ein Durchlauf: Tokens + erste Ziffernfolge ----------
+        ntok = 0
+        start = -1
+        d0 = -1
+        d1 = -1
+        for i in range(s, e):
+            b = buf[i]
+            if sep[b]:
+                if start >= 0:
+                    if ntok < _MAX_TOKENS:
+                        ts[ntok] = start
+                        te[ntok] = i
+                    ntok += 1
+                    start = -1
+            elif start < 0:
+                start = i
+            if d1 < 0:
+                if 48 <= b <= 57:
+                    if d0 < 0:
+                        d0 = i
+                elif d0 >= 0:
+                    d1 = i
+        if start >= 0:
+            if ntok < _MAX_TOKENS:
+                ts[ntok] = start
+                te[ntok] = e
+            ntok += 1
+        if d0 >= 0 and d1 < 0:
+            d1 = e
+
+        if not ntok:
+            return True  # leerer Abschnitt (";;", Zeilenende)
+
+        s0 = ts[0]
+        e0 = te[0]
+        if buf[s0] == 33:  # "!" vor dem Befehl
+            s0 += 1
+
+        # ---------- Override aus / Log-Dump ----------
+        if _eq(buf, s0, e0, _KW_ZOOMOFF):
+            return self._add(CMD_OFF)
+        if _eq(buf, s0, e0, _KW_LOGDUMP):
+            return ntok == 1 and self._add(CMD_LOGDUMP)
+
+        # ---------- "zoom <n> [viewer]" (höchstens einmal je Datagramm) ----------
+        if _startswith(buf, s0, e0, _KW_ZOOM):
+            if _eq(buf, s0, e0, _KW_ZOOM):
+                if ntok < 2:
+                    return False
+                if _eq(buf, ts[1], te[1], _KW_OFF):
+                    return self._add(CMD_OFF)
+                zoom = _parse_int(buf, ts[1], te[1])
+                if zoom is None or self.zoom:
+                    return False
+                if ntok >= 3:
+                    self.viewer_start = ts[2]
+                    self.viewer_end = _clip_chars(buf, ts[2], te[2], self.viewer_max)
+                self.zoom = _clamp(zoom)
+                return self._add(CMD_ZOOM)
+            # Fallback: "zoom12" / "!zoom12"
+            if d0 < 0 or self.zoom:
+                return False
+            self.zoom = _clamp(_parse_int(buf, d0, d1))
+            return self._add(CMD_ZOOM)
+
+        # ---------- Kamera-Befehle aus der Dispatch-Tabelle ----------
+        k = _find_command(buf, s0, e0)
+        if k < 0:
+            return False
+        entry = _COMMANDS[k]
+        if entry[2] == _ARG_NONE:
+            arg = 0
+        elif ntok < 2:
+            arg = ARG_TOGGLE if entry[2] == _ARG_SWITCH else -1
+        else:
+            arg = _parse_arg(buf, ts[1], te[1], entry[2])
+        if arg < 0:
+            return False
+        return self._add(entry[1], arg)
+
+    # ---------- Binär ----------
+    def _parse_binary(self, n):
+        """Festes Layout: Header prüfen, Duplikate erkennen, Argumente als Slices."""
+        buf = self.buf
+        ack = self._ack
+        self.binary = True
+        self.version = BIN_VERSION
+        self.opcode = 0
+        self.status = ST_OK
+
+        # Empfangszeit + Echo von seq/ts sofort in den Ack (udp_buf wird wiederverwendet)
+        _put_u32(ack, 10, ticks_ms() if ticks_ms else 0)
+        for i in range(4, BIN_HEADER):
+            ack[i] = buf[i] if i < n else 0
+        version = buf[1] if n > 1 else 0
+        if version != BIN_VERSION_V2:
+            version = BIN_VERSION
+        self.version = version
+        ack[1] = version
+        a = BIN_HEADER_V2 if version == BIN_VERSION_V2 else BIN_HEADER
+
+        if n < a or buf[1] != version or a + buf[3] > n:
+            self.status = ST_BAD_FRAME
+            ack[2] = OP_ACK
+            return
+
+        # Version 2: Ziel prüfen, fremde Frames ohne Ack verwerfen
+        if version == BIN_VERSION_V2 and not self._dst_match(buf[BIN_HEADER]):
+            self.addressed = False
+            self.filtered += 1
+            return
+
+        op = buf[2]
+        argc = buf[3]
+        self.opcode = op
+        ack[2] = OP_ACK | op
+
+        # Duplikat: gleiche seq und gleiche untere 16 Bit des Zeitstempels wie ein
+        # angenommenes Frame -> nichts ausführen, Ergebnis vom ersten Mal melden
+        seq = (buf[4] << 8) | buf[5]
+        ts_lo = (buf[8] << 8) | buf[9]
+        self._seq = seq
+        self._ts_lo = ts_lo
+        seen_seq = self._seen_seq
+        seen_ts = self._seen_ts
+        for i in range(_DEDUP_WINDOW):
+            if seen_seq[i] == seq and seen_ts[i] == ts_lo:
+                self.status = self._seen_status[i]
+                self.dup_qpos = self._seen_qpos[i]
+                self.duplicate = True
+                self.duplicates += 1
+                return
+
+        if op >= len(_OP_CMD):
+            self.status = ST_UNKNOWN_OP
+            return
+        cmd = _OP_CMD[op]
+        arg = 0
+        if cmd == CMD_ZOOM:
+            if argc < 1:
+                self.status = ST_BAD_FRAME
+                return
+            self.zoom = _clamp(buf[a])
+            self.viewer_start = a + 1
+            self.viewer_end = _clip_chars(buf, a + 1, a + argc, self.viewer_max)
+        else:
+            kind = _CMD_ARG[cmd]
+            if kind >= 0:
+                if argc:
+                    arg = _check_arg(kind, buf[a])
+                else:
+                    arg = ARG_TOGGLE if kind == _ARG_SWITCH else -1
+                if arg < 0:
+                    self.status = ST_BAD_FRAME
+                    return
+        self._add(cmd, arg)
+
+    def remember(self, status, qpos):
+        """Nach dem Ausführen: angenommenes Binär-Frame samt Ergebnis fürs Duplikat-Fenster
+        merken. Abgelehnte Frames bleiben draußen, damit eine Wiederholung neu geprüft wird."""
+        if not self.binary or self.duplicate or status != ST_OK:
+            return
+        i = self._seen_pos
+        self._seen_seq[i] = self._seq
+        self._seen_ts[i] = self._ts_lo
+        self._seen_status[i] = status
+        self._seen_qpos[i] = qpos if 0 <= qpos < 256 else 0
+        self._seen_pos = (i + 1) % _DEDUP_WINDOW
+
+    def ack(self, status, zoom, qpos, depth, flags):
+        """Ack für das zuletzt geparste Binär-Frame (fester Puffer, keine Allokation)."""
+        ack = self._ack
+        ack[3] = status
+        ack[14] = zoom
+        ack[15] = qpos if 0 <= qpos < 256 else 0
+        ack[16] = depth
+        ack[17] = flags | FLAG_DUPLICATE if self.duplicate else flags
+        return self._ack_v2 if self.version == BIN_VERSION_V2 else self._ack_v1
+
+    def viewer_bytes(self):
+        """Viewer-Name als memoryview in den Empfangspuffer (ohne Kopie)."""
+        return self.mv[self.viewer_start:self.viewer_end]
+
+    def viewer(self):
+        """Viewer-Name als String (allokiert; nur für angewendete Befehle)."""
+        if self.viewer_end <= self.viewer_start:
+            return ""
+        try:
+            return str(self.viewer_bytes(), "utf-8")
+        except Exception:
+            out = ""
+            for b in self.viewer_bytes():
+                out += chr(b) if 32 <= b <= 126 else " "
+            return out
+
+
+def group_mask(groups):
+    """Gruppen 1..29 (aus config.py) als Bitmaske für UdpCommandParser."""
+    mask = 0
+    for g in groups:
+        if 0 < g < 30:
+            mask |= 1 << g
+    return mask
+
+
+def _put_u32(buf, pos, value):
+    buf[pos] = (value >> 24) & 0xFF
+    buf[pos + 1] = (value >> 16) & 0xFF
+    buf[pos + 2] = (value >> 8) & 0xFF
+    buf[pos + 3] = value & 0xFF
+
+
+def _find_command(buf, s, e):
+    """Index in _COMMANDS für das Token buf[s:e], sonst -1."""
+    for k in range(len(_COMMANDS)):
+        if _eq(buf, s, e, _COMMANDS[k][0]):
+            return k
+    return -1
+
+
+def _parse_arg(buf, s, e, kind):
+    """Argument-Token nach Typ in einen Wert 0..255 wandeln, ungültig: -1."""
+    if kind == _ARG_SWITCH:
+        if _eq(buf, s, e, _KW_ON):
+            return ARG_ON
+        if _eq(buf, s, e, _KW_OFF):
+            return ARG_OFF
+        if _eq(buf, s, e, _KW_TOGGLE):
+            return ARG_TOGGLE
+    elif kind == _ARG_WB:
+        for k in range(len(_WB_MODES)):
+            if _eq(buf, s, e, _WB_MODES[k][0]):
+                return _WB_MODES[k][1]
+    v = _parse_int(buf, s, e)
+    if v is None:
+        return -1
+    return _check_arg(kind, v)
+
+
+def _check_arg(kind, v):
+    if kind == _ARG_SWITCH:
+        return v if 0 <= v <= ARG_TOGGLE else -1
+    if kind == _ARG_BRIGHT:
+        return 0 if v < 0 else (BRIGHT_MAX if v > BRIGHT_MAX else v)
+    if kind == _ARG_WB:
+        return v if 0 <= v <= 15 else -1
+    return v if 0 <= v <= PRESET_MAX else -1
+
+
+def _eq(buf, s, e, kw):
+    """Token buf[s:e] == kw (kw klein geschrieben), ohne Groß-/Kleinschreibung."""
+    n = len(kw)
+    if e - s != n:
+        return False
+    for i in range(n):
+        if (buf[s + i] | 0x20) != kw[i]:
+            return False
+    return True
+
+
+def _startswith(buf, s, e, kw):
+    n = len(kw)
+    if e - s < n:
+        return False
+    for i in range(n):
+        if (buf[s + i] | 0x20) != kw[i]:
+            return False
+    return True
+
+
+def _parse_int(buf, s, e):
+    """Dezimalzahl (optional mit Vorzeichen) aus buf[s:e], sonst None."""
+    neg = False
+    if s < e and (buf[s] == 43 or buf[s] == 45):  # + -
+        neg = buf[s] == 45
+        s += 1
+    if s >= e:
+        return None
+    val = 0
+    for i in range(s, e):
+        b = buf[i]
+        if not 48 <= b <= 57:
+            return None
+        val = val * 10 + (b - 48)
+    return -val if neg else val
+
+
+def _clamp(z):
+    if z < ZOOM_MIN:
+        return ZOOM_MIN
+    if z > ZOOM_MAX:
+        return ZOOM_MAX
+    return z
+
+
+def _clip_chars(buf, s, e, max_chars):
+    """Ende des Slices nach höchstens max_chars UTF-8-Zeichen (nie mitten im Zeichen)."""
+    chars = 0
+    for i in range(s, e):
+        if (buf[i] & 0xC0) != 0x80:  # kein Folgebyte -> neues Zeichen
+            if chars == max_chars:
+                return i
+            chars += 1
+    return e
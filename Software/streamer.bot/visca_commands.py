@@ -3,14 +3,48 @@
 import busio
 import time
 from config import ZOOM_LEVELS
+from log import log, DEBUG_ON
+
+# Paketklassen für die UART-Statistik (metrics.py)
+TX_CONTROL = 0
+TX_ZOOM = 1
+TX_OVERLAY = 2
+TX_CLASSES = ("control", "zoom", "overlay")
 
 class ViscaCamera:
-    def __init__(self, uart):
+    def __init__(self, uart, batch_size=128):
         self.uart = uart
         self.autofocus = True
         self.freeze = False
         self.power = False
 
+        # Vorab allokierte Sendepuffer: im Betrieb keine Heap-Allokation pro Befehl
+        self._cmd = bytearray(20)
+        self._cmd[0:3] = b"\x81\x01\x04"
+        mv = memoryview(self._cmd)
+        self._cmd_views = [mv[:n] for n in range(len(self._cmd) + 1)]
+        self._ovl_cfg = bytearray(b"\x81\x01\x04\x73\x10\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\xFF")
+        self._ovl_text = bytearray(b"\x81\x01\x04\x73\x20" + b"\x42" * 10 + b"\xFF")
+        self._ovl_blank = bytearray(b"\x81\x01\x04\x73\x30" + b"\x42" * 10 + b"\xFF")
+        self._zoom_cmd = bytearray(b"\x81\x01\x04\x47\x00\x00\x00\x00\xFF")
+
+        # UART-Statistik (Diagnoseseite): gesendete Bytes seit Start
+        self.tx_bytes = 0
+        # je Paketklasse (TX_*): Bytes und Pakete; Pakete, die sich einen
+        # UART-Write mit Vorgängern teilen; unvollständige Writes
+        self.class_bytes = [0] * len(TX_CLASSES)
+        self.class_packets = [0] * len(TX_CLASSES)
+        self.coalesced = 0
+        self.errors = 0
+
+        # Sammelpuffer: zwischen begin_batch() und end_batch() gehen alle
+        # Befehle als ein zusammenhängender UART-Write raus
+        self._batch = bytearray(batch_size)
+        self._batch_mv = memoryview(self._batch)
+        self._batch_len = 0
+        self._batching = False
+        self.batches = 0
+
     # Zeichentabelle für VISCA-Text
     VISCA_CHARS = {
         'A': 0x00, 'B': 0x01, 'C': 0x02, 'D': 0x03, 'E': 0x04, 'F': 0x05, 'G': 0x06, 'H': 0x07,
@@ -25,38 +59,90 @@ class ViscaCamera:
         "'": 0x4B, '.': 0x4C, ',': 0x4D, '/': 0x4E, '-': 0x4F
     }
 
-    def send_command(self, cmd_data):
+    def send_command(self, cmd_data, cls=TX_CONTROL):
         """Sendet einen VISCA-Befehl an die Kamera."""
-        cmd = bytearray([0x81, 0x01, 0x04])
-        cmd.extend(cmd_data)
-        cmd.append(0xFF)
-        self.uart.write(cmd)
+        cmd = self._cmd
+        n = len(cmd_data)
+        for i in range(n):
+            cmd[3 + i] = cmd_data[i]
+        cmd[3 + n] = 0xFF
+        self._write(self._cmd_views[4 + n], cls)
+
+    def _write(self, data, cls=TX_CONTROL):
+        n = len(data)
+        self.class_bytes[cls] += n
+        self.class_packets[cls] += 1
+        if self._batching:
+            pos = self._batch_len
+            if pos + n > len(self._batch):
+                # Puffer voll: bisherigen Inhalt senden, dann weiter sammeln
+                self._flush_batch()
+                pos = 0
+                if n > len(self._batch):
+                    self._uart_write(data)
+                    return
+            if pos:
+                self.coalesced += 1
+            batch = self._batch
+            for i in range(n):
+                batch[pos + i] = data[i]
+            self._batch_len = pos + n
+            return
+        self._uart_write(data)
+
+    def _uart_write(self, data):
+        n = self.uart.write(data)
+        if n:
+            self.tx_bytes += n
+        if n != len(data):
+            self.errors += 1  # Timeout oder nur teilweise gesendet
+
+    def _flush_batch(self):
+        if self._batch_len:
+            self._uart_write(self._batch_mv[:self._batch_len])
+            self._batch_len = 0
+            self.batches += 1
+
+    def begin_batch(self):
+        """Ab hier Befehle sammeln statt einzeln senden."""
+        self._batching = True
+        self._batch_len = 0
+
+    def end_batch(self):
+        """Gesammelte Befehle mit einem UART-Write senden."""
+        self._batching = False
+        self._flush_batch()
 
     def set_overlay_text(self, text, line=0x10, x_pos=0x00, color=0x00, blink=0x00):
         """Setzt Overlay-Text in einer bestimmten Zeile mit drei Befehlen."""
-        if len(text) > 10:
-            text = text[:10]
-        text_bytes = bytearray([self.VISCA_CHARS.get(char, 0x42) for char in text.upper()])
-        text_block = text_bytes + bytearray([0x42] * (10 - len(text_bytes)))
-
-        self.send_command([0x74, 0x2F])
-        print(f"Sende Overlay-Aktivierungsbefehl: ['0x81', '0x1', '0x4', '0x74', '0x2f', '0xff']")
-
-        cmd1 = bytearray([0x81, 0x01, 0x04, 0x73, line, 0x00, x_pos, color, blink, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0xFF])
-        self.uart.write(cmd1)
-        print(f"Sende Einstellungs-Befehl: {[hex(b) for b in cmd1]}")
-
-        cmd2 = bytearray([0x81, 0x01, 0x04, 0x73, line + 0x10])
-        cmd2.extend(text_block)
-        cmd2.append(0xFF)
-        self.uart.write(cmd2)
-        print(f"Sende Textblock 1: {[hex(b) for b in cmd2]}")
-
-        cmd3 = bytearray([0x81, 0x01, 0x04, 0x73, line + 0x20])
-        cmd3.extend(bytearray([0x42] * 10))
-        cmd3.append(0xFF)
-        self.uart.write(cmd3)
-        print(f"Sende Textblock 2: {[hex(b) for b in cmd3]}")
+        n = len(text)
+        if n > 10:
+            n = 10  # Begrenze auf 10 Zeichen
+        chars = self.VISCA_CHARS
+        block = self._ovl_text
+        for i in range(10):
+            # Fallback und Auffüllen mit Leerzeichen (0x42)
+            block[5 + i] = chars.get(text[i].upper(), 0x42) if i < n else 0x42
+        block[4] = line + 0x10
+
+        cfg = self._ovl_cfg
+        cfg[4] = line
+        cfg[6] = x_pos
+        cfg[7] = color
+        cfg[8] = blink
+
+        blank = self._ovl_blank
+        blank[4] = line + 0x20
+
+        # Text-Overlay aktivieren, Einstellungen, Textblock 1, Textblock 2 (leer)
+        self.send_command(b"\x74\x2F", TX_OVERLAY)
+        self._write(cfg, TX_OVERLAY)
+        self._write(block, TX_OVERLAY)
+        self._write(blank, TX_OVERLAY)
+
+        if DEBUG_ON:
+            # Kopien, da die Puffer bis zur (späteren) Ausgabe wiederverwendet werden
+            log.debug("VISCA Overlay:", bytes(cfg), bytes(block), bytes(blank))
 
     def set_zoom_level(self, zoom, line=0x1A, x_pos=0x00):
         """Setzt die Zoomstufe in der letzten Zeile (0x1A), linksbündig."""
@@ -67,7 +153,7 @@ class ViscaCamera:
         self.send_command([0x00, 0x02 if on else 0x03])
         if on:
             time.sleep(5)
-            print("On-State Standardwerte an Kamera schicken...")
+            log.info("On-State Standardwerte an Kamera schicken...")
             self.send_command([0x74, 0x1F])
             self.send_command([0x59, 0x03])
             self.send_command([0x39, 0x00])
@@ -92,21 +178,41 @@ class ViscaCamera:
         q = (code >> 8) & 0x0F
         r = (code >> 4) & 0x0F
         s = code & 0x0F
-        cmd = bytearray([0x81, 0x01, 0x04, 0x47, p, q, r, s, 0xFF])
-        self.uart.write(cmd)
+        cmd = self._zoom_cmd
+        cmd[4] = p
+        cmd[5] = q
+        cmd[6] = r
+        cmd[7] = s
+        self._write(cmd, TX_ZOOM)
 
     def set_brightness(self, brightness):
         high = (brightness >> 4) & 0x0F
         low = brightness & 0x0F
-        self.send_command([0x4E, 0x00, 0x00, high, low])
+        cmd = self._cmd
+        cmd[3] = 0x4E
+        cmd[4] = 0x00
+        cmd[5] = 0x00
+        cmd[6] = high
+        cmd[7] = low
+        cmd[8] = 0xFF
+        self._write(self._cmd_views[9])
+
+    def recall_preset(self, preset):
+        """Kamera-Preset (Memory Recall) 0..127 abrufen."""
+        cmd = self._cmd
+        cmd[3] = 0x3F
+        cmd[4] = 0x02
+        cmd[5] = preset & 0x7F
+        cmd[6] = 0xFF
+        self._write(self._cmd_views[7])
 
     def set_whitebalance(self, whitebalance):
         cmd = bytearray([0x81, 0x01, 0x04, 0x35, whitebalance, 0xFF])
-        self.uart.write(cmd)
+        self._write(cmd)
 
     def set_autofocus(self, autofocus_on):
         cmd = bytearray([0x81, 0x01, 0x04, 0x38, 0x02 if autofocus_on else 0x03, 0xFF])
-        self.uart.write(cmd)
+        self._write(cmd)
         self.autofocus = autofocus_on
 
     def set_freeze(self, is_freeze: bool):
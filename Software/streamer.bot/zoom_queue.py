@@ -0,0 +1,191 @@
+# zoom_queue.py — Faire Warteschlange für Zoom-Einlösungen mit festen Slots
+# - Begrenzte FIFO (Ringpuffer), je Viewer höchstens ein Eintrag: ein
+#   erneuter Befehl aktualisiert nur die Zoomstufe, die Position bleibt; ist
+#   der Viewer gerade dran, gilt die neue Stufe sofort (kein zweiter Slot)
+# - Viewer gleich ohne Groß-/Kleinschreibung (wie rate_limit.viewer_key)
+# - Jeder Eintrag bekommt einen garantierten Slot (slot_time Sekunden),
+#   neue Einlösungen verdrängen den laufenden Slot nicht mehr
+# - Leer -> zurück auf manuell
+# - Viewer-Namen liegen in vorab angelegten Puffern (keine Allokation je
+#   Einlösung); Strings entstehen nur für das Overlay, wenn sich etwas ändert
+# - Tiefe, Wartezeiten und Zähler für Diagnose/Monitoring
+
+from micropython import const
+
+CHANGED_CURRENT = const(1)
+CHANGED_NEXT = const(2)
+
+QUEUE_FULL = const(-1)
+
+
+class ZoomQueue:
+    def __init__(self, size, slot_time, viewer_cap=40):
+        self.size = size
+        self.slot_time = slot_time
+
+        # Wartende Einträge (Ringpuffer)
+        self._zoom = bytearray(size)
+        self._t = [0.0] * size
+        self._vbuf = [bytearray(viewer_cap) for _ in range(size)]
+        self._vlen = bytearray(size)
+        self._head = 0
+        self.depth = 0
+
+        # Laufender Slot
+        self.active = False
+        self.zoom = 0
+        self.until = 0.0
+        self._cur = bytearray(viewer_cap)
+        self._cur_len = 0
+
+        self._changed = 0
+        self.version = 0
+
+        # Monitoring
+        self.served = 0
+        self.merged = 0       # Duplikate (gleicher Viewer) zusammengefasst
+        self.rejected = 0     # Warteschlange voll
+        self.last_wait = 0.0  # Wartezeit des zuletzt gestarteten Eintrags
+        self.max_wait = 0.0
+
+    # ---------- Einreihen ----------
+    def push(self, zoom, viewer, now):
+        """
+        Reiht eine Einlösung ein (viewer: bytes/memoryview, darf leer sein).
+        Rückgabe: Position in der Warteschlange (1 = als Nächstes, 0 = Viewer ist
+        gerade dran) oder QUEUE_FULL.
+        """
+        n = len(viewer)
+        if n:
+            # Viewer des laufenden Slots -> neue Stufe sofort, Slot-Ende bleibt
+            if self.active and self._cur_len == min(n, len(self._cur)) \
+                    and _same(self._cur, viewer, self._cur_len):
+                if zoom != self.zoom:
+                    self.zoom = zoom
+                    self._changed |= CHANGED_CURRENT
+                self.merged += 1
+                return 0
+            # Gleicher Viewer wartet schon -> nur Zoom aktualisieren
+            for k in range(self.depth):
+                i = (self._head + k) % self.size
+                if self._vlen[i] == min(n, len(self._vbuf[i])) \
+                        and _same(self._vbuf[i], viewer, self._vlen[i]):
+                    self._zoom[i] = zoom
+                    self.merged += 1
+                    return k + 1
+        if self.depth >= self.size:
+            self.rejected += 1
+            return QUEUE_FULL
+        i = (self._head + self.depth) % self.size
+        buf = self._vbuf[i]
+        n = min(n, len(buf))
+        _copy(buf, viewer, n)
+        self._vlen[i] = n
+        self._zoom[i] = zoom
+        self._t[i] = now
+        self.depth += 1
+        if self.depth == 1:
+            self._changed |= CHANGED_NEXT
+        return self.depth
+
+    def clear(self):
+        """Alles verwerfen (Override aus / Power aus)."""
+        if self.depth:
+            self._changed |= CHANGED_NEXT
+        if self.active:
+            self._changed |= CHANGED_CURRENT
+        self.depth = 0
+        self.active = False
+        self.zoom = 0
+        self._cur_len = 0
+
+    # ---------- Slots ----------
+    def update(self, now):
+        """
+        Einmal pro Tick: beendet abgelaufene Slots und startet den nächsten.
+        Rückgabe: Bitmaske CHANGED_CURRENT/CHANGED_NEXT seit dem letzten Aufruf.
+        """
+        if self.active and now >= self.until:
+            self.active = False
+            self.zoom = 0
+            self._cur_len = 0
+            self._changed |= CHANGED_CURRENT
+        if not self.active and self.depth:
+            i = self._head
+            n = self._vlen[i]
+            _copy(self._cur, self._vbuf[i], n)
+            self._cur_len = n
+            self.zoom = self._zoom[i]
+            wait = now - self._t[i]
+            self.last_wait = wait
+            if wait > self.max_wait:
+                self.max_wait = wait
+            self._head = (i + 1) % self.size
+            self.depth -= 1
+            self.active = True
+            self.until = now + self.slot_time
+            self.served += 1
+            self._changed |= CHANGED_CURRENT | CHANGED_NEXT
+        changed = self._changed
+        if changed:
+            self._changed = 0
+            self.version += 1
+        return changed
+
+    # ---------- Anzeige / Monitoring ----------
+    def viewer(self):
+        """Viewer des laufenden Slots (String, nur bei Änderungen abfragen)."""
+        return _text(self._cur, self._cur_len)
+
+    def next_viewer(self, anonymous="?"):
+        """Viewer, der als Nächstes dran ist (ohne Namen: anonymous), oder ""."""
+        if not self.depth:
+            return ""
+        i = self._head
+        return _text(self._vbuf[i], self._vlen[i]) or anonymous
+
+    def wait_estimate(self, now, position=None):
+        """Geschätzte Wartezeit in Sekunden für Position (Standard: neuer Eintrag am Ende)."""
+        if position is None:
+            position = self.depth + 1
+        if position <= 0:
+            return 0.0  # läuft gerade
+        remaining = self.until - now if self.active and self.until > now else 0.0
+        return remaining + (position - 1) * self.slot_time
+
+    def oldest_wait(self, now):
+        """Wie lange der vorderste Eintrag schon wartet."""
+        return now - self._t[self._head] if self.depth else 0.0
+
+
+def _copy(dst, src, n):
+    for i in range(n):
+        dst[i] = src[i]
+
+
+def _same(buf, viewer, n):
+    """Erste n Bytes gleich, ASCII ohne Groß-/Kleinschreibung (wie viewer_key)."""
+    for i in range(n):
+        a = buf[i]
+        b = viewer[i]
+        if a != b:
+            if 65 <= a <= 90:
+                a |= 0x20
+            if 65 <= b <= 90:
+                b |= 0x20
+            if a != b:
+                return False
+    return True
+
+
+def _text(buf, n):
+    if not n:
+        return ""
+    mv = memoryview(buf)[:n]
+    try:
+        return str(mv, "utf-8")
+    except Exception:
+        out = ""
+        for b in mv:
+            out += chr(b) if 32 <= b <= 126 else " "
+        return out
@@ -0,0 +1,68 @@
+# test_udp_protocol.py — Host-Test für streamer.bot/udp_protocol.py (CPython + pytest)
+# - "micropython" gibt es nur auf dem Pico: const() wird hier durch die Identität ersetzt
+# - Regression: ";" zwischen Befehlen darf weder Viewer-Namen umdeuten noch Befehle verschlucken
+
+import os
+import sys
+import types
+
+sys.modules.setdefault("micropython", types.SimpleNamespace(const=lambda x: x))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "streamer.bot"))
+
+from udp_protocol import (  # noqa: E402
+    UdpCommandParser,
+    CMD_ZOOM,
+    CMD_AF,
+    CMD_BRIGHT,
+    CMD_FREEZE,
+)
+
+
+def _parse(text):
+    buf = bytearray(256)
+    data = text.encode("utf-8")
+    buf[:len(data)] = data
+    p = UdpCommandParser(buf)
+    p.parse(len(data))
+    return p
+
+
+def _cmds(p):
+    return [(p.cmds[k], p.args[k]) for k in range(p.count)]
+
+
+def test_viewer_after_space_may_be_a_keyword():
+    p = _parse("ZOOM 12 af")
+    assert _cmds(p) == [(CMD_ZOOM, 0)]
+    assert p.zoom == 12 and p.viewer() == "af"
+
+
+def test_legacy_viewer_separator():
+    p = _parse("ZOOM=12;Hannes")
+    assert _cmds(p) == [(CMD_ZOOM, 0)]
+    assert p.zoom == 12 and p.viewer() == "Hannes"
+
+
+def test_keyword_in_viewer_slot_is_rejected():
+    # Viewer "af" oder Autofokus? Weder still umschalten noch BRIGHT verschlucken
+    for text in ("ZOOM 12;af", "zoom12;wb auto", "zoom=12;bright 4", "!zoom:12;freeze"):
+        assert _parse(text).count == 0, text
+
+
+def test_command_after_viewer_is_applied():
+    p = _parse("zoom:12:Hannes;bright 4")
+    assert _cmds(p) == [(CMD_ZOOM, 0), (CMD_BRIGHT, 4)]
+    assert p.viewer() == "Hannes"
+    p = _parse("ZOOM 12 Hannes;AF ON")
+    assert _cmds(p) == [(CMD_ZOOM, 0), (CMD_AF, 1)]
+
+
+def test_newline_always_separates():
+    p = _parse("ZOOM 12\nAF ON")
+    assert _cmds(p) == [(CMD_ZOOM, 0), (CMD_AF, 1)]
+    assert p.viewer() == ""
+
+
+def test_commands_without_viewer_split_on_semicolon():
+    p = _parse("FREEZE ON;BRIGHT 6")
+    assert _cmds(p) == [(CMD_FREEZE, 1), (CMD_BRIGHT, 6)]